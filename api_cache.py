@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+
+import requests
+
+# Process-wide TTL cache for read-mostly API endpoints (generator catalog,
+# API health). Entries are fresh for `ttl` seconds; after that they are still
+# served for up to `stale_ttl` seconds while a background thread revalidates
+# them with If-None-Match, so callers never wait on the network for a value
+# the cache already has. Hit/miss counters are available from stats().
+
+API_CACHE_TTL = float(os.getenv("API_CACHE_TTL", "300"))
+API_CACHE_STALE_TTL = float(os.getenv("API_CACHE_STALE_TTL", "3600"))
+# The API status check goes stale quickly so outages show up promptly
+HEALTH_CHECK_TTL = float(os.getenv("API_HEALTH_TTL", "30"))
+API_CACHE_MAX_ENTRIES = 256
+
+
+class TTLCache:
+    """JSON GET cache with ETag revalidation and stale-while-revalidate"""
+
+    def __init__(self, ttl=API_CACHE_TTL, stale_ttl=API_CACHE_STALE_TTL, max_entries=API_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "revalidated": 0, "not_modified": 0, "errors": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        """Return a copy of the hit/miss counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _fetch(self, client, path, token, key):
+        """GET the path (conditionally if we have an ETag) and update the entry"""
+        entry = self._entries.get(key)
+        headers = {"If-None-Match": entry["etag"]} if entry and entry["etag"] else {}
+        response = client.get(path, token=token, headers=headers)
+
+        if response.status_code == 304 and entry:
+            self._count("not_modified")
+            entry["fetched_at"] = time.time()
+            return entry["value"]
+        response.raise_for_status()
+
+        value = response.json()
+        with self._lock:
+            self._entries[key] = {"value": value, "etag": response.headers.get("ETag"), "fetched_at": time.time()}
+            if len(self._entries) > self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k]["fetched_at"])
+                del self._entries[oldest]
+        return value
+
+    def _revalidate(self, client, path, token, key):
+        try:
+            self._fetch(client, path, token, key)
+            self._count("revalidated")
+        except (requests.RequestException, ValueError) as e:
+            self._count("errors")
+            print(f"Background refresh of {path} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_json(self, client, path, token=None, ttl=None, stale_ttl=None):
+        """Return the JSON body of GET path, from cache when possible
+
+        Raises requests.RequestException (including HTTPError for non-2xx
+        responses) when there is no usable cached value.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        key = (client.base_url, path, token)
+        entry = self._entries.get(key)
+        now = time.time()
+
+        if entry:
+            age = now - entry["fetched_at"]
+            if age < ttl:
+                self._count("hits")
+                return entry["value"]
+            if age < ttl + stale_ttl:
+                # Serve the stale value and refresh it in the background
+                self._count("stale_hits")
+                with self._lock:
+                    start_refresh = key not in self._refreshing
+                    self._refreshing.add(key)
+                if start_refresh:
+                    threading.Thread(target=self._revalidate, args=(client, path, token, key),
+                                     name="api-cache-refresh", daemon=True).start()
+                return entry["value"]
+
+        self._count("misses")
+        try:
+            return self._fetch(client, path, token, key)
+        except (requests.RequestException, ValueError):
+            self._count("errors")
+            raise
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_api_cache():
+    """Return the process-wide API response cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTLCache()
+        return _cache
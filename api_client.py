@@ -0,0 +1,201 @@
+import os
+import threading
+
+import requests
+from urllib3.util.retry import Retry
+
+from api_metrics import TimedHTTPAdapter, finish_call, start_call
+from streaming_upload import MultipartEncoder, compressed_chunks, supported_encodings
+
+# Shared HTTP client for the InsightGen API.
+# Both front ends (Streamlit and Dash) go through this module so that every
+# call reuses pooled keep-alive connections instead of paying a fresh
+# TCP+TLS handshake against Cloud Run on each request.
+# Upload bodies are compressed when the API advertises request encodings it
+# accepts (an Accept-Encoding header on its responses, RFC 7694), and deck
+# pairs already uploaded for inspection are referenced by the upload id the
+# API returned instead of being sent again. Every call is timed (DNS,
+# connect, TLS, time to first byte, total, bytes up and down) in api_metrics.py.
+
+# Connection pool and timeout configuration (override via environment variables)
+POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "30"))
+UPLOAD_TIMEOUT = float(os.getenv("API_UPLOAD_TIMEOUT", "600"))
+MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("API_BACKOFF_FACTOR", "0.5"))
+
+# Only idempotent calls are retried; uploads and job submissions are not
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+# Upload body compression: auto (negotiated with the API), zstd, gzip or none
+UPLOAD_COMPRESSION = os.getenv("API_UPLOAD_COMPRESSION", "auto").lower()
+# Bodies smaller than this are sent uncompressed
+UPLOAD_COMPRESSION_MIN_BYTES = int(os.getenv("API_UPLOAD_COMPRESSION_MIN_BYTES", str(64 * 1024)))
+
+
+def parse_accept_encoding(value):
+    """Encodings listed in an Accept-Encoding header, without refused (q=0) ones"""
+    encodings = set()
+    for item in value.split(","):
+        name, *params = [token.strip() for token in item.split(";")]
+        weights = [param[2:] for param in params if param.startswith("q=")]
+        try:
+            refused = bool(weights) and float(weights[0]) == 0
+        except ValueError:
+            refused = False
+        if name and name.lower() != "identity" and not refused:
+            encodings.add(name.lower())
+    return frozenset(encodings)
+
+
+class APIClient:
+    """Pooled, retrying HTTP client bound to one InsightGen API base URL"""
+
+    def __init__(self, base_url, pool_size=POOL_SIZE, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, upload_timeout=UPLOAD_TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR, upload_compression=UPLOAD_COMPRESSION):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.upload_timeout = (connect_timeout, upload_timeout)
+        self.upload_compression = upload_compression
+        self.pool_size = pool_size
+        # Request encodings the API accepts; None until negotiated (or refused with a 415)
+        self._request_encodings = None
+        self._negotiation_lock = threading.Lock()
+
+        self._retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=IDEMPOTENT_METHODS,
+            raise_on_status=False,
+        )
+        self.session = self._new_session()
+
+    def _new_session(self):
+        adapter = TimedHTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=self._retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def reset_after_fork(self):
+        """Drop pooled connections inherited from the parent process (they belong to its sockets)"""
+        self.session = self._new_session()
+        self._negotiation_lock = threading.Lock()
+
+    def url(self, path):
+        """Build an absolute URL for an API path"""
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, token=None, headers=None, timeout=None, **kwargs):
+        """Send a request, injecting the bearer token when one is given"""
+        headers = dict(headers or {})
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        if timeout is None:
+            # Multipart uploads get the long read timeout
+            timeout = self.upload_timeout if "files" in kwargs or "data" in kwargs else self.timeout
+        call = start_call(method, path)
+        try:
+            response = self.session.request(method, self.url(path), headers=headers, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            finish_call(call, error=e)
+            raise
+        finish_call(call, response, streamed=kwargs.get("stream", False))
+        return response
+
+    def get(self, path, token=None, **kwargs):
+        return self.request("GET", path, token=token, **kwargs)
+
+    def post(self, path, token=None, **kwargs):
+        return self.request("POST", path, token=token, **kwargs)
+
+    def request_encoding(self):
+        """Content-Encoding to compress upload bodies with, or None"""
+        if self.upload_compression == "none":
+            return None
+        if self.upload_compression == "auto":
+            with self._negotiation_lock:
+                if self._request_encodings is None:
+                    # A failed check sends this body uncompressed and is tried again on the next upload
+                    try:
+                        response = self.get("/")
+                    except requests.RequestException:
+                        return None
+                    if not response.ok:
+                        return None
+                    self._request_encodings = parse_accept_encoding(response.headers.get("Accept-Encoding", ""))
+            candidates = supported_encodings()
+        else:
+            candidates = [self.upload_compression]
+        accepted = self._request_encodings
+        return next((encoding for encoding in candidates if accepted is None or encoding in accepted), None)
+
+    def post_multipart(self, path, fields=None, files=None, token=None, on_progress=None, **kwargs):
+        """POST a multipart form, streaming file parts from their file objects
+
+        The body is compressed on the fly when the API accepts a request encoding.
+        """
+        encoder = MultipartEncoder(fields=fields, files=files, on_progress=on_progress)
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["Content-Type"] = encoder.content_type
+        encoding = self.request_encoding() if len(encoder) >= UPLOAD_COMPRESSION_MIN_BYTES else None
+        if encoding is None:
+            return self.post(path, token=token, data=encoder, headers=headers, **kwargs)
+
+        response = self.post(path, token=token, data=compressed_chunks(encoder, encoding),
+                             headers=dict(headers, **{"Content-Encoding": encoding}), **kwargs)
+        if response.status_code != 415:
+            return response
+        # The API refused the encoding: remember what it accepts and send the body uncompressed
+        self._request_encodings = parse_accept_encoding(response.headers.get("Accept-Encoding", ""))
+        encoder = MultipartEncoder(fields=fields, files=files, on_progress=on_progress)
+        headers["Content-Type"] = encoder.content_type
+        return self.post(path, token=token, data=encoder, headers=headers, **kwargs)
+
+    def post_decks(self, path, fields=None, files=None, upload_id=None, token=None, on_progress=None):
+        """POST a deck pair, referencing the copy uploaded for inspection when an upload id is given
+
+        Any 4xx answer to the upload id (unknown, expired, another user's or
+        unsupported) falls back to uploading the files.
+        """
+        if upload_id:
+            response = self.post_multipart(path, fields=dict(fields or {}, upload_id=upload_id), token=token)
+            if not 400 <= response.status_code < 500:
+                return response
+        return self.post_multipart(path, fields=fields, files=files, token=token, on_progress=on_progress)
+
+    def close(self):
+        self.session.close()
+
+
+# One client per base URL, shared by every session in the process
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url):
+    """Return the process-wide client for the given API base URL"""
+    with _clients_lock:
+        client = _clients.get(base_url)
+        if client is None:
+            client = APIClient(base_url)
+            _clients[base_url] = client
+        return client
+
+
+def _reset_clients_after_fork():
+    global _clients_lock
+    _clients_lock = threading.Lock()
+    for client in _clients.values():
+        client.reset_after_fork()
+
+
+# Forked workers (e.g. Dash background callbacks) must not share the parent's keep-alive sockets
+os.register_at_fork(after_in_child=_reset_clients_after_fork)
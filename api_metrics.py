@@ -0,0 +1,469 @@
+import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Timing of every call to the InsightGen API.
+# The pooled client (api_client.py) opens its connections through the
+# instrumented connection classes below, which time DNS resolution, TCP
+# connect and the TLS handshake of new connections and the time spent writing
+# the request. Together with the response timing recorded by the client this
+# splits each call into
+#   dns + connect + tls   (new connections only; 0 on a reused keep-alive connection)
+#   send                  writing headers and body (the upload)
+#   wait                  until the first response byte (the API's own time)
+#   receive               reading the response body
+# plus time to first byte, total time, bytes up and down and the status code.
+# Calls are aggregated into Prometheus histograms (rendered by
+# prometheus_text() for the Dash server's /metrics route, or served on
+# API_METRICS_PORT from other processes) and the most recent ones are kept per
+# session for the Streamlit debug panel. Forked children (the Dash background
+# callbacks that upload decks) spool their calls to API_METRICS_SPOOL_DIR, and
+# the parent merges them before reporting.
+# Under gunicorn every worker also keeps a snapshot of its totals in a
+# directory shared with its sibling workers (share_between_workers(), like
+# prometheus_client's multiprocess mode), and /metrics reports the sum over
+# all of them, so a scrape gives the same totals whichever worker answers it.
+# Snapshots of workers that have exited are kept in the sum, so the counters
+# never go backwards.
+#
+# Streamed responses (downloads, job event streams) are recorded when their
+# headers arrive; their bytes down is the Content-Length, if any.
+
+# Upper bounds of the histogram buckets
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+PHASES = ("dns", "connect", "tls", "send", "wait", "receive")
+# Recent calls kept for the debug panel (process-wide)
+API_METRICS_RECENT = int(os.getenv("API_METRICS_RECENT", "500"))
+# Serve /metrics on this port from processes without a Flask server (Streamlit); 0 = off
+API_METRICS_PORT = int(os.getenv("API_METRICS_PORT", "0"))
+# Show the per-session API timing panel in the Streamlit sidebar (also with ?debug=api)
+API_DEBUG_PANEL = os.getenv("API_DEBUG_PANEL", "0") == "1"
+API_METRICS_SPOOL_DIR = os.getenv("API_METRICS_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "insightgen_api_metrics"))
+# A worker's snapshot is rewritten at most this often while it makes calls (and on every scrape it answers)
+API_METRICS_SNAPSHOT_INTERVAL = float(os.getenv("API_METRICS_SNAPSHOT_INTERVAL", "1"))
+
+# Ids in paths are folded into {id} so each endpoint is one label value
+_ID_RE = re.compile(r"/[0-9a-f-]{8,}|/\d+")
+
+
+def endpoint_label(path):
+    """Path of an API call with ids replaced by {id}"""
+    return _ID_RE.sub("/{id}", path.split("?")[0]) or "/"
+
+
+class Histogram:
+    """Prometheus histogram with one series per label set"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        # labels -> [bucket counts..., sum, count]
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, [0] * len(self.buckets) + [0.0, 0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def snapshot(self):
+        return [[list(labels), series] for labels, series in self._series.items()]
+
+    def merge(self, snapshot):
+        for labels, series in snapshot:
+            total = self._series.setdefault(tuple(labels), [0] * len(self.buckets) + [0.0, 0])
+            for i, value in enumerate(series):
+                total[i] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            label_text = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            prefix = label_text + "," if label_text else ""
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    """Prometheus counter with one value per label set"""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+
+    def inc(self, labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self):
+        return [[list(labels), value] for labels, value in self._values.items()]
+
+    def merge(self, snapshot):
+        for labels, value in snapshot:
+            self.inc(tuple(labels), value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            label_text = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            lines.append(f"{self.name}{{{label_text}}} {value}")
+        return lines
+
+
+class APIMetrics:
+    """Histograms of API call timings and sizes, plus the most recent calls"""
+
+    def __init__(self, recent=API_METRICS_RECENT, spool_dir=API_METRICS_SPOOL_DIR):
+        self.spool_dir = spool_dir
+        # Set in forked children: their calls are written there for the parent to merge
+        self.spool_to = None
+        # Set in gunicorn workers: where they and their siblings keep snapshots of their totals
+        self.workers_dir = None
+        self._snapshot_at = 0
+        self._lock = threading.Lock()
+        self.duration = Histogram("insightgen_api_request_duration_seconds", "Total time of API calls",
+                                  ("method", "endpoint", "status"), SECONDS_BUCKETS)
+        self.ttfb = Histogram("insightgen_api_time_to_first_byte_seconds",
+                              "Time from starting an API call to its response headers", ("endpoint",), SECONDS_BUCKETS)
+        self.phases = Histogram("insightgen_api_phase_seconds", "Time spent in each phase of API calls",
+                                ("endpoint", "phase"), SECONDS_BUCKETS)
+        self.bytes_up = Histogram("insightgen_api_request_bytes", "Bytes sent per API call (headers and body)",
+                                  ("endpoint",), BYTES_BUCKETS)
+        self.bytes_down = Histogram("insightgen_api_response_bytes", "Body bytes received per API call",
+                                    ("endpoint",), BYTES_BUCKETS)
+        self.connections = Counter("insightgen_api_connections_total", "Connections opened to the API", ("scheme",))
+        self.errors = Counter("insightgen_api_errors_total", "API calls that failed without a response",
+                              ("endpoint", "error"))
+        self._recent = deque(maxlen=recent)
+
+    def _metrics(self):
+        return (self.duration, self.ttfb, self.phases, self.bytes_up, self.bytes_down, self.connections, self.errors)
+
+    def record(self, call):
+        """Add a finished call (see start_call / finish_call)"""
+        if self.spool_to:
+            return self._spool(call)
+        endpoint = call["endpoint"]
+        with self._lock:
+            if call["status"] is None:
+                self.errors.inc((endpoint, call["error"]))
+            else:
+                self.duration.observe((call["method"], endpoint, str(call["status"])), call["total"])
+                self.ttfb.observe((endpoint,), call["ttfb"])
+                for phase in PHASES:
+                    self.phases.observe((endpoint, phase), call[phase])
+                self.bytes_up.observe((endpoint,), call["bytes_up"])
+                self.bytes_down.observe((endpoint,), call["bytes_down"])
+            self._recent.append(call)
+        self._snapshot_if_due()
+
+    def count_connection(self, scheme):
+        with self._lock:
+            self.connections.inc((scheme,))
+        self._snapshot_if_due()
+
+    def _spool(self, call):
+        os.makedirs(self.spool_to, exist_ok=True)
+        path = os.path.join(self.spool_to, uuid.uuid4().hex)
+        with open(path + ".tmp", "w") as f:
+            json.dump(call, f)
+        # Renamed into place so the parent never reads a partial record
+        os.replace(path + ".tmp", path + ".json")
+
+    def merge_spooled(self, pid=None):
+        """Record the calls spooled by this process's forked children (or those of process pid)"""
+        directory = os.path.join(self.spool_dir, str(pid or os.getpid()))
+        try:
+            names = [name for name in os.listdir(directory) if name.endswith(".json")]
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                with open(path) as f:
+                    call = json.load(f)
+                # Whoever removes the file records the call (a sibling worker may be merging it too)
+                os.remove(path)
+            except (OSError, ValueError):
+                continue
+            self.record(call)
+
+    def after_fork_in_child(self):
+        """Spool calls to the parent, which serves the metrics"""
+        self._lock = threading.Lock()
+        self.spool_for(os.getppid())
+
+    def spool_for(self, pid):
+        """Spool calls to the process pid, which serves the metrics"""
+        self.spool_to = os.path.join(self.spool_dir, str(pid))
+
+    def keep_in_process(self):
+        """Record this process's calls itself (a server worker answering /metrics) instead of spooling them"""
+        self.spool_to = None
+
+    def share_between_workers(self, directory):
+        """Record this worker's calls itself and report the totals of every worker sharing directory"""
+        self.keep_in_process()
+        self.workers_dir = directory
+        os.makedirs(directory, exist_ok=True)
+        # Written now, so siblings also merge the calls spooled for this worker before it makes any
+        self.write_snapshot()
+
+    def write_snapshot(self):
+        """Save this worker's totals for its siblings"""
+        if not self.workers_dir:
+            return
+        with self._lock:
+            self._snapshot_at = time.monotonic()
+            snapshot = {metric.name: metric.snapshot() for metric in self._metrics()}
+            path = os.path.join(self.workers_dir, f"{os.getpid()}.json")
+            with open(path + ".tmp", "w") as f:
+                json.dump(snapshot, f)
+            # Renamed into place so a sibling never reads a partial snapshot
+            os.replace(path + ".tmp", path)
+
+    def _snapshot_if_due(self):
+        if self.workers_dir and time.monotonic() - self._snapshot_at >= API_METRICS_SNAPSHOT_INTERVAL:
+            self.write_snapshot()
+
+    def _worker_snapshots(self):
+        """pid -> snapshot of every worker that has shared its totals (exited ones included)"""
+        snapshots = {}
+        for name in os.listdir(self.workers_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.workers_dir, name)) as f:
+                    snapshots[int(name[:-len(".json")])] = json.load(f)
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def recent(self, session=None, limit=50):
+        """Most recent calls first, optionally only those made by one session"""
+        self.merge_spooled()
+        with self._lock:
+            calls = [call for call in self._recent if session is None or call["session"] == session]
+        return calls[::-1][:limit]
+
+    def prometheus_text(self):
+        self.merge_spooled()
+        if self.workers_dir:
+            return self._workers_prometheus_text()
+        with self._lock:
+            lines = []
+            for metric in self._metrics():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _workers_prometheus_text(self):
+        """Totals of every worker sharing workers_dir"""
+        # Calls spooled for a sibling (or an exited worker) are counted here
+        for pid in self._worker_snapshots():
+            if pid != os.getpid():
+                self.merge_spooled(pid)
+        self.write_snapshot()
+        total = APIMetrics(recent=0, spool_dir=self.spool_dir)
+        for snapshot in self._worker_snapshots().values():
+            for metric in total._metrics():
+                metric.merge(snapshot.get(metric.name, []))
+        lines = []
+        for metric in total._metrics():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+_metrics = APIMetrics()
+
+
+def get_api_metrics():
+    """Return the process-wide API metrics"""
+    return _metrics
+
+
+os.register_at_fork(after_in_child=_metrics.after_fork_in_child)
+
+
+################################################################################
+# Per-call timing
+################################################################################
+
+# The call in progress on this thread, filled in by the connection classes
+_local = threading.local()
+
+
+def set_session(session):
+    """Label the calls made from this thread with a session id (for the debug panel)"""
+    _local.session = session
+
+
+def start_call(method, path):
+    call = {
+        "time": time.time(), "method": method, "endpoint": endpoint_label(path),
+        "session": getattr(_local, "session", None), "status": None, "error": None,
+        "new_connection": False, "bytes_up": 0, "bytes_down": 0, "ttfb": 0.0, "total": 0.0,
+        "_started": time.perf_counter(),
+    }
+    call.update((phase, 0.0) for phase in PHASES)
+    _local.call = call
+    return call
+
+
+def finish_call(call, response=None, error=None, streamed=False):
+    """Complete the timing of a call with its response (or the exception that ended it)"""
+    _local.call = None
+    call["total"] = time.perf_counter() - call.pop("_started")
+    if response is None:
+        call["error"] = type(error).__name__ if error else "unknown"
+    else:
+        call["status"] = response.status_code
+        call["ttfb"] = min(response.elapsed.total_seconds(), call["total"])
+        if streamed:
+            call["bytes_down"] = int(response.headers.get("Content-Length") or 0)
+        else:
+            # Bytes read from the socket (before content decoding)
+            call["bytes_down"] = response.raw.tell() if hasattr(response.raw, "tell") else len(response.content)
+        setup = call["dns"] + call["connect"] + call["tls"] + call["send"]
+        call["wait"] = max(call["ttfb"] - setup, 0.0)
+        call["receive"] = max(call["total"] - call["ttfb"], 0.0)
+    _metrics.record(call)
+    return call
+
+
+def _current_call():
+    return getattr(_local, "call", None)
+
+
+################################################################################
+# Instrumented connections
+################################################################################
+
+class TimedConnectionMixin:
+    """Times DNS, TCP connect and request writing for the call in progress"""
+
+    scheme = "http"
+
+    def _new_conn(self):
+        call = _current_call()
+        started = time.perf_counter()
+        try:
+            address = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)[0][4][0]
+        except OSError:
+            # Let urllib3 resolve again and raise its own error
+            address = None
+        resolved = time.perf_counter()
+
+        original_host = self._dns_host
+        if address:
+            self._dns_host = address
+        try:
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = original_host
+        if call is not None:
+            call["dns"] += resolved - started
+            call["connect"] += time.perf_counter() - resolved
+            call["new_connection"] = True
+        _metrics.count_connection(self.scheme)
+        return sock
+
+    def send(self, data):
+        call = _current_call()
+        started = time.perf_counter()
+        super().send(data)
+        if call is not None:
+            call["send"] += time.perf_counter() - started
+            call["bytes_up"] += len(data) if isinstance(data, (bytes, bytearray, memoryview)) else 0
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    scheme = "https"
+
+    def connect(self):
+        call = _current_call()
+        before = (call["dns"] + call["connect"]) if call is not None else 0.0
+        started = time.perf_counter()
+        super().connect()
+        if call is not None:
+            # Whatever connect() spent beyond DNS and TCP connect is the TLS handshake
+            call["tls"] += max(time.perf_counter() - started - (call["dns"] + call["connect"] - before), 0.0)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """requests adapter whose connection pools open instrumented connections"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+
+################################################################################
+# /metrics outside Flask
+################################################################################
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = _metrics.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve_metrics(port=API_METRICS_PORT, host="0.0.0.0"):
+    """Serve /metrics from a daemon thread (once per process); does nothing when port is 0"""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="api-metrics", daemon=True).start()
+        return _server
@@ -0,0 +1,142 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+
+from state_backend import get_state_backend
+
+# Token verification cache.
+# The JWT is decoded locally (expiry and claims only; the server remains the
+# authority on signatures), so an obviously expired token is rejected without
+# a network call and a valid one is re-checked with /api/auth/verify at most
+# every AUTH_VERIFY_INTERVAL seconds. Tokens close to expiry are refreshed
+# proactively through AUTH_REFRESH_PATH when the API offers it.
+# Verifications are kept in the state backend (state_backend.py), so with a
+# shared backend a token checked by one instance is trusted by the others.
+
+AUTH_VERIFY_INTERVAL = float(os.getenv("AUTH_VERIFY_INTERVAL", "300"))
+AUTH_REFRESH_MARGIN = float(os.getenv("AUTH_REFRESH_MARGIN", "300"))
+AUTH_REFRESH_PATH = os.getenv("AUTH_REFRESH_PATH", "/api/auth/refresh")
+# How long the verification of a token without an expiry claim is kept
+AUTH_ENTRY_TTL = 86400
+
+
+def decode_jwt_claims(token):
+    """Return the (unverified) claims of a JWT, or None if it is not one"""
+    try:
+        payload = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def _key(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenVerifier:
+    """Caches server verification results per token in a state backend"""
+
+    def __init__(self, verify_interval=AUTH_VERIFY_INTERVAL, refresh_margin=AUTH_REFRESH_MARGIN, backend=None):
+        self.verify_interval = verify_interval
+        self.refresh_margin = refresh_margin
+        self.backend = backend or get_state_backend()
+        # None until we know whether the API has a refresh endpoint
+        self._refresh_supported = None
+
+    def _entry(self, token):
+        return self.backend.get_json(f"auth:{_key(token)}")
+
+    def forget(self, token):
+        """Drop a token from the cache (e.g. on logout)"""
+        self.backend.delete(f"auth:{_key(token)}")
+
+    def remember(self, token, user, expires_at=None):
+        """Record a token the server has just confirmed (e.g. right after login)"""
+        if expires_at is None:
+            expires_at = (decode_jwt_claims(token) or {}).get("exp")
+        now = time.time()
+        # Kept until the token expires: it is the fallback while the server cannot be reached
+        ttl = expires_at - now if expires_at else AUTH_ENTRY_TTL
+        if ttl > 0:
+            self.backend.set_json(f"auth:{_key(token)}", {"verified_at": now, "user": user, "expires_at": expires_at},
+                                  ttl=ttl)
+
+    def _refresh(self, client, token):
+        """Exchange a token that is about to expire for a new one (None if unavailable)"""
+        if self._refresh_supported is False:
+            return None
+        try:
+            response = client.post(AUTH_REFRESH_PATH, token=token)
+        except requests.RequestException as e:
+            print(f"Token refresh error: {str(e)}")
+            return None
+        if response.status_code in (404, 405, 501):
+            self._refresh_supported = False
+            return None
+        if response.status_code != 200:
+            return None
+        self._refresh_supported = True
+        data = response.json()
+        new_token = data.get("access_token")
+        if new_token:
+            self.remember(new_token, data.get("user"))
+        return new_token
+
+    def verify(self, client, token):
+        """Return {"valid", "user", "token"}; token may be a refreshed replacement
+
+        Raises requests.RequestException only when the server cannot be
+        reached and there is no cached verification to fall back on.
+        """
+        now = time.time()
+        claims = decode_jwt_claims(token) or {}
+        expires_at = claims.get("exp")
+        if expires_at and expires_at <= now:
+            self.forget(token)
+            return {"valid": False, "user": None, "token": token}
+
+        if expires_at and expires_at - now < self.refresh_margin:
+            new_token = self._refresh(client, token)
+            if new_token:
+                self.forget(token)
+                return {"valid": True, "user": (self._entry(new_token) or {}).get("user"), "token": new_token}
+
+        entry = self._entry(token)
+        if entry and now - entry["verified_at"] < self.verify_interval:
+            return {"valid": True, "user": entry["user"], "token": token}
+
+        try:
+            response = client.get("/api/auth/verify", token=token)
+        except requests.RequestException:
+            if entry:
+                # Server unreachable: trust the earlier verification until the token expires
+                return {"valid": True, "user": entry["user"], "token": token}
+            raise
+
+        if response.status_code == 200:
+            data = response.json()
+            if data.get("authenticated", False):
+                user = data.get("user") or (entry or {}).get("user")
+                self.remember(token, user, expires_at)
+                return {"valid": True, "user": user, "token": token}
+
+        self.forget(token)
+        return {"valid": False, "user": None, "token": token}
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_token_verifier():
+    """Return the process-wide token verifier"""
+    global _verifier
+    with _verifier_lock:
+        if _verifier is None:
+            _verifier = TokenVerifier()
+        return _verifier
@@ -0,0 +1,173 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import multiprocess
+import multiprocess.forkserver
+import psutil
+from dash import DiskcacheManager
+from dash.long_callback.managers import BaseLongCallbackManager
+from plotly.utils import PlotlyJSONEncoder
+
+from api_metrics import get_api_metrics
+from state_backend import INSTANCE_ID, get_state_backend
+
+# Background callback processes for the Dash app.
+# Dash's DiskcacheManager forks each background callback straight from the
+# web server process. That process is multi-threaded (gunicorn gthread
+# workers, the threaded development server), and a fork taken while another
+# thread is inside SQLite (the diskcache result store, the job registry)
+# leaves the child with SQLite lock state it does not own: its first write to
+# the result store then blocks until the cache timeout. The callbacks are
+# started from a multiprocess forkserver instead: a single-threaded process,
+# started once per server process, that imports the app and forks a child
+# for each callback.
+#
+# With a state backend shared by several instances (state_backend.py), the
+# browser polls for a callback's progress and result through whichever
+# instance the load balancer picks. Progress and results then go through the
+# backend (StateCache) instead of the local disk cache, and job ids name the
+# instance that started the process ("<instance>:<pid>"). Other instances see
+# that it is running through a marker the process keeps fresh, and cancel it
+# through a flag the process watches.
+
+# Results and progress nobody collects are dropped after this long
+CALLBACK_STATE_TTL = 3600
+# A job whose marker is this old is taken for dead (killed without cleaning up)
+CALLBACK_HEARTBEAT_TTL = 30
+CALLBACK_HEARTBEAT_INTERVAL = 5
+
+
+class StateCache:
+    """The part of diskcache.Cache that DiskcacheManager uses, on a state backend
+
+    Values are stored as JSON (components included), like Dash's CeleryManager does.
+    """
+
+    def __init__(self, backend, prefix="dash-callback:", ttl=CALLBACK_STATE_TTL):
+        self.backend = backend
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        value = self.backend.get(self.prefix + key)
+        return default if value is None else json.loads(value)
+
+    def set(self, key, value, expire=None):
+        self.backend.set(self.prefix + key, json.dumps(value, cls=PlotlyJSONEncoder).encode("utf-8"),
+                         ttl=expire or self.ttl)
+
+    def delete(self, key):
+        self.backend.delete(self.prefix + key)
+
+    def touch(self, key, expire=None):
+        value = self.backend.get(self.prefix + key)
+        if value is not None:
+            self.backend.set(self.prefix + key, value, ttl=expire or self.ttl)
+
+    @contextmanager
+    def transact(self):
+        # Only used to serialize kills of local processes, which are idempotent
+        yield
+
+
+def _heartbeat(backend, job):
+    """Keep the job's running marker fresh and exit when another instance cancels it"""
+    while True:
+        if backend.get(f"callback-cancel:{job}") is not None:
+            backend.delete(f"callback-running:{job}")
+            os._exit(1)
+        backend.set(f"callback-running:{job}", b"1", ttl=CALLBACK_HEARTBEAT_TTL)
+        time.sleep(CALLBACK_HEARTBEAT_INTERVAL)
+
+
+def run_job(app_module, long_key, key, progress_key, args, context, server_pid, shared=False):
+    """Body of a background callback process: run the callback registered under long_key"""
+    # Call timings go to the server process that started the callback, not to the forkserver
+    get_api_metrics().spool_for(server_pid)
+    manager = sys.modules[app_module].background_callback_manager.get()
+    if not shared:
+        manager.func_registry[long_key](key, progress_key, args, context)
+        return
+    # The job id the starting instance handed to the browser
+    job = f"{INSTANCE_ID}:{os.getpid()}"
+    backend = get_state_backend()
+    threading.Thread(target=_heartbeat, args=(backend, job), name="callback-heartbeat", daemon=True).start()
+    try:
+        manager.func_registry[long_key](key, progress_key, args, context)
+    finally:
+        backend.delete(f"callback-running:{job}")
+
+
+class ForkserverDiskcacheManager(DiskcacheManager):
+    """DiskcacheManager that starts its jobs from a forkserver with app_module preloaded
+
+    cache is a diskcache.Cache, or a StateCache when several instances share the jobs.
+    """
+
+    def __init__(self, cache, app_module):
+        if isinstance(cache, StateCache):
+            # DiskcacheManager.__init__ only accepts diskcache caches; the base
+            # class registers the callbacks with make_job_fn, which needs the handle
+            self.handle = cache
+            self.expire = None
+            BaseLongCallbackManager.__init__(self, None)
+        else:
+            super().__init__(cache)
+        self.app_module = app_module
+        self.shared = isinstance(cache, StateCache)
+        self._context = multiprocess.get_context("forkserver")
+        self._context.set_forkserver_preload([app_module])
+
+    def start(self):
+        """Start the forkserver now rather than on the first job (it imports the whole app)"""
+        multiprocess.forkserver.ensure_running()
+
+    @staticmethod
+    def _local_pid(job):
+        """The pid of a job started on this instance, or None"""
+        instance, _, pid = str(job).rpartition(":")
+        return int(pid) if instance in ("", INSTANCE_ID) else None
+
+    def call_job_fn(self, key, job_fn, args, context):
+        # job_fn is a closure over the callback and the cache: the child looks it up by key instead
+        long_key = next(name for name, registered in self.func_registry.items() if registered is job_fn)
+        process = self._context.Process(
+            target=run_job,
+            args=(self.app_module, long_key, key, self._make_progress_key(key), args, context, os.getpid(),
+                  self.shared),
+        )
+        process.start()
+        if not self.shared:
+            return process.pid
+        job = f"{INSTANCE_ID}:{process.pid}"
+        # Running from now on, even before the process has written its first heartbeat
+        self.handle.backend.set(f"callback-running:{job}", b"1", ttl=CALLBACK_HEARTBEAT_TTL)
+        return job
+
+    def job_running(self, job):
+        pid = self._local_pid(job)
+        if pid is not None:
+            return super().job_running(pid)
+        return self.handle.backend.get(f"callback-running:{job}") is not None
+
+    def terminate_job(self, job):
+        if job is None:
+            return
+        pid = self._local_pid(job)
+        if pid is None:
+            # Started on another instance: the process exits when it sees the flag
+            self.handle.backend.set(f"callback-cancel:{job}", b"1", ttl=CALLBACK_HEARTBEAT_TTL * 2)
+            return
+        # The job may exit between Dash's check that it is alive and its kill
+        try:
+            super().terminate_job(pid)
+        except psutil.NoSuchProcess:
+            pass
+
+    def terminate_unhealthy_job(self, job):
+        pid = self._local_pid(job)
+        return pid is not None and super().terminate_unhealthy_job(pid)
@@ -0,0 +1,450 @@
+import csv
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from params import DATA_DIR
+from streaming_upload import deck_files
+from job_progress import BULK_PRIORITY, is_terminal, subscribe_job_status
+from progress_model import ProgressModel, describe, record_job_metrics
+from download_cache import get_download_cache
+from job_registry import get_job_registry
+from state_backend import get_state_backend
+
+# Batch mode: many PPTX/PDF pairs submitted in one go.
+# Inputs (a zip, loose files from a folder, or both) are unpacked into a
+# per-batch directory and paired by filename stem, or explicitly through a
+# manifest.csv with `pptx` and `pdf` columns (plus optional `name` and
+# `user_prompt`). Jobs run on a bounded thread pool so at most
+# BATCH_MAX_CONCURRENCY decks are in flight on the API at once; the outputs
+# of finished jobs are collected into a single zip.
+# Batches started through start_batch() write their state to their
+# directory, so that every server process on the host (e.g. all gunicorn
+# workers) can show their progress and serve their outputs. With a shared
+# state backend (state_backend.py) the state is also written there, so every
+# instance can show it; their zip fetches outputs it does not have from the API.
+
+BATCH_DIR = os.getenv("BATCH_DIR", os.path.join(DATA_DIR, "batches"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+# Finished batches (and their files) are dropped after this long
+BATCH_RETENTION_SECONDS = int(os.getenv("BATCH_RETENTION_SECONDS", "86400"))
+MANIFEST_NAME = "manifest.csv"
+BATCH_STATE_NAME = "batch.json"
+# Progress-only changes are written to the state file at most this often
+BATCH_STATE_INTERVAL = float(os.getenv("BATCH_STATE_INTERVAL", "1"))
+DECK_EXTENSIONS = (".pptx", ".pdf")
+# Limits on an uploaded zip, checked against its directory before anything is extracted
+# (zipfile itself never inflates a member past the size its directory declares)
+BATCH_ZIP_MAX_MEMBERS = int(os.getenv("BATCH_ZIP_MAX_MEMBERS", "1000"))
+BATCH_ZIP_MAX_BYTES = int(os.getenv("BATCH_ZIP_MAX_MB", "2048")) * 1024 * 1024
+# Decks barely compress (PPTX is itself a zip); a member inflating more than this is refused
+BATCH_ZIP_MAX_RATIO = float(os.getenv("BATCH_ZIP_MAX_RATIO", "100"))
+# Members smaller than this are not held to the ratio (e.g. a manifest of repeated paths)
+_ZIP_RATIO_MIN_BYTES = 1024 * 1024
+
+
+class BatchError(ValueError):
+    """Raised for unusable batch inputs (bad zip, manifest or no pairs)"""
+
+
+def deck_stem(filename):
+    """Pairing key for a deck file: lower-cased base name without extension"""
+    return os.path.splitext(os.path.basename(filename))[0].strip().lower()
+
+
+def pair_decks(paths):
+    """Pair PPTX and PDF paths by filename stem
+
+    Returns (pairs, unmatched) where pairs is a list of
+    {"name", "pptx", "pdf"} dicts sorted by name.
+    """
+    by_stem = {}
+    for path in paths:
+        extension = os.path.splitext(path)[1].lower()
+        if extension in DECK_EXTENSIONS:
+            # Decks in different folders never pair with each other
+            key = (os.path.dirname(path), deck_stem(path))
+            by_stem.setdefault(key, {}).setdefault(extension, []).append(path)
+
+    pairs, unmatched = [], []
+    for _, found in sorted(by_stem.items()):
+        pptx, pdf = found.get(".pptx", []), found.get(".pdf", [])
+        if len(pptx) == 1 and len(pdf) == 1:
+            name = os.path.splitext(os.path.basename(pptx[0]))[0]
+            pairs.append({"name": name, "pptx": pptx[0], "pdf": pdf[0]})
+        else:
+            unmatched.extend(pptx + pdf)
+    return pairs, unmatched
+
+
+def read_manifest(path):
+    """Read deck pairs from a manifest CSV (paths relative to the manifest)"""
+    root = os.path.dirname(os.path.abspath(path))
+    pairs = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or not {"pptx", "pdf"} <= {name.strip().lower() for name in reader.fieldnames}:
+            raise BatchError(f"{MANIFEST_NAME} needs 'pptx' and 'pdf' columns")
+        for line_number, row in enumerate(reader, start=2):
+            row = {(key or "").strip().lower(): (value or "").strip() for key, value in row.items()}
+            if not row.get("pptx") and not row.get("pdf"):
+                continue
+            pair = {}
+            for column in ("pptx", "pdf"):
+                file_path = os.path.abspath(os.path.join(root, row.get(column, "")))
+                if not file_path.startswith(root + os.sep) or not os.path.isfile(file_path):
+                    raise BatchError(f"{MANIFEST_NAME} line {line_number}: {column} file '{row.get(column)}' not found")
+                pair[column] = file_path
+            pair["name"] = row.get("name") or os.path.splitext(os.path.basename(pair["pptx"]))[0]
+            if row.get("user_prompt"):
+                pair["user_prompt"] = row["user_prompt"]
+            pairs.append(pair)
+    return pairs
+
+
+def _is_hidden(path):
+    return any(part.startswith((".", "__MACOSX")) for part in path.replace("\\", "/").split("/") if part)
+
+
+def _zip_members(archive):
+    """The decks and manifest in a zip, refused as a whole if they break the size limits"""
+    members = [info for info in archive.infolist()
+               if not info.is_dir() and not _is_hidden(info.filename)
+               and (info.filename.lower().endswith(DECK_EXTENSIONS)
+                    or os.path.basename(info.filename).lower() == MANIFEST_NAME)]
+    if len(members) > BATCH_ZIP_MAX_MEMBERS:
+        raise BatchError(f"Too many files in zip: {len(members)} (at most {BATCH_ZIP_MAX_MEMBERS})")
+    total = sum(info.file_size for info in members)
+    if total > BATCH_ZIP_MAX_BYTES:
+        raise BatchError(f"Zip contents too large: {total // 2**20} MB (at most {BATCH_ZIP_MAX_BYTES // 2**20} MB)")
+    for info in members:
+        if info.file_size > _ZIP_RATIO_MIN_BYTES and info.file_size > BATCH_ZIP_MAX_RATIO * max(info.compress_size, 1):
+            raise BatchError(f"Suspicious compression ratio in zip: {info.filename}")
+    return members
+
+
+def extract_zip(fileobj, dest):
+    """Extract the decks and manifest from a zip, refusing paths outside dest and oversized contents"""
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as e:
+        raise BatchError(f"Not a valid zip file: {str(e)}")
+    dest = os.path.abspath(dest)
+    with archive:
+        for info in _zip_members(archive):
+            name = info.filename
+            target = os.path.abspath(os.path.join(dest, name))
+            if not target.startswith(dest + os.sep):
+                raise BatchError(f"Unsafe path in zip: {name}")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with archive.open(info) as source, open(target, "wb") as out:
+                shutil.copyfileobj(source, out)
+
+
+def add_input(dest, filename, fileobj):
+    """Add an uploaded zip, deck or manifest file to a batch input directory"""
+    filename = os.path.basename(filename.replace("\\", "/"))
+    if filename.lower().endswith(".zip"):
+        extract_zip(fileobj, dest)
+    elif filename.lower().endswith(DECK_EXTENSIONS) or filename.lower() == MANIFEST_NAME:
+        os.makedirs(dest, exist_ok=True)
+        with open(os.path.join(dest, filename), "wb") as out:
+            shutil.copyfileobj(fileobj, out)
+
+
+def collect_pairs(root):
+    """Deck pairs in a batch input directory: from the manifest if present, else by filename"""
+    manifests = []
+    paths = []
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.lower() == MANIFEST_NAME:
+                manifests.append(os.path.join(directory, filename))
+            else:
+                paths.append(os.path.join(directory, filename))
+
+    if len(manifests) > 1:
+        raise BatchError(f"Found more than one {MANIFEST_NAME}")
+    if manifests:
+        pairs = read_manifest(manifests[0])
+        used = {path for pair in pairs for path in (pair["pptx"], pair["pdf"])}
+        unmatched = sorted(path for path in paths if path.lower().endswith(DECK_EXTENSIONS) and path not in used)
+    else:
+        pairs, unmatched = pair_decks(paths)
+    if not pairs:
+        raise BatchError("No PPTX/PDF pairs found. Name each PDF like its PPTX or add a manifest.csv.")
+    return pairs, unmatched
+
+
+def new_batch_dir():
+    """Create a fresh working directory for a batch; returns (batch_id, input_dir)"""
+    batch_id = uuid.uuid4().hex[:12]
+    input_dir = os.path.join(BATCH_DIR, batch_id, "inputs")
+    os.makedirs(input_dir)
+    return batch_id, input_dir
+
+
+class Batch:
+    """A set of deck pairs processed on a bounded pool of worker threads
+
+    token may be a string or a callable returning the current token (so long
+    runs can refresh it). Pairs that already carry a job_id are reattached to
+    instead of being uploaded again. on_change(job) is called from the worker
+    threads whenever a job's status changes. With state_path, the batch state
+    is kept up to date in that file (see load()).
+    """
+
+    def __init__(self, client, batch_id, pairs, fields, token=None, max_concurrency=BATCH_MAX_CONCURRENCY,
+                 on_change=None, state_path=None):
+        self.client = client
+        self.batch_id = batch_id
+        self.fields = dict(fields)
+        # Batch jobs queue behind interactive ones unless the caller says otherwise
+        self.fields.setdefault("priority", BULK_PRIORITY)
+        self.token = token
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.on_change = on_change
+        self.state_path = state_path
+        self.created_at = time.time()
+        self.jobs = [
+            {"name": pair["name"], "pptx": pair["pptx"], "pdf": pair["pdf"], "user_prompt": pair.get("user_prompt"),
+             "status": "queued", "job_id": pair.get("job_id"), "percent": 0, "detail": "Waiting for a free worker",
+             "output_filename": None, "output_path": None, "metrics": None}
+            for pair in pairs
+        ]
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._saved_at = 0
+        self._remaining = len(self.jobs)
+        self._finished = threading.Event()
+        self.finished_at = None if self.jobs else self.created_at
+        if not self.jobs:
+            self._finished.set()
+
+    @property
+    def root(self):
+        return os.path.join(BATCH_DIR, self.batch_id)
+
+    @classmethod
+    def from_state(cls, state, client=None, token=None):
+        """Read-only copy of a batch from its saved state (client is used to fetch outputs from the API)"""
+        batch = cls(client, state["batch_id"], [], {}, token=token)
+        batch.created_at, batch.finished_at, batch.jobs = state["created_at"], state["finished_at"], state["jobs"]
+        if batch.finished_at is None:
+            batch._finished.clear()
+        return batch
+
+    @classmethod
+    def load(cls, state_path, client=None, token=None):
+        """Read-only copy of a batch from its state file, or None"""
+        try:
+            with open(state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls.from_state(state, client=client, token=token)
+
+    def save(self, force=False):
+        """Write the state file (progress-only updates at most every BATCH_STATE_INTERVAL seconds)"""
+        if not self.state_path:
+            return
+        # Held across snapshot and write so an older snapshot never replaces a newer one
+        with self._save_lock:
+            now = time.monotonic()
+            if not force and now - self._saved_at < BATCH_STATE_INTERVAL:
+                return
+            self._saved_at = now
+            state = {"batch_id": self.batch_id, "created_at": self.created_at, "finished_at": self.finished_at,
+                     "jobs": self.snapshot()}
+            with open(self.state_path + ".tmp", "w") as f:
+                json.dump(state, f)
+            os.replace(self.state_path + ".tmp", self.state_path)
+            backend = get_state_backend()
+            if backend.shared:
+                backend.set_json(f"batch:{self.batch_id}", state, ttl=BATCH_RETENTION_SECONDS)
+
+    def start(self):
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=f"batch-{self.batch_id}")
+        for job in self.jobs:
+            executor.submit(self._run, job)
+        executor.shutdown(wait=False)
+
+    def _token(self):
+        return self.token() if callable(self.token) else self.token
+
+    def _update(self, job, **changes):
+        with self._lock:
+            changed = changes.get("status", job["status"]) != job["status"] or changes.get("job_id", job["job_id"]) != job["job_id"]
+            job.update(changes)
+        self.save(force=changed)
+        if changed and self.on_change:
+            self.on_change(dict(job))
+
+    def _submit(self, job):
+        """Upload one deck pair; returns the API job id"""
+        fields = dict(self.fields)
+        if job["user_prompt"]:
+            fields["user_prompt"] = job["user_prompt"]
+        with open(job["pptx"], "rb") as pptx_file, open(job["pdf"], "rb") as pdf_file:
+            files = deck_files(os.path.basename(job["pptx"]), pptx_file, os.path.basename(job["pdf"]), pdf_file)
+            response = self.client.post_multipart("/upload-and-process/", fields=fields, files=files, token=self._token())
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("detail", "Unknown error")
+            except ValueError:
+                detail = f"HTTP {response.status_code}"
+            raise BatchError(detail)
+        return response.json()["job_id"]
+
+    def _run(self, job):
+        try:
+            job_id = job["job_id"]
+            if job_id and self.client.get(f"/job-status/{job_id}", token=self._token()).status_code == 404:
+                job_id = None  # the API no longer knows this job: submit it again
+            if job_id:
+                self._update(job, status="processing", detail="Reattached")
+            else:
+                self._update(job, status="uploading", detail="Uploading files...")
+                job_id = self._submit(job)
+                # Batch jobs go into the job history under the batch, not a user, so the UIs never reattach them
+                get_job_registry().register(
+                    f"batch:{self.batch_id}", job_id, pptx_name=os.path.basename(job["pptx"]),
+                    pdf_name=os.path.basename(job["pdf"]), generator_id=self.fields.get("generator_id"),
+                    user_prompt=job["user_prompt"] or self.fields.get("user_prompt"),
+                    context_window_size=self.fields.get("context_window_size"),
+                )
+                self._update(job, status="processing", job_id=job_id, percent=5, detail="Submitted")
+
+            progress_model = ProgressModel()
+            job_status = None
+            for job_status in subscribe_job_status(self.client, job_id, token=self._token(), timeout=3600):
+                if not is_terminal(job_status):
+                    estimate = progress_model.estimate(job_status)
+                    self._update(job, percent=estimate["percent"], detail=describe(estimate))
+
+            if not is_terminal(job_status):
+                self._update(job, status="failed", detail="Processing timed out")
+            elif job_status["status"] in ("failed", "cancelled"):
+                get_job_registry().update(job_id, job_status["status"], message=job_status.get("message"))
+                self._update(job, status="failed", percent=100, detail=job_status.get("message", "Unknown error"))
+            else:
+                get_job_registry().update(job_id, "completed", output_filename=job_status.get("output_filename"),
+                                          metrics=job_status.get("metrics"))
+                if job_status.get("metrics"):
+                    record_job_metrics(job_status["metrics"])
+                self._update(job, detail="Downloading output...")
+                output_path = get_download_cache().fetch(self.client, job_id, token=self._token())
+                self._update(job, status="completed", percent=100, detail="Done", output_path=output_path,
+                             output_filename=job_status.get("output_filename") or f"processed_{job['name']}.pptx",
+                             metrics=job_status.get("metrics"))
+        except (BatchError, requests.RequestException, OSError, ValueError, KeyError) as e:
+            self._update(job, status="failed", detail=str(e))
+        finally:
+            with self._lock:
+                self._remaining -= 1
+                if self._remaining == 0:
+                    self.finished_at = time.time()
+                    self._finished.set()
+            if self.finished_at:
+                self.save(force=True)
+
+    def wait(self, timeout=None):
+        """Block until every job has finished; returns False on timeout"""
+        return self._finished.wait(timeout)
+
+    def snapshot(self):
+        """Copy of the per-job state for display"""
+        with self._lock:
+            return [dict(job) for job in self.jobs]
+
+    def summary(self):
+        """Counts per status plus overall progress"""
+        jobs = self.snapshot()
+        counts = {status: 0 for status in ("queued", "uploading", "processing", "completed", "failed")}
+        for job in jobs:
+            counts[job["status"]] += 1
+        counts["total"] = len(jobs)
+        counts["percent"] = int(sum(job["percent"] for job in jobs) / len(jobs)) if jobs else 100
+        counts["done"] = self.finished_at is not None
+        return counts
+
+    def output_zip(self):
+        """Write the outputs of completed jobs into one zip and return its path"""
+        path = os.path.join(self.root, f"insightgen_batch_{self.batch_id}.zip")
+        if self.finished_at and os.path.exists(path) and os.path.getmtime(path) >= self.finished_at:
+            return path
+        os.makedirs(self.root, exist_ok=True)
+        # Other server processes may be writing the same zip
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        used_names = set()
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED) as archive:
+            for job in self.snapshot():
+                if job["status"] != "completed":
+                    continue
+                output_path = job["output_path"]
+                if not (output_path and os.path.exists(output_path)):
+                    if not (self.client and job["job_id"]):
+                        continue
+                    # Downloaded by another instance: fetch it from the API into this one's download cache
+                    output_path = get_download_cache().fetch(self.client, job["job_id"], token=self._token())
+                name = job["output_filename"]
+                base, extension = os.path.splitext(name)
+                suffix = 1
+                while name in used_names:
+                    suffix += 1
+                    name = f"{base}_{suffix}{extension}"
+                used_names.add(name)
+                archive.write(output_path, arcname=name)
+        os.replace(tmp_path, path)
+        return path
+
+
+################################################################################
+# Process-wide batch registry
+################################################################################
+
+_batches = {}
+_batches_lock = threading.Lock()
+
+
+def _drop_expired_batches(now):
+    for batch_id in [b for b, batch in _batches.items()
+                     if batch.finished_at and now - batch.finished_at > BATCH_RETENTION_SECONDS]:
+        shutil.rmtree(_batches.pop(batch_id).root, ignore_errors=True)
+
+
+def start_batch(client, batch_id, pairs, fields, token=None, max_concurrency=BATCH_MAX_CONCURRENCY):
+    """Start processing the given pairs in the background and return the Batch"""
+    batch = Batch(client, batch_id, pairs, fields, token=token, max_concurrency=max_concurrency,
+                  state_path=os.path.join(BATCH_DIR, batch_id, BATCH_STATE_NAME))
+    batch.save(force=True)
+    with _batches_lock:
+        _drop_expired_batches(time.time())
+        _batches[batch_id] = batch
+    batch.start()
+    return batch
+
+
+def get_batch(batch_id, client=None, token=None):
+    """Return a running or recently finished batch, or None
+
+    Batches started by another process on this host are read from their state
+    file, and those started by another instance from the shared state backend.
+    client and token are only used by such copies, to fetch outputs from the API.
+    """
+    batch = _batches.get(batch_id)
+    if batch is None and re.fullmatch(r"[0-9a-f]{12}", batch_id or ""):
+        batch = Batch.load(os.path.join(BATCH_DIR, batch_id, BATCH_STATE_NAME), client=client, token=token)
+        backend = get_state_backend()
+        if batch is None and backend.shared:
+            state = backend.get_json(f"batch:{batch_id}")
+            batch = Batch.from_state(state, client=client, token=token) if state else None
+    return batch
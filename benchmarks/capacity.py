@@ -0,0 +1,329 @@
+import argparse
+import base64
+import itertools
+import json
+import os
+import re
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from load_test import Recorder, free_port, percentile, start_mock, synthetic_deck
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Concurrent-user capacity of one Dash server instance.
+# Starts the mock API and the Dash server (gunicorn with gunicorn.conf.py, or
+# the single-process Flask server for comparison), then runs increasing
+# numbers of concurrent browser sessions against it over HTTP. Each session
+# loads the page and its bundles, uploads a deck pair, inspects it, submits
+# the job, follows it at the tick rate the app asks for, and downloads the
+# output, all through the same Dash callback requests a browser sends
+# (background callbacks included). For each level it reports p50/p95 latency
+# per step, errors and the server's memory. The capacity is the largest level
+# whose interactive steps all stay under --slo-ms at p95, with no errors.
+# With --instances N, N servers share the state backend in Redis (--redis-url)
+# and every request of a session goes to the next one, like a load balancer
+# without sticky sessions.
+#
+#   python benchmarks/capacity.py --users 5,10,20,40
+#   python benchmarks/capacity.py --workers 1 --threads 8 --users 10,20
+#   python benchmarks/capacity.py --server flask --users 5,10,20
+#   python benchmarks/capacity.py --instances 2 --redis-url redis://localhost:6379/0
+#
+# Run it on a machine shaped like the deployment (cores and memory) for
+# numbers that carry over.
+
+INTERACTIVE_STEPS = ("page load", "navigate", "upload", "status tick")
+GENERATOR_ID = "bgs_default"
+
+
+class DashBrowser:
+    """One browser session, speaking the Dash renderer's HTTP protocol
+
+    Each request goes to the next of base_urls in turn.
+    """
+
+    def __init__(self, base_urls, recorder):
+        self._base_urls = itertools.cycle(base_urls)
+        self.recorder = recorder
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = "gzip, br"
+        self.callbacks = {}
+
+    def url(self, path):
+        return next(self._base_urls) + path
+
+    def page_load(self):
+        started = time.perf_counter()
+        index = self.session.get(self.url("/"), timeout=60)
+        index.raise_for_status()
+        for url in re.findall(r'(?:src|href)="(/[^"]+)"', index.text):
+            self.session.get(self.url(url), timeout=60).raise_for_status()
+        self.session.get(self.url("/_dash-layout"), timeout=60).raise_for_status()
+        dependencies = self.session.get(self.url("/_dash-dependencies"), timeout=60)
+        dependencies.raise_for_status()
+        self.recorder.record("page load", time.perf_counter() - started)
+        for dependency in dependencies.json():
+            first_output = dependency["output"].strip(".").split("...")[0].split("@")[0]
+            first_input = "{id}.{property}".format(**dependency["inputs"][0])
+            self.callbacks[(first_output, first_input)] = dependency
+
+    def call(self, step, output, trigger, values):
+        """
+        Fire the callback whose first output and first input are output and
+        trigger, with values {"id.property": value} for its inputs and state.
+        Returns {"id.property": value} of the updated outputs ({} for PreventUpdate).
+        """
+        dependency = self.callbacks[(output, trigger)]
+        body = {
+            "output": dependency["output"],
+            "inputs": [dict(item, value=values.get("{id}.{property}".format(**item)))
+                       for item in dependency["inputs"]],
+            "state": [dict(item, value=values.get("{id}.{property}".format(**item)))
+                      for item in dependency["state"]],
+            "changedPropIds": [trigger],
+        }
+        started = time.perf_counter()
+        response = self.session.post(self.url("/_dash-update-component"), json=body, timeout=600)
+        # Background callbacks: the first response names the job, then the renderer polls for its result
+        interval = (dependency.get("long") or {}).get("interval", 1000) / 1000
+        while response.status_code == 200 and "cacheKey" in response.json() and "response" not in response.json():
+            job = response.json()
+            params = {"cacheKey": job["cacheKey"], "job": job["job"]}
+            while True:
+                time.sleep(interval)
+                response = self.session.post(self.url("/_dash-update-component"), params=params, json=body,
+                                             timeout=600)
+                if response.status_code != 200 or "response" in response.json():
+                    break
+        self.recorder.record(step, time.perf_counter() - started)
+        if response.status_code == 204:
+            return {}
+        response.raise_for_status()
+        return {f"{component_id}.{prop.split('@')[0]}": value
+                for component_id, props in response.json()["response"].items() for prop, value in props.items()}
+
+
+def browser_session(base_urls, recorder, user, pptx, pdf, priority):
+    browser = DashBrowser(base_urls, recorder)
+    browser.page_load()
+    browser.call("navigate", "page-content.children", "url.pathname", {"url.pathname": "/headlines-ai"})
+    client_id = browser.call("navigate", "client-id-store.data", "url.pathname",
+                             {"url.pathname": "/headlines-ai"})["client-id-store.data"]
+
+    def data_url(content):
+        return "data:application/octet-stream;base64," + base64.b64encode(content).decode("ascii")
+
+    values = {"client-id-store.data": client_id, "generator-dropdown.value": GENERATOR_ID,
+              "user-prompt.value": "Market: Vietnam", "context-window-size.value": 20, "job-priority.value": priority}
+    values["pptx-store.data"] = browser.call("upload", "pptx-store.data", "upload-pptx.contents", {
+        "upload-pptx.contents": data_url(pptx), "upload-pptx.filename": f"deck_{user}.pptx"})["pptx-store.data"]
+    values["pdf-store.data"] = browser.call("upload", "pdf-store.data", "upload-pdf.contents", {
+        "upload-pdf.contents": data_url(pdf), "upload-pdf.filename": f"deck_{user}.pdf"})["pdf-store.data"]
+
+    values["inspect-button.n_clicks"] = 1
+    inspection = browser.call("inspect", "inspection-results-store.data", "inspect-button.n_clicks", values)
+    values["inspection-results-store.data"] = inspection.get("inspection-results-store.data")
+    if not (values["inspection-results-store.data"] or {}).get("is_valid"):
+        return recorder.error("inspect", f"user {user}: inspection failed")
+
+    job_started = time.perf_counter()
+    values["process-button.n_clicks"] = 1
+    job_id = browser.call("submit", "job-id-store.data", "process-button.n_clicks", values).get("job-id-store.data")
+    if job_id is None:
+        return recorder.error("submit", f"user {user}: job submission failed")
+    values["job-id-store.data"] = job_id
+    polling = browser.call("submit", "job-poll-store.data", "job-id-store.data", values)
+    values["job-poll-store.data"] = polling["job-poll-store.data"]
+    interval = polling["job-status-interval.interval"]
+
+    for n_intervals in range(1, 100000):
+        time.sleep(interval / 1000)
+        values["job-status-interval.n_intervals"] = n_intervals
+        outputs = browser.call("status tick", "processing-completed.data", "job-status-interval.n_intervals", values)
+        if outputs.get("processing-completed.data") is True:
+            break
+        interval = outputs.get("job-status-interval.interval", interval)
+        values["job-poll-store.data"] = outputs.get("job-poll-store.data", values["job-poll-store.data"])
+    recorder.record("job (submit to result)", time.perf_counter() - job_started)
+
+    # The signed link the page shows once the job has completed
+    link = re.search(r'"href": "(/download/[^"]+)"', json.dumps(outputs.get("results-container.children")))
+    if link is None:
+        return recorder.error("download", f"user {user}: no download link")
+    response = recorder.timed("download", browser.session.get, browser.url(link.group(1)), timeout=600)
+    if response.status_code != 200:
+        recorder.error("download", f"user {user}: HTTP {response.status_code}")
+
+
+def server_memory(pids):
+    """Proportional set size of the servers and their children (shared pages counted once), or None"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    processes = []
+    for pid in pids:
+        processes.append(psutil.Process(pid))
+        processes += processes[-1].children(recursive=True)
+    total = 0
+    for process in processes:
+        try:
+            info = process.memory_full_info()
+        except psutil.Error:
+            continue
+        total += getattr(info, "pss", info.rss)
+    return total
+
+
+def start_server(args, api_url, data_dir, **extra_env):
+    """Start the Dash server and return (process, base_url) once it answers"""
+    port = free_port()
+    env = dict(os.environ, API_URL=api_url, INSIGHTGEN_DATA_DIR=data_dir,
+               UPLOAD_STORE_DIR=os.path.join(data_dir, "uploads"), PORT=str(port), GUNICORN_GRACEFUL_TIMEOUT="5",
+               **extra_env)
+    if args.server == "gunicorn":
+        env.update(GUNICORN_WORKERS=str(args.gunicorn_workers), GUNICORN_THREADS=str(args.gunicorn_threads))
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:server"]
+    else:
+        command = [sys.executable, "-c", "import sys; from main import server; "
+                   "server.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True)", str(port)]
+    log = open(args.server_log, "w") if args.server_log else subprocess.DEVNULL
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=log)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while True:
+        try:
+            requests.get(f"{base_url}/_ah/warmup", timeout=60)
+            return process, base_url
+        except requests.ConnectionError:
+            if time.time() > deadline or process.poll() is not None:
+                process.kill()
+                raise RuntimeError("The Dash server did not start")
+            time.sleep(0.1)
+
+
+def run_level(args, base_urls, users, pids):
+    recorder = Recorder()
+    peak_memory = [server_memory(pids)]
+    done = threading.Event()
+
+    def sample_memory():
+        while not done.wait(0.5):
+            memory = server_memory(pids)
+            if memory is not None:
+                peak_memory[0] = max(peak_memory[0], memory)
+
+    def session(user):
+        pptx, pdf = synthetic_deck(args.slides, args.image_kb, seed=f"capacity-{users}-{user}")
+        try:
+            browser_session(base_urls, recorder, user, pptx, pdf, args.priority)
+        except Exception as e:
+            recorder.error("session", f"user {user}: {type(e).__name__}: {str(e)}")
+
+    sampler = threading.Thread(target=sample_memory, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    threads = []
+    for user in range(users):
+        thread = threading.Thread(target=session, args=(user,), name=f"browser-{user}")
+        thread.start()
+        threads.append(thread)
+        time.sleep(args.ramp_up / users)
+    for thread in threads:
+        thread.join()
+    done.set()
+    return recorder, time.perf_counter() - started, peak_memory[0]
+
+
+def report(users, recorder, elapsed, peak_memory, slo):
+    jobs = len(recorder.latencies.get("job (submit to result)", []))
+    errors = sum(len(messages) for messages in recorder.errors.values())
+    memory = f", server memory {peak_memory / 2**20:.0f} MiB" if peak_memory else ""
+    print(f"\n== {users} users: {jobs} jobs in {elapsed:.1f} s, {errors} errors{memory} ==")
+    print(f"{'step':<24}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    within_slo = errors == 0
+    for step, values in recorder.latencies.items():
+        p95 = percentile(values, 0.95)
+        print(f"{step:<24}{len(values):>7}{percentile(values, 0.5) * 1000:>10.1f}{p95 * 1000:>10.1f}"
+              f"{max(values) * 1000:>10.1f}")
+        if step in INTERACTIVE_STEPS and p95 * 1000 > slo:
+            within_slo = False
+    for step, messages in recorder.errors.items():
+        print(f"errors in {step} ({len(messages)}): {messages[0]}")
+    return within_slo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure concurrent-user capacity of one Dash server instance")
+    parser.add_argument("--users", default="5,10,20", help="Comma-separated concurrent session counts to try")
+    parser.add_argument("--server", choices=("gunicorn", "flask"), default="gunicorn")
+    parser.add_argument("--workers", dest="gunicorn_workers", type=int, default=len(os.sched_getaffinity(0)),
+                        help="gunicorn workers (default: one per core)")
+    parser.add_argument("--threads", dest="gunicorn_threads", type=int, default=8, help="Threads per gunicorn worker")
+    parser.add_argument("--instances", type=int, default=1, help="Servers sharing one state backend")
+    parser.add_argument("--redis-url", help="Redis for the shared state backend (needed with --instances above 1)")
+    parser.add_argument("--slo-ms", type=float, default=1000, help="p95 limit for interactive steps")
+    parser.add_argument("--server-log", help="Write the server's output to this file")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="Seconds over which each level's sessions start")
+    parser.add_argument("--priority", default="normal", help="Priority sent with each job")
+    parser.add_argument("--slides", type=int, default=20, help="Slides per synthetic deck")
+    parser.add_argument("--image-kb", type=int, default=50, help="Picture size per content slide")
+    mock = parser.add_argument_group("mock API")
+    mock.add_argument("--job-duration", type=float, default=5.0, help="Seconds each simulated job takes")
+    mock.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    mock.add_argument("--latency-jitter", type=float, default=0.0, help="Up to this many more seconds, at random")
+    mock.add_argument("--download-kb", type=int, default=1024, help="Size of processed presentations")
+    mock.add_argument("--generators", type=int, default=1, help="Generators in the catalog")
+    # The mock runs every job at once
+    parser.set_defaults(workers=None)
+    args = parser.parse_args()
+    if args.instances > 1 and not args.redis_url:
+        parser.error("--instances above 1 needs --redis-url")
+
+    # Each instance gets its own data directory, as on separate machines, and
+    # they share the download link secret as a deployment would
+    state_env = {"DOWNLOAD_LINK_SECRET": secrets.token_hex(32)} if args.instances > 1 else {}
+    if args.redis_url:
+        state_env.update({"STATE_BACKEND": "redis", "STATE_REDIS_URL": args.redis_url,
+                          "STATE_KEY_PREFIX": f"insightgen-capacity-{os.getpid()}:"})
+    mock_process, api_url = start_mock(args)
+    servers = []
+    try:
+        for instance in range(args.instances):
+            servers.append(start_server(args, api_url, tempfile.mkdtemp(prefix="insightgen_capacity_"),
+                                        GAE_INSTANCE=f"capacity-{instance}", **state_env))
+        base_urls = [base_url for _, base_url in servers]
+        pids = [process.pid for process, _ in servers]
+        shape = f"gunicorn, {args.gunicorn_workers} workers x {args.gunicorn_threads} threads" if args.server == "gunicorn" else "flask"
+        if args.instances > 1:
+            shape = f"{args.instances} instances of {shape}"
+        print(f"Dash server: {shape}; idle memory {(server_memory(pids) or 0) / 2**20:.0f} MiB")
+        capacity = 0
+        for users in [int(n) for n in args.users.split(",")]:
+            recorder, elapsed, peak_memory = run_level(args, base_urls, users, pids)
+            if report(users, recorder, elapsed, peak_memory, args.slo_ms):
+                capacity = max(capacity, users)
+    finally:
+        for server_process, _ in servers:
+            server_process.terminate()
+        for server_process, _ in servers:
+            try:
+                server_process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server_process.kill()
+                server_process.wait()
+        mock_process.terminate()
+        mock_process.wait()
+    print(f"\nCapacity ({shape}): {capacity or 'below the smallest level of'} concurrent users "
+          f"with p95 under {args.slo_ms:.0f} ms for {', '.join(INTERACTIVE_STEPS)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold start of the Dash server: time from starting the process to the first
+# byte of the index page, then the bytes and time of a first page load (the
+# index plus every same-origin script and stylesheet it references, fetched
+# with Accept-Encoding: gzip, br like a browser).
+#
+#   python benchmarks/cold_start.py --runs 5
+#   python benchmarks/cold_start.py --app-dir /path/to/older/checkout    # compare with another tree
+#
+# Each run starts a fresh interpreter serving main.server with the Flask
+# development server; the first run is discarded so every measured run finds
+# compiled bytecode, as a deployed instance would.
+
+_INDEX_URL_RE = re.compile(r'(?:src|href)="(/[^"]+)"')
+SERVER_SCRIPT = "import sys; from main import server; server.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True)"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure(app_dir, data_dir, warmup):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, INSIGHTGEN_DATA_DIR=data_dir, UPLOAD_STORE_DIR=os.path.join(data_dir, "uploads"),
+               API_URL="http://127.0.0.1:9", API_MAX_RETRIES="0")
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, str(port)], cwd=app_dir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    session = requests.Session()
+    try:
+        while True:
+            try:
+                index = session.get(f"{base_url}/", timeout=30)
+                break
+            except requests.ConnectionError:
+                if process.poll() is not None or time.perf_counter() - started > 60:
+                    raise RuntimeError("The server did not start")
+                time.sleep(0.005)
+        first_byte = time.perf_counter() - started
+
+        if warmup:
+            session.get(f"{base_url}/_ah/warmup", timeout=60)
+        load_started = time.perf_counter()
+        wire_bytes = len(index.content)
+        for url in _INDEX_URL_RE.findall(index.text):
+            response = session.get(base_url + url, headers={"Accept-Encoding": "gzip, br"}, stream=True, timeout=30)
+            wire_bytes += sum(len(chunk) for chunk in response.raw.stream(65536, decode_content=False))
+        return first_byte, time.perf_counter() - load_started, wire_bytes
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start to first byte of the Dash server")
+    parser.add_argument("--app-dir", default=ROOT, help="Source tree to start (default: this one)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", action="store_true", help="Call /_ah/warmup before the first page load")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="insightgen_cold_start_") as data_dir:
+        for run in range(args.runs + 1):
+            result = measure(os.path.abspath(args.app_dir), data_dir, args.warmup)
+            if run:
+                results.append(result)
+                print(f"run {run}: first byte {result[0] * 1000:.0f} ms, first page load {result[1] * 1000:.0f} ms, "
+                      f"{result[2] / 1024:.0f} KiB")
+
+    first_bytes, loads, sizes = zip(*results)
+    print(f"median: first byte {statistics.median(first_bytes) * 1000:.0f} ms, first page load "
+          f"{statistics.median(loads) * 1000:.0f} ms, {statistics.median(sizes) / 1024:.0f} KiB on the wire")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+import argparse
+import base64
+import io
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Load test of both UIs against the mock InsightGen API.
+# N simulated users each go through the full single-deck flow: log in, load
+# the generator catalog, inspect a deck pair, submit it, follow the job until
+# it completes and download the output. Dash users call the app's callbacks
+# directly, in the order and at the tick rate the browser would (background
+# callbacks run in the user's thread, without the worker-process hop).
+# Streamlit users make the calls the script makes on each rerun, through the
+# same shared client and caches (Streamlit's own script-runner overhead is not
+# included). Reports p50/p95/p99 latency per step, memory per session and
+# API requests per job.
+#
+#   python benchmarks/load_test.py --users 20                       # both UIs
+#   python benchmarks/load_test.py --ui dash --users 50 --latency 0.05 --latency-jitter 0.1
+#   python benchmarks/load_test.py --api-url http://localhost:8080  # an already running mock
+#
+# The mock runs in a subprocess so its work does not share the driver's GIL.
+
+USERNAME, PASSWORD = "demo", "Demo1234"
+HEADER_SLIDES = 2
+
+_P_NS = 'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"'
+_A_NS = 'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+_R_NS = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+_RELS_NS = 'xmlns="http://schemas.openxmlformats.org/package/2006/relationships"'
+_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+################################################################################
+# Synthetic decks
+################################################################################
+
+def synthetic_deck(slides, image_kb, seed):
+    """(pptx, pdf) bytes of a matching deck pair that passes local pre-inspection
+
+    The first HEADER_SLIDES slides use a HEADER layout, the others have a title
+    placeholder and one incompressible 'picture'. Decks with different seeds
+    differ, so neither the inspection cache nor the upload store dedupes them.
+    """
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        slide_ids = "".join(f'<p:sldId id="{255 + n}" r:id="rId{n}"/>' for n in range(1, slides + 1))
+        archive.writestr("ppt/presentation.xml",
+                         f'<p:presentation {_P_NS} {_R_NS}><p:sldIdLst>{slide_ids}</p:sldIdLst></p:presentation>')
+        archive.writestr("ppt/_rels/presentation.xml.rels", f'<Relationships {_RELS_NS}>' + "".join(
+            f'<Relationship Id="rId{n}" Type="{_REL_TYPE}/slide" Target="slides/slide{n}.xml"/>'
+            for n in range(1, slides + 1)) + "</Relationships>")
+        for number, name in ((1, "HEADER Section"), (2, "Title Only")):
+            archive.writestr(f"ppt/slideLayouts/slideLayout{number}.xml",
+                             f'<p:sldLayout {_P_NS}><p:cSld name="{name}"/></p:sldLayout>')
+        for number in range(1, slides + 1):
+            layout = 1 if number <= HEADER_SLIDES else 2
+            title = "" if layout == 1 else '<p:nvSpPr><p:nvPr><p:ph type="title"/></p:nvPr></p:nvSpPr>'
+            text = f"<a:t>Brand power {number}: {rng.random():.6f}</a:t>"
+            archive.writestr(f"ppt/slides/slide{number}.xml",
+                             f'<p:sld {_P_NS} {_A_NS}><p:cSld><p:spTree><p:sp>{title}<p:txBody>{text}</p:txBody></p:sp>'
+                             f'</p:spTree></p:cSld></p:sld>')
+            archive.writestr(f"ppt/slides/_rels/slide{number}.xml.rels",
+                             f'<Relationships {_RELS_NS}><Relationship Id="rId1" Type="{_REL_TYPE}/slideLayout" '
+                             f'Target="../slideLayouts/slideLayout{layout}.xml"/></Relationships>')
+            if layout == 2:
+                archive.writestr(f"ppt/media/image{number}.png", rng.randbytes(image_kb * 1024))
+
+    kids = " ".join(f"{number + 2} 0 R" for number in range(1, slides + 1))
+    objects = [b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n",
+               b"2 0 obj\n<< /Type /Pages /Kids [%s] /Count %d >>\nendobj\n" % (kids.encode(), slides)]
+    for number in range(1, slides + 1):
+        objects.append(b"%d 0 obj\n<< /Type /Page /Parent 2 0 R /MediaBox [0 0 960 540] >>\nendobj\n" % (number + 2))
+    pdf = b"%PDF-1.4\n" + b"".join(objects) + b"trailer\n<< /Root 1 0 R >>\n%%EOF\n"
+    return buffer.getvalue(), pdf
+
+
+################################################################################
+# Measurements
+################################################################################
+
+class Recorder:
+    """Step latencies, errors and session memory of one load-test run"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, step, seconds):
+        with self._lock:
+            self.latencies.setdefault(step, []).append(seconds)
+
+    def error(self, step, message):
+        with self._lock:
+            self.errors.setdefault(step, []).append(message)
+
+    def timed(self, step, function, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.record(step, time.perf_counter() - started)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+
+def rss_bytes():
+    """Resident set size of this process (peak RSS if psutil is not installed)"""
+    try:
+        import psutil
+    except ImportError:
+        # ru_maxrss is in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return psutil.Process().memory_info().rss
+
+
+class MemorySampler:
+    """Peak RSS while the sessions run, sampled in a background thread"""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.baseline = rss_bytes()
+        self.peak = self.baseline
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes())
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes())
+
+
+################################################################################
+# Simulated users
+################################################################################
+
+def dash_user(app_module, recorder, user, pptx, pdf, priority):
+    """One browser session on the Dash app, driven through its callbacks"""
+    from dash.exceptions import PreventUpdate
+
+    set_progress = lambda progress: None  # noqa: E731 (progress outputs are not rendered here)
+    client_id = app_module.ensure_client_id("/headlines-ai", None)
+
+    def data_url(content):
+        return "data:application/octet-stream;base64," + base64.b64encode(content).decode("ascii")
+
+    pptx_data = recorder.timed("upload", app_module.store_pptx, data_url(pptx), f"deck_{user}.pptx")[0]
+    pdf_data = recorder.timed("upload", app_module.store_pdf, data_url(pdf), f"deck_{user}.pdf")[0]
+
+    inspection_results = recorder.timed("inspect", app_module.inspect_files, set_progress, 1, pptx_data, pdf_data)[0]
+    if not inspection_results or not inspection_results.get("is_valid"):
+        return recorder.error("inspect", f"user {user}: inspection failed")
+    recorder.timed("form", app_module.show_processing_form, inspection_results)
+
+    job_started = time.perf_counter()
+    job_id = recorder.timed("submit", app_module.process_files, set_progress, 1, pptx_data, pdf_data, "bgs_default",
+                            "Market: Vietnam", 20, priority, client_id, inspection_results)[0]
+    if job_id is None:
+        return recorder.error("submit", f"user {user}: job submission failed")
+    poll_state, interval, _ = app_module.reset_job_polling(job_id)
+
+    # Interval ticks at the rate the callback asks the browser for
+    for n_intervals in range(1, 100000):
+        time.sleep(interval / 1000)
+        try:
+            outputs = recorder.timed("status tick", app_module.update_job_status, n_intervals, job_id, False,
+                                     poll_state, inspection_results, client_id)
+        except PreventUpdate:
+            continue
+        if outputs[0] is True:
+            break
+        interval = outputs[5] if isinstance(outputs[5], int) else interval
+        poll_state = outputs[6] if isinstance(outputs[6], dict) else poll_state
+    recorder.record("job (submit to result)", time.perf_counter() - job_started)
+
+    with app_module.server.test_client() as browser:
+        response = recorder.timed("download", browser.get, app_module.download_url(job_id, f"deck_{user}.pptx"))
+        if response.status_code != 200:
+            recorder.error("download", f"user {user}: HTTP {response.status_code}")
+        response.close()
+
+
+def streamlit_user(api_url, recorder, user, pptx, pdf, priority):
+    """One Streamlit session: the API and cache calls the script makes on each rerun"""
+    from api_cache import HEALTH_CHECK_TTL, get_api_cache
+    from api_client import get_client
+    from auth_cache import get_token_verifier
+    from download_cache import get_download_cache
+    from inspection_cache import file_sha256, get_inspection_cache, inspection_key
+    from job_registry import get_job_registry
+    from job_tracker import JOB_TRACKER_REFRESH_SECONDS, start_tracking
+    from preinspect import preinspect
+    from progress_model import ProgressModel, content_slide_count
+    from streaming_upload import deck_files
+
+    api, api_cache, token_verifier = get_client(api_url), get_api_cache(), get_token_verifier()
+    # Like st.file_uploader, the session keeps its uploads in memory
+    pptx_file, pdf_file = io.BytesIO(pptx), io.BytesIO(pdf)
+    pptx_name, pdf_name = f"deck_{user}.pptx", f"deck_{user}.pdf"
+
+    def login():
+        response = api.post("/api/auth/login", json={"username": USERNAME, "password": PASSWORD})
+        response.raise_for_status()
+        data = response.json()
+        token_verifier.remember(data["access_token"], data.get("user"))
+        return data["access_token"]
+
+    def rerun(token):
+        # Every rerun checks the login and renders the sidebar and generator picker
+        token_verifier.verify(api, token)
+        api_cache.get_json(api, "/", ttl=HEALTH_CHECK_TTL, stale_ttl=HEALTH_CHECK_TTL)
+        api_cache.get_json(api, "/generators/", token=token)
+
+    def inspect(token):
+        file_hashes = (file_sha256(pptx_file), file_sha256(pdf_file))
+        cache_key = inspection_key(*file_hashes)
+        results = get_inspection_cache().get(cache_key)
+        if results is None:
+            results = preinspect(pptx_file, pdf_file)
+            if results["is_valid"]:
+                response = api.post_multipart("/inspect-files/", token=token,
+                                              files=deck_files(pptx_name, pptx_file, pdf_name, pdf_file))
+                response.raise_for_status()
+                results = response.json()
+                get_inspection_cache().put(cache_key, results)
+        return results, file_hashes
+
+    def submit(token, inspection_results, file_hashes):
+        fields = {"user_prompt": "Market: Vietnam", "context_window_size": "20", "generator_id": "bgs_default",
+                  "priority": priority}
+        response = api.post_decks("/upload-and-process/", fields=fields, token=token,
+                                  files=deck_files(pptx_name, pptx_file, pdf_name, pdf_file),
+                                  upload_id=inspection_results.get("upload_id"))
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+        content_slides = content_slide_count(inspection_results)
+        get_job_registry().register(USERNAME, job_id, pptx_name=pptx_name, pdf_name=pdf_name,
+                                    pptx_hash=file_hashes[0], pdf_hash=file_hashes[1], generator_id="bgs_default",
+                                    user_prompt=fields["user_prompt"], context_window_size=20,
+                                    content_slides=content_slides)
+        return start_tracking(api, job_id, ProgressModel(content_slides=content_slides), f"processed_{pptx_name}",
+                              token=token)
+
+    token = recorder.timed("login", login)
+    recorder.timed("rerun", rerun, token)
+    inspection_results, file_hashes = recorder.timed("inspect", inspect, token)
+    if not inspection_results.get("is_valid"):
+        return recorder.error("inspect", f"user {user}: inspection failed")
+    recorder.timed("rerun", rerun, token)
+
+    job_started = time.perf_counter()
+    tracker = recorder.timed("submit", submit, token, inspection_results, file_hashes)
+
+    # The progress fragment re-reads the tracker every JOB_TRACKER_REFRESH_SECONDS
+    while True:
+        time.sleep(JOB_TRACKER_REFRESH_SECONDS)
+        state = recorder.timed("progress refresh", tracker.snapshot)
+        if state["done"]:
+            break
+    recorder.record("job (submit to result)", time.perf_counter() - job_started)
+    if state["status"] != "completed":
+        return recorder.error("job", f"user {user}: {state['status']}: {state['message']}")
+
+    recorder.timed("rerun", rerun, token)
+    recorder.timed("download", get_download_cache().fetch, api, tracker.job_id, token=token)
+
+
+################################################################################
+# Runs
+################################################################################
+
+def request_counts(api_url):
+    counts = requests.get(f"{api_url}/_mock/stats", timeout=10).json()["requests"]
+    # Leave out the driver's own stats calls
+    return {key: count for key, count in counts.items() if "/_mock/" not in key}
+
+
+def run_ui(ui, args, api_url):
+    """Run args.users concurrent sessions of one UI; returns (recorder, memory sampler, request deltas)"""
+    if ui == "dash":
+        import dash_app
+        target, first_arg = dash_user, dash_app
+    else:
+        target, first_arg = streamlit_user, api_url
+
+    recorder = Recorder()
+    counts_before = request_counts(api_url)
+    memory = MemorySampler()
+
+    def session(user):
+        pptx, pdf = synthetic_deck(args.slides, args.image_kb, seed=f"{ui}-{user}" if args.distinct_decks else 0)
+        try:
+            target(first_arg, recorder, user, pptx, pdf, args.priority)
+        except Exception as e:
+            recorder.error("session", f"user {user}: {type(e).__name__}: {str(e)}")
+
+    threads = []
+    for user in range(args.users):
+        thread = threading.Thread(target=session, args=(user,), name=f"{ui}-user-{user}")
+        thread.start()
+        threads.append(thread)
+        time.sleep(args.ramp_up / max(args.users, 1))
+    for thread in threads:
+        thread.join()
+    memory.stop()
+
+    counts_after = request_counts(api_url)
+    deltas = {key: count - counts_before.get(key, 0) for key, count in counts_after.items()
+              if count > counts_before.get(key, 0)}
+    return recorder, memory, deltas
+
+
+def report(ui, args, recorder, memory, deltas):
+    jobs = len(recorder.latencies.get("job (submit to result)", []))
+    print(f"\n== {ui}: {args.users} users, {jobs} jobs finished ==")
+    print(f"{'step':<24}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, values in recorder.latencies.items():
+        print(f"{step:<24}{len(values):>7}" + "".join(
+            f"{percentile(values, fraction) * 1000:>10.1f}" for fraction in (0.5, 0.95, 0.99)) +
+            f"{max(values) * 1000:>10.1f}")
+
+    per_session = (memory.peak - memory.baseline) / max(args.users, 1)
+    print(f"memory: baseline {memory.baseline / 2**20:.1f} MiB, peak {memory.peak / 2**20:.1f} MiB, "
+          f"{per_session / 2**20:.2f} MiB per session")
+
+    print(f"API requests per job ({sum(deltas.values())} in total):")
+    for key, count in sorted(deltas.items(), key=lambda item: -item[1]):
+        print(f"  {key:<40}{count / max(jobs, 1):>8.1f}")
+
+    for step, messages in recorder.errors.items():
+        print(f"errors in {step} ({len(messages)}): {messages[0]}")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock(args):
+    """Start mock_api.py in a subprocess and return (process, base_url)"""
+    port = free_port()
+    command = [sys.executable, os.path.join(ROOT, "mock_api.py"), "--port", str(port),
+               "--job-duration", str(args.job_duration), "--slides", str(args.slides),
+               "--latency", str(args.latency), "--latency-jitter", str(args.latency_jitter),
+               "--download-kb", str(args.download_kb), "--generators", str(args.generators)]
+    if args.workers:
+        command += ["--workers", str(args.workers)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 10
+    while True:
+        try:
+            requests.get(f"{base_url}/_mock/stats", timeout=1)
+            return process, base_url
+        except requests.ConnectionError:
+            if time.time() > deadline or process.poll() is not None:
+                process.kill()
+                raise RuntimeError("The mock API did not start")
+            time.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Dash and Streamlit flows against the mock API")
+    parser.add_argument("--ui", choices=("dash", "streamlit", "both"), default="both")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent sessions per UI")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="Seconds over which the sessions start")
+    parser.add_argument("--priority", default="normal", help="Priority sent with each job")
+    parser.add_argument("--slides", type=int, default=20, help="Slides per synthetic deck")
+    parser.add_argument("--image-kb", type=int, default=50, help="Picture size per content slide")
+    parser.add_argument("--same-decks", dest="distinct_decks", action="store_false",
+                        help="Give every user the same deck pair (exercises the inspection cache and upload store)")
+    parser.add_argument("--api-url", help="Use an already running mock instead of starting one")
+    mock = parser.add_argument_group("mock API (ignored with --api-url)")
+    mock.add_argument("--job-duration", type=float, default=5.0, help="Seconds each simulated job takes")
+    mock.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    mock.add_argument("--latency-jitter", type=float, default=0.0, help="Up to this many more seconds, at random")
+    mock.add_argument("--download-kb", type=int, default=1024, help="Size of processed presentations")
+    mock.add_argument("--generators", type=int, default=1, help="Generators in the catalog")
+    mock.add_argument("--workers", type=int, help="Jobs the mock runs at once (default: unlimited)")
+    args = parser.parse_args()
+
+    process, api_url = (None, args.api_url.rstrip("/")) if args.api_url else start_mock(args)
+    # Both apps read their configuration at import: point them at the mock and keep
+    # their caches, job registry and upload store out of the real data directory
+    data_dir = tempfile.mkdtemp(prefix="insightgen_load_test_")
+    os.environ.update(API_URL=api_url, INSIGHTGEN_DATA_DIR=data_dir,
+                      UPLOAD_STORE_DIR=os.path.join(data_dir, "uploads"))
+    try:
+        for ui in (("dash", "streamlit") if args.ui == "both" else (args.ui,)):
+            recorder, memory, deltas = run_ui(ui, args, api_url)
+            report(ui, args, recorder, memory, deltas)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
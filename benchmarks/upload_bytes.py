@@ -0,0 +1,94 @@
+import argparse
+import io
+import os
+import random
+import sys
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_client import APIClient
+from mock_api import start_in_thread
+from streaming_upload import deck_files
+
+# Request bytes on the wire for one inspect + process round trip against the
+# local mock API, with and without upload compression and upload-id reuse.
+#
+#   python benchmarks/upload_bytes.py                      # synthetic deck pair
+#   python benchmarks/upload_bytes.py --pptx deck.pptx --pdf deck.pdf
+
+SCENARIOS = [
+    # (name, client upload compression, mock accepts compression, mock keeps uploads)
+    ("baseline", "none", False, False),
+    ("compressed", "auto", True, False),
+    ("compressed + upload id", "auto", True, True),
+]
+
+
+def synthetic_pptx(slides, image_kb):
+    """Zip of slide XML plus one incompressible 'picture' per slide, like a real deck"""
+    rng = random.Random(1)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for number in range(1, slides + 1):
+            shapes = "".join(f"<p:sp><p:txBody><a:t>Brand power {number}.{i}: {rng.random():.3f}</a:t></p:txBody></p:sp>"
+                             for i in range(40))
+            archive.writestr(f"ppt/slides/slide{number}.xml", f"<p:sld><p:cSld><p:spTree>{shapes}</p:spTree></p:cSld></p:sld>")
+            archive.writestr(f"ppt/media/image{number}.png", rng.randbytes(image_kb * 1024))
+    return buffer.getvalue()
+
+
+def synthetic_pdf(slides):
+    """PDF with uncompressed text content streams, as exported by many tools"""
+    rng = random.Random(2)
+    parts = [b"%PDF-1.4\n"]
+    for number in range(1, slides + 1):
+        text = "\n".join(f"BT /F1 10 Tf 72 {700 - i * 12} Td (Brand power {number}.{i}: {rng.random():.3f}) Tj ET"
+                         for i in range(200)).encode()
+        parts.append(b"%d 0 obj\n<< /Length %d >>\nstream\n" % (number + 2, len(text)) + text + b"\nendstream\nendobj\n")
+    parts.append(b"trailer\n<< /Root 1 0 R >>\n%%EOF\n")
+    return b"".join(parts)
+
+
+def run_scenario(name, client_compression, compression, upload_ids, pptx, pdf):
+    server, base_url = start_in_thread(job_duration=0.1, compression=compression, upload_ids=upload_ids)
+    try:
+        client = APIClient(base_url, upload_compression=client_compression)
+        started = time.perf_counter()
+        files = deck_files("deck.pptx", io.BytesIO(pptx), "deck.pdf", io.BytesIO(pdf))
+        inspection = client.post_multipart("/inspect-files/", files=files).json()
+        files = deck_files("deck.pptx", io.BytesIO(pptx), "deck.pdf", io.BytesIO(pdf))
+        response = client.post_decks("/upload-and-process/", fields={"generator_id": "bgs_default"}, files=files,
+                                     upload_id=inspection.get("upload_id"))
+        response.raise_for_status()
+        elapsed = time.perf_counter() - started
+        client.close()
+        return name, server.state.bytes_received, server.state.bytes_decoded, elapsed
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare request bytes on the wire for deck uploads")
+    parser.add_argument("--pptx", help="PPTX file to upload (default: synthetic)")
+    parser.add_argument("--pdf", help="PDF file to upload (default: synthetic)")
+    parser.add_argument("--slides", type=int, default=20, help="Slides in the synthetic decks")
+    parser.add_argument("--image-kb", type=int, default=100, help="Picture size per synthetic slide")
+    args = parser.parse_args()
+
+    pptx = open(args.pptx, "rb").read() if args.pptx else synthetic_pptx(args.slides, args.image_kb)
+    pdf = open(args.pdf, "rb").read() if args.pdf else synthetic_pdf(args.slides)
+    print(f"PPTX {len(pptx) / 1024:.0f} KiB, PDF {len(pdf) / 1024:.0f} KiB")
+    print(f"{'scenario':<26}{'on the wire':>14}{'decoded':>14}{'vs baseline':>13}{'time':>9}")
+
+    baseline = None
+    for scenario in SCENARIOS:
+        name, received, decoded, elapsed = run_scenario(*scenario, pptx, pdf)
+        baseline = baseline or received
+        print(f"{name:<26}{received / 1024:>10.0f} KiB{decoded / 1024:>10.0f} KiB{received / baseline:>12.0%}"
+              f"{elapsed:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
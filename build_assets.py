@@ -0,0 +1,212 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import urllib.parse
+
+import dash_bootstrap_components as dbc
+
+# Static asset build for the Dash app, run before deploying:
+#
+#   python build_assets.py
+#
+# Bundles Bootstrap, the solid Font Awesome style and every stylesheet in
+# assets/ (in the order Dash would load them) into one minified stylesheet,
+# vendors the icon fonts, and writes everything to assets/dist/ under
+# content-hash file names with .gz and .br variants next to them.
+# assets/dist/manifest.json maps each logical name to its fingerprinted path;
+# dash_app serves the bundle instead of the CDN stylesheets when it exists
+# (with --no-vendor, next to them).
+# Fingerprinted files never change, so they are served with an immutable
+# one-year cache lifetime (app.yaml, and precompressed.py outside App Engine).
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(ROOT, "assets")
+DIST_DIR = os.path.join(ASSETS_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+# Downloaded vendor files, so rebuilds do not depend on the CDNs
+ASSET_CACHE_DIR = os.getenv("ASSET_CACHE_DIR", os.path.join(ROOT, ".asset_cache"))
+
+FONT_AWESOME_VERSION = "5.15.4"
+# The app only uses the solid icon style ("fas")
+VENDOR_STYLESHEETS = [
+    dbc.themes.BOOTSTRAP,
+    f"https://use.fontawesome.com/releases/v{FONT_AWESOME_VERSION}/css/fontawesome.css",
+    f"https://use.fontawesome.com/releases/v{FONT_AWESOME_VERSION}/css/solid.css",
+]
+BUNDLE_NAME = "app.css"
+IMAGE_EXTENSIONS = (".svg", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico")
+# Already compressed formats (woff2, png, ...) gain nothing from another pass
+PRECOMPRESS_EXTENSIONS = (".css", ".js", ".json", ".svg", ".ttf", ".eot")
+FINGERPRINT_LENGTH = 12
+
+_CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+# Strings and comments first, so that the rest is only ever whitespace and punctuation between tokens
+_CSS_TOKEN_RE = re.compile(r"""("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|(/\*.*?\*/)|(\s+)|([{};,>:()]|[^"'/\s{};,>:()]+|/)""", re.S)
+# Whitespace after these (a space before ":" or "(" can be significant: "a :hover", "and (...)")
+_CSS_TIGHT_BEFORE = set("{};,>:(")
+# Whitespace before these
+_CSS_TIGHT_AFTER = set("{};,>)")
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """{"assets": {logical name: fingerprinted path relative to assets/}, "vendored": bool}, or {} before the first build"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def fingerprint(name, data):
+    base, ext = os.path.splitext(name)
+    return f"{base}.{hashlib.sha256(data).hexdigest()[:FINGERPRINT_LENGTH]}{ext}"
+
+
+def fetch(url):
+    """Contents of a vendor URL, downloaded once into ASSET_CACHE_DIR"""
+    cached = os.path.join(ASSET_CACHE_DIR, hashlib.sha256(url.encode()).hexdigest()[:16] + "-"
+                          + os.path.basename(urllib.parse.urlsplit(url).path))
+    if not os.path.exists(cached):
+        import requests
+        response = requests.get(url, timeout=60)
+        response.raise_for_status()
+        os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+        with open(cached + ".tmp", "wb") as f:
+            f.write(response.content)
+        os.replace(cached + ".tmp", cached)
+    with open(cached, "rb") as f:
+        return f.read()
+
+
+def read_source(source):
+    """Bytes of a URL or of a path under assets/"""
+    if urllib.parse.urlsplit(source).scheme in ("http", "https"):
+        return fetch(source)
+    with open(os.path.join(ASSETS_DIR, source), "rb") as f:
+        return f.read()
+
+
+def minify_css(css):
+    """Drop comments (except /*! licence notices) and all whitespace that does not separate tokens"""
+    out = []
+    for string, comment, space, other in _CSS_TOKEN_RE.findall(css):
+        if comment:
+            if comment.startswith("/*!"):
+                out.append(comment)
+        elif space:
+            out.append(" ")
+        else:
+            out.append(string or other)
+    tokens = []
+    for i, token in enumerate(out):
+        if token == " ":
+            prev = tokens[-1] if tokens else ""
+            following = out[i + 1] if i + 1 < len(out) else ""
+            if (not prev or not following or following == " " or prev in _CSS_TIGHT_BEFORE
+                    or following in _CSS_TIGHT_AFTER):
+                continue
+        elif token == "}" and tokens and tokens[-1] == ";":
+            tokens.pop()
+        tokens.append(token)
+    return "".join(tokens)
+
+
+class AssetBuild:
+    """Writes fingerprinted files (and their compressed variants) to the dist directory"""
+
+    def __init__(self, dist_dir=DIST_DIR):
+        self.dist_dir = dist_dir
+        self.written = []
+
+    def emit(self, name, data):
+        """Write data under its fingerprinted name; returns the file name"""
+        from precompressed import compress, supported_encodings
+
+        hashed = fingerprint(name, data)
+        path = os.path.join(self.dist_dir, hashed)
+        if os.path.exists(path):
+            # Referenced more than once
+            return hashed
+        with open(path, "wb") as f:
+            f.write(data)
+        self.written.append((hashed, len(data)))
+        if hashed.endswith(PRECOMPRESS_EXTENSIONS):
+            for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+                if encoding not in supported_encodings():
+                    continue
+                compressed = compress(data, encoding)
+                if len(compressed) < len(data):
+                    with open(path + suffix, "wb") as f:
+                        f.write(compressed)
+                    self.written.append((hashed + suffix, len(compressed)))
+        return hashed
+
+    def inline_urls(self, css, source):
+        """Vendor every file a stylesheet references and point its url() at the fingerprinted copy"""
+        def replace(match):
+            ref = match.group(2).strip()
+            if ref.startswith(("data:", "#")):
+                return match.group(0)
+            # Keep ?#iefix and #fontname suffixes of font references
+            split = re.match(r"([^?#]*)(.*)", ref)
+            target, suffix = split.group(1), split.group(2)
+            if urllib.parse.urlsplit(source).scheme:
+                target_source = urllib.parse.urljoin(source, target)
+            else:
+                target_source = os.path.normpath(os.path.join(os.path.dirname(source), target))
+            hashed = self.emit(os.path.basename(target), read_source(target_source))
+            return f'url("{hashed}{suffix}")'
+
+        return _CSS_URL_RE.sub(replace, css)
+
+    def build(self, stylesheets, images, vendored):
+        if os.path.isdir(self.dist_dir):
+            shutil.rmtree(self.dist_dir)
+        os.makedirs(self.dist_dir)
+
+        parts = []
+        for source in stylesheets:
+            css = read_source(source).decode("utf-8")
+            # The bundle replaces the @charset of each part
+            css = re.sub(r'^\ufeff?@charset\s+"[^"]*";', "", css)
+            parts.append(minify_css(self.inline_urls(css, source)))
+        assets = {BUNDLE_NAME: "dist/" + self.emit(BUNDLE_NAME, "\n".join(parts).encode("utf-8"))}
+        for name in images:
+            assets[name] = "dist/" + self.emit(name, read_source(name))
+
+        manifest = {"assets": assets, "vendored": vendored}
+        with open(os.path.join(self.dist_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        return manifest
+
+
+def local_assets():
+    """Stylesheets (in Dash's load order) and images at the top level of assets/"""
+    names = sorted(name for name in os.listdir(ASSETS_DIR) if os.path.isfile(os.path.join(ASSETS_DIR, name)))
+    return [n for n in names if n.endswith(".css")], [n for n in names if n.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build fingerprinted, pre-compressed static assets for the Dash app")
+    parser.add_argument("--no-vendor", action="store_true",
+                        help="Only bundle the local stylesheets (Bootstrap and Font Awesome stay on their CDNs)")
+    args = parser.parse_args()
+
+    from precompressed import supported_encodings
+    if "br" not in supported_encodings():
+        print("brotli is not installed: writing gzip variants only")
+
+    stylesheets, images = local_assets()
+    if not args.no_vendor:
+        stylesheets = VENDOR_STYLESHEETS + stylesheets
+    build = AssetBuild()
+    build.build(stylesheets, images, vendored=not args.no_vendor)
+    for name, size in build.written:
+        print(f"{size / 1024:8.1f} KiB  dist/{name}")
+
+
+if __name__ == "__main__":
+    main()
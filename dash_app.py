@@ -1,16 +1,44 @@
+# Imported first so the startup report covers everything below
+import startup_timing
+
 import dash
-from dash import dcc, html, Input, Output, State, callback
+from dash import dcc, html, dash_table, Input, Output, State, callback
 import dash_bootstrap_components as dbc
 from dash.exceptions import PreventUpdate
+import flask
+import hashlib
 import requests
 import os
-import base64
+import re
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
 from dotenv import load_dotenv
 
 # Keep your existing imports for the Headlines AI page
 # e.g., time, io, pathlib, etc., if you need them for the callbacks
 
-from params import DEFAULT_FEW_SHOT_EXAMPLES
+from params import DATA_DIR, DEFAULT_FEW_SHOT_EXAMPLES
+from api_client import get_client
+from api_metrics import get_api_metrics
+from precompressed import CompressedStatic
+from build_assets import BUNDLE_NAME, load_manifest
+from streaming_upload import deck_files
+from upload_store import UploadNotFound, get_upload_store
+from job_progress import (BULK_PRIORITY, INTERACTIVE_PRIORITY, JOB_PRIORITIES, CancelRejected, cancel_job,
+                          latest_status, watch_job)
+from poll_scheduler import PollScheduler
+from progress_model import ProgressModel, content_slide_count, describe, record_job_metrics
+from download_cache import download_signature_valid, get_download_cache, sign_download
+from api_cache import HEALTH_CHECK_TTL, get_api_cache
+from inspection_cache import get_inspection_cache, inspection_key
+from preinspect import preinspect
+from job_registry import METRIC_FIELDS, get_job_registry, resumable_job
+from batch import BATCH_MAX_CONCURRENCY, BatchError, add_input, collect_pairs, get_batch, new_batch_dir, start_batch
+from state_backend import get_state_backend
+
+startup_timing.mark("imports")
 
 # Load environment variables
 load_dotenv()
@@ -21,12 +49,82 @@ API_URL = os.getenv("API_URL", "https://insightgen-api-xxxxxx.us-central1.run.ap
 
 print(f"Using API URL: {API_URL}")
 
+# Shared pooled client (keep-alive connections, retries on idempotent calls)
+api = get_client(API_URL)
+
+# Server-side store for uploaded decks (dcc.Store only holds the handle)
+upload_store = get_upload_store()
+
+# Local disk cache for processed presentations (served by the /download/ route)
+download_cache = get_download_cache()
+
+# TTL cache for read-mostly endpoints (generator catalog, API status)
+api_cache = get_api_cache()
+
+# Inspection results keyed by the SHA-256 of both files
+inspection_cache = get_inspection_cache()
+
+# Submitted jobs per browser, so a reloaded page can resume tracking unfinished ones
+job_registry = get_job_registry()
+
+# Inspection and job submission upload the decks in background callbacks that run
+# in worker processes (started from a forkserver, see background_jobs.py), so a
+# large upload never ties up a web server thread. Their progress and results go
+# through this disk cache, or through the state backend when it is shared by
+# several instances (STATE_BACKEND=redis).
+DASH_BACKGROUND_CACHE_DIR = os.getenv("DASH_BACKGROUND_CACHE_DIR", os.path.join(DATA_DIR, "dash_callbacks"))
+
+
+class DeferredCallbackManager:
+    """DiskcacheManager created on first use; its imports (multiprocess, dill, psutil) slow down cold starts"""
+
+    def __init__(self, directory, app_module):
+        self.directory = directory
+        self.app_module = app_module
+        self._manager = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._manager is None:
+                import diskcache
+                from background_jobs import ForkserverDiskcacheManager, StateCache
+                backend = get_state_backend()
+                # An in-process backend is not visible to the callback processes
+                if backend.shared and not backend.process_local:
+                    cache = StateCache(backend)
+                else:
+                    cache = diskcache.Cache(self.directory)
+                # Callbacks registered before this point are picked up by the new manager
+                self._manager = ForkserverDiskcacheManager(cache, self.app_module)
+            return self._manager
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+background_callback_manager = DeferredCallbackManager(DASH_BACKGROUND_CACHE_DIR, __name__)
+
 # External stylesheets
 external_stylesheets = [
     dbc.themes.BOOTSTRAP,
     "https://use.fontawesome.com/releases/v5.15.4/css/all.css"
 ]
 
+# Fingerprinted build of the stylesheets and images (python build_assets.py).
+# The bundle includes assets/*.css, so Dash must not load those again.
+asset_manifest = load_manifest()
+assets_ignore = ""
+if asset_manifest:
+    bundle = "/assets/" + asset_manifest["assets"][BUNDLE_NAME]
+    external_stylesheets = [bundle] if asset_manifest["vendored"] else external_stylesheets + [bundle]
+    assets_ignore = r"\.css$"
+
+
+def asset_url(name):
+    """URL of an asset in assets/, fingerprinted when it is part of the build"""
+    return "/assets/" + asset_manifest.get("assets", {}).get(name, name)
+
 ################################################################################
 # PAGE 0: HOME PAGE
 ################################################################################
@@ -168,7 +266,11 @@ def headlines_ai_layout():
                                 color="primary",
                                 className="mt-3 w-100",
                                 n_clicks=0
-                            )
+                            ),
+                            # Shown while the files are being uploaded for inspection
+                            dbc.Progress(id="inspect-upload-progress", value=0, className="mt-2", style={"display": "none"}),
+                            dbc.Button("Cancel", id="inspect-cancel-button", color="link", size="sm",
+                                       className="mt-1", style={"display": "none"})
                         ], className="text-center")
             ])
         ], className="mb-4"),
@@ -176,6 +278,10 @@ def headlines_ai_layout():
                 # Processing form section
                 html.Div(id="processing-form-container", style={"display": "none"}),
 
+                # Shown while a job is running
+                dbc.Button([html.I(className="fas fa-stop-circle me-2"), "Cancel job"], id="cancel-job-button",
+                           color="outline-danger", className="w-100 mb-4", n_clicks=0, style={"display": "none"}),
+
                 # Keep an empty processing status container for callback references
                 html.Div(id="processing-status-container", style={"display": "none"}),
             ], width=7),
@@ -191,6 +297,107 @@ def headlines_ai_layout():
         ]),
     ])
 
+################################################################################
+# PAGE 1b: BATCH PROCESSING
+################################################################################
+
+def batch_layout():
+    """
+    Layout for the 'Batch' page: upload many deck pairs (a zip or loose files),
+    submit them together and follow every job in one table.
+    """
+    generators = fetch_generators()
+    generator_options = {g["name"]: g["id"] for g in generators} if generators else {"Brand Growth Study (Default)": "bgs_default"}
+
+    return html.Div([
+        html.H2("Batch Processing", className="mb-3"),
+        html.P(
+            "Upload a zip (or several PPTX and PDF files). Each PDF is paired with the PPTX of the same name; "
+            "add a manifest.csv with pptx, pdf and optional name / user_prompt columns to pair them explicitly.",
+            className="text-muted mb-4"
+        ),
+
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader("Upload Decks"),
+                    dbc.CardBody([
+                        dcc.Upload(
+                            id='upload-batch',
+                            children=html.Div([
+                                html.I(className="fas fa-file-archive me-2"),
+                                'Drag and Drop or ',
+                                html.A('Select Zip or Deck Files')
+                            ], className="small"),
+                            style={
+                                'width': '100%',
+                                'height': '45px',
+                                'lineHeight': '45px',
+                                'borderWidth': '1px',
+                                'borderStyle': 'dashed',
+                                'borderRadius': '5px',
+                                'textAlign': 'center',
+                                'margin-bottom': '15px'
+                            },
+                            multiple=True
+                        ),
+                        html.Div(id='batch-upload-output', className="small"),
+
+                        html.Label("Select Generator", className="small mt-3"),
+                        dcc.Dropdown(
+                            id="batch-generator-dropdown",
+                            options=[{"label": name, "value": generator_id} for name, generator_id in generator_options.items()],
+                            value=next(iter(generator_options.values())),
+                            clearable=False
+                        ),
+
+                        html.Label("Prompt (used for every deck without its own prompt in the manifest)", className="small mt-3"),
+                        dbc.Textarea(id="batch-user-prompt", style={"height": "100px"}),
+
+                        html.Label("Slide Memory", className="small mt-3"),
+                        dcc.Slider(
+                            id="batch-context-window-size",
+                            min=0,
+                            max=50,
+                            step=1,
+                            value=20,
+                            marks={i: str(i) for i in range(0, 51, 10)},
+                            tooltip={"placement": "bottom", "always_visible": True}
+                        ),
+
+                        html.Label("Priority", className="small mt-3"),
+                        dcc.Dropdown(
+                            id="batch-priority",
+                            options=[{"label": priority.title(), "value": priority} for priority in JOB_PRIORITIES],
+                            value=BULK_PRIORITY,
+                            clearable=False
+                        ),
+
+                        html.Label("Parallel jobs", className="small mt-3"),
+                        dcc.Slider(
+                            id="batch-concurrency",
+                            min=1,
+                            max=max(BATCH_MAX_CONCURRENCY, 16),
+                            step=1,
+                            value=BATCH_MAX_CONCURRENCY,
+                            tooltip={"placement": "bottom", "always_visible": True}
+                        ),
+
+                        dbc.Button("Submit Batch", id="batch-submit-button", color="primary", className="mt-3 w-100", n_clicks=0)
+                    ])
+                ], className="mb-4"),
+            ], width=5),
+
+            dbc.Col([
+                html.Div(id="batch-submit-output"),
+                html.Div(id="batch-status-container"),
+            ], width=7),
+        ]),
+
+        # Ticks while a batch is running (disabled again once it has finished)
+        dcc.Interval(id='batch-status-interval', interval=2000, n_intervals=0),
+    ])
+
 ################################################################################
 # PAGE 2: GENERATORS (dummy boxes)
 ################################################################################
@@ -243,16 +450,99 @@ def generators_layout():
     ])
 
 ################################################################################
-# PAGE 3: LOGS (empty page)
+# PAGE 3: LOGS (job history and latency)
 ################################################################################
 
+LOGS_PAGE_SIZE = 20
+
+# Job history table columns: (column id, header)
+LOGS_COLUMNS = [
+    ("created", "Submitted"),
+    ("pptx_name", "Presentation"),
+    ("generator_id", "Generator"),
+    ("status", "Status"),
+    ("total_slides", "Slides"),
+    ("content_slides_processed", "Content Slides"),
+    ("total_time_seconds", "Total Time (s)"),
+    ("average_time_per_content_slide", "Time per Slide (s)"),
+    ("errors", "Errors"),
+    ("owner", "Submitted By"),
+    ("job_id", "Job ID"),
+]
+
 def logs_layout():
     """
-    Layout for the 'Logs' page (currently empty).
+    Layout for the 'Logs' page: filterable job history (paginated server-side)
+    and daily latency percentiles from the local job registry.
     """
+    generator_options = [{"label": g, "value": g} for g in job_registry.generator_ids()]
+
     return html.Div([
         html.H1("Logs", className="mt-4 mb-3"),
-        html.P("This page will show logs and history of processed presentations in the future.")
+        html.P("History of processed presentations and processing times.", className="lead mb-4"),
+
+        dbc.Card([
+            dbc.CardHeader("Processing Time"),
+            dbc.CardBody([
+                dbc.Row([
+                    dbc.Col([
+                        dcc.RadioItems(
+                            id="logs-latency-metric",
+                            options=[
+                                {"label": " Total time per job", "value": "total_time_seconds"},
+                                {"label": " Time per content slide", "value": "average_time_per_content_slide"},
+                            ],
+                            value="total_time_seconds",
+                            inline=True,
+                            inputClassName="me-1",
+                            labelClassName="me-3 small"
+                        )
+                    ], width=8),
+                    dbc.Col([
+                        dcc.Dropdown(
+                            id="logs-latency-days",
+                            options=[{"label": f"Last {d} days", "value": d} for d in (7, 30, 90, 365)],
+                            value=30,
+                            clearable=False
+                        )
+                    ], width=4),
+                ], className="mb-2"),
+                dcc.Graph(id="logs-latency-graph", config={"displayModeBar": False}, style={"height": "320px"}),
+            ])
+        ], className="mb-4"),
+
+        dbc.Card([
+            dbc.CardHeader("Job History"),
+            dbc.CardBody([
+                dbc.Row([
+                    dbc.Col(dbc.Input(id="logs-search", placeholder="Search file name, job ID or user...",
+                                      debounce=True), width=4),
+                    dbc.Col(dcc.Dropdown(
+                        id="logs-status-filter",
+                        options=[{"label": s.title(), "value": s} for s in ("processing", "completed", "failed", "cancelled")],
+                        placeholder="All statuses"
+                    ), width=2),
+                    dbc.Col(dcc.Dropdown(id="logs-generator-filter", options=generator_options,
+                                         placeholder="All generators"), width=3),
+                    dbc.Col(dcc.DatePickerRange(id="logs-date-range", clearable=True,
+                                                start_date_placeholder_text="From",
+                                                end_date_placeholder_text="To"), width=3),
+                ], className="mb-3"),
+                html.P(id="logs-summary", className="text-muted small"),
+                dash_table.DataTable(
+                    id="logs-table",
+                    columns=[{"name": header, "id": column_id} for column_id, header in LOGS_COLUMNS],
+                    page_action="custom",
+                    page_current=0,
+                    page_size=LOGS_PAGE_SIZE,
+                    style_table={"overflowX": "auto"},
+                    style_cell={"fontSize": "0.85rem", "textAlign": "left", "whiteSpace": "nowrap"},
+                    style_data_conditional=[
+                        {"if": {"filter_query": "{status} = failed"}, "color": "#dc3545"},
+                    ],
+                ),
+            ])
+        ]),
     ])
 
 ################################################################################
@@ -293,10 +583,115 @@ def about_layout():
 
 app = dash.Dash(__name__,
                 external_stylesheets=external_stylesheets,
-                suppress_callback_exceptions=True)
+                assets_ignore=assets_ignore,
+                suppress_callback_exceptions=True,
+                background_callback_manager=background_callback_manager)
 server = app.server
 app.title = "InsightGen: AI-Powered Insights"
 
+startup_timing.mark("app setup")
+
+# Component bundles and assets are compressed once per process and served from memory
+compressed_static = CompressedStatic(app.config.assets_folder)
+compressed_static.install(server)
+
+_first_request_lock = threading.Lock()
+_first_request_seen = False
+
+@server.before_request
+def report_startup_timing():
+    """Log the startup report when the first request arrives"""
+    global _first_request_seen
+    if _first_request_seen:
+        return
+    with _first_request_lock:
+        if not _first_request_seen:
+            _first_request_seen = True
+            startup_timing.mark("first request")
+            startup_timing.log_report()
+
+def preload():
+    """
+    Deferred work that forked server workers can share copy-on-write (see
+    gunicorn.conf.py): import Plotly and numpy, and compress the component bundles.
+    Returns the number of compressed bundles.
+    """
+    import plotly.graph_objects  # noqa: F401 (Logs page graphs)
+    # The first JSON response imports numpy (plotly's orjson engine); request
+    # threads racing through that import can crash the process
+    server.test_client().get("/_dash-layout").close()
+    return compressed_static.warm(server)
+
+@server.route("/_ah/warmup")
+def warmup():
+    """
+    App Engine warmup request (inbound_services: warmup in app.yaml): do the
+    work deferred from import before the instance receives user traffic.
+    """
+    background_callback_manager.get().start()
+    bundles = preload()
+    try:
+        # Opens the pooled keep-alive connection and caches the generator catalog
+        api_cache.get_json(api, "/", ttl=HEALTH_CHECK_TTL, stale_ttl=HEALTH_CHECK_TTL)
+        api_cache.get_json(api, "/generators/")
+        api_reachable = True
+    except (requests.RequestException, ValueError):
+        api_reachable = False
+    startup_timing.mark("warmup")
+    return flask.jsonify(dict(startup_timing.report(), compressed_bundles=bundles, api_reachable=api_reachable))
+
+@server.route("/batch-download/<batch_id>")
+def download_batch(batch_id):
+    """
+    Serve the outputs of a batch's completed jobs as one zip file.
+    """
+    batch = get_batch(batch_id, client=api)
+    if batch is None:
+        flask.abort(404)
+    return flask.send_file(
+        batch.output_zip(),
+        mimetype="application/zip",
+        as_attachment=True,
+        download_name=f"insightgen_batch_{batch_id}.zip",
+    )
+
+def download_url(job_id, filename):
+    """Signed link to a job's output, for the browser that submitted the job"""
+    return f"/download/{job_id}?{urlencode(dict(sign_download(job_id), filename=filename))}"
+
+@server.route("/download/<job_id>")
+def download_output(job_id):
+    """
+    Serve a processed presentation from the local download cache, fetching it
+    from the API on first use. The file is streamed from disk, not held in memory.
+    Only links signed by download_url are served: job ids are listed on the Logs page.
+    """
+    args = flask.request.args
+    if not download_signature_valid(job_id, args.get("expires"), args.get("signature")):
+        flask.abort(403)
+    filename = args.get("filename") or f"processed_{job_id}.pptx"
+    try:
+        output_path = download_cache.fetch(api, job_id)
+    except ValueError:
+        flask.abort(404)
+    except requests.RequestException as e:
+        print(f"Error downloading output for job {job_id}: {str(e)}")
+        flask.abort(502)
+    return flask.send_file(
+        output_path,
+        mimetype="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+        as_attachment=True,
+        download_name=filename,
+    )
+
+@server.route("/metrics")
+def metrics():
+    """
+    Prometheus metrics of this server's calls to the InsightGen API
+    (timing per phase, sizes and status codes; see api_metrics.py).
+    """
+    return flask.Response(get_api_metrics().prometheus_text(), mimetype="text/plain; version=0.0.4")
+
 # We'll store your existing callbacks in this file
 # or define them below. For a multi-page app, we can keep
 # them here, referencing the IDs from the Headlines AI layout.
@@ -306,7 +701,7 @@ sidebar = html.Div([
     # Logo and title at the top
     html.A([
         html.Div([
-            html.Img(src="/assets/insightgen_logo.svg", className="sidebar-logo"),
+            html.Img(src=asset_url("insightgen_logo.svg"), className="sidebar-logo"),
             html.H4("InsightGen", className="app-title")
         ], className="sidebar-header d-flex align-items-center")
     ], href="/", id="logo-home-link", style={"text-decoration": "none"}),
@@ -319,6 +714,11 @@ sidebar = html.Div([
                 "Headlines AI"
             ], href="/headlines-ai", active="exact", className="py-2"),
 
+            dbc.NavLink([
+                html.I(className="fas fa-layer-group"),
+                "Batch"
+            ], href="/batch", active="exact", className="py-2"),
+
             dbc.NavLink([
                 html.I(className="fas fa-cogs"),
                 "Generators"
@@ -359,40 +759,19 @@ app.layout = dbc.Container([
     dcc.Store(id='inspection-results-store'),
     dcc.Store(id='job-id-store'),
     dcc.Store(id='processing-completed', data=False),
+    dcc.Store(id='job-poll-store'),
+    dcc.Store(id='batch-files-store', data=[]),
+    dcc.Store(id='batch-id-store'),
+    # Identifies this browser in the job registry (survives reloads and server restarts)
+    dcc.Store(id='client-id-store', storage_type='local'),
 
-    # Interval for polling job status
+    # Interval for polling job status (adjusted by update_job_status as the job runs)
     dcc.Interval(
         id='job-status-interval',
-        interval=1000,  # 1 second
+        interval=1000,  # 1 second to start with
         n_intervals=0,
         disabled=True
     ),
-
-    # JavaScript for button loading indicators
-    html.Div([
-        html.Script('''
-            document.addEventListener('DOMContentLoaded', function() {
-                // Function to show spinner when button is clicked
-                function setupButtonSpinner(buttonId, spinnerId) {
-                    const button = document.getElementById(buttonId);
-                    const spinner = document.getElementById(spinnerId);
-
-                    if (button && spinner) {
-                        button.addEventListener('click', function() {
-                            spinner.classList.remove('d-none');
-                            spinner.classList.add('d-inline-block');
-                        });
-                    }
-                }
-
-                // Setup for inspect button
-                setupButtonSpinner('inspect-button', 'inspect-spinner');
-
-                // Setup for process button
-                setupButtonSpinner('process-button', 'process-spinner');
-            });
-        ''')
-    ]),
 ], fluid=True)
 
 ################################################################################
@@ -410,6 +789,8 @@ def display_page(pathname):
     """
     if pathname == "/headlines-ai":
         return headlines_ai_layout()
+    elif pathname == "/batch":
+        return batch_layout()
     elif pathname == "/generators":
         return generators_layout()
     elif pathname == "/logs":
@@ -431,6 +812,7 @@ def display_page(pathname):
 @callback(
     Output('pptx-store', 'data'),
     Output('pptx-upload-output', 'children'),
+    Output('upload-pptx', 'contents'),
     Input('upload-pptx', 'contents'),
     State('upload-pptx', 'filename'),
     prevent_initial_call=True
@@ -439,17 +821,20 @@ def store_pptx(contents, filename):
     if contents is None:
         raise PreventUpdate
     content_type, content_string = contents.split(',')
+    # Write the file to the server-side store once; the browser keeps only the handle
+    handle = upload_store.put_base64(content_string)
     return {
-        'content': content_string,
+        'handle': handle,
         'filename': filename
     }, html.Div([
         html.I(className="fas fa-check-circle text-success me-2"),
         f"Uploaded: {filename}"
-    ])
+    ]), None
 
 @callback(
     Output('pdf-store', 'data'),
     Output('pdf-upload-output', 'children'),
+    Output('upload-pdf', 'contents'),
     Input('upload-pdf', 'contents'),
     State('upload-pdf', 'filename'),
     prevent_initial_call=True
@@ -458,50 +843,85 @@ def store_pdf(contents, filename):
     if contents is None:
         raise PreventUpdate
     content_type, content_string = contents.split(',')
+    # Write the file to the server-side store once; the browser keeps only the handle
+    handle = upload_store.put_base64(content_string)
     return {
-        'content': content_string,
+        'handle': handle,
         'filename': filename
     }, html.Div([
         html.I(className="fas fa-check-circle text-success me-2"),
         f"Uploaded: {filename}"
-    ])
+    ]), None
+
+def upload_progress(set_progress):
+    """Upload on_progress callback reporting whole percentages to a background callback's progress outputs"""
+    last_percent = [-1]
+
+    def on_progress(bytes_sent, total_bytes):
+        percent = int(bytes_sent * 100 / total_bytes) if total_bytes else 100
+        # Only report when the whole percentage changes
+        if percent != last_percent[0]:
+            last_percent[0] = percent
+            set_progress((percent, f"{bytes_sent / 1e6:.1f} / {total_bytes / 1e6:.1f} MB"))
 
-# Callback to inspect files
+    return on_progress
+
+# Callback to inspect files (runs in a background worker; the button shows a spinner until it returns)
 @callback(
     Output('inspection-results-store', 'data'),
     Output('inspection-results-container', 'children'),
     Output('inspection-results-container', 'style'),
-    Output('inspect-button-text', 'children'),
-    Output('inspect-spinner', 'className'),
     Input('inspect-button', 'n_clicks'),
     State('pptx-store', 'data'),
     State('pdf-store', 'data'),
+    background=True,
+    running=[
+        (Output('inspect-button', 'disabled'), True, False),
+        (Output('inspect-button-text', 'children'), "Inspecting...", "Inspect Files"),
+        (Output('inspect-spinner', 'className'), "ms-2 d-inline-block", "ms-2 d-none"),
+        (Output('inspect-upload-progress', 'style'), {"display": "flex"}, {"display": "none"}),
+        (Output('inspect-cancel-button', 'style'), {"display": "inline-block"}, {"display": "none"}),
+    ],
+    progress=[Output('inspect-upload-progress', 'value'), Output('inspect-upload-progress', 'label')],
+    cancel=[Input('inspect-cancel-button', 'n_clicks')],
     prevent_initial_call=True
 )
-def inspect_files(n_clicks, pptx_data, pdf_data):
+def inspect_files(set_progress, n_clicks, pptx_data, pdf_data):
     if n_clicks == 0 or pptx_data is None or pdf_data is None:
         raise PreventUpdate
+    set_progress((0, ""))
 
     # Prepare files for inspection
     try:
-        pptx_content = base64.b64decode(pptx_data['content'])
-        pdf_content = base64.b64decode(pdf_data['content'])
-
-        files = {
-            "pptx_file": (pptx_data['filename'], pptx_content, "application/vnd.openxmlformats-officedocument.presentationml.presentation"),
-            "pdf_file": (pdf_data['filename'], pdf_content, "application/pdf"),
-        }
-
-        # Call the inspect-files endpoint
-        response = requests.post(f"{API_URL}/inspect-files/", files=files)
-
-        # Check for HTTP errors
-        if response.status_code >= 400:
-            error_detail = response.json().get("detail", "Unknown error")
-            return None, dbc.Alert(f"Error during inspection: {error_detail}", color="danger"), {"display": "block"}, "Inspect Files", "ms-2 d-none"
-
-        # Process successful response
-        inspection_results = response.json()
+        # Upload handles are SHA-256 digests, so identical decks share a cache entry
+        cache_key = inspection_key(pptx_data['handle'], pdf_data['handle'])
+        inspection_results = inspection_cache.get(cache_key)
+
+        if inspection_results is None:
+            # Stream the stored uploads from disk to the API chunk by chunk
+            with upload_store.open(pptx_data['handle']) as pptx_content, upload_store.open(pdf_data['handle']) as pdf_content:
+                # Obviously invalid pairs are rejected locally, without uploading anything
+                local_results = preinspect(pptx_content, pdf_content)
+                if not local_results["is_valid"]:
+                    errors_display = dbc.Alert([
+                        html.H5("Files cannot be processed", className="alert-heading"),
+                        html.Ul([html.Li(error) for error in local_results["errors"]], className="mb-0")
+                    ], color="danger")
+                    return local_results, errors_display, {"display": "block"}
+
+                files = deck_files(pptx_data['filename'], pptx_content, pdf_data['filename'], pdf_content)
+
+                # Call the inspect-files endpoint
+                response = api.post_multipart("/inspect-files/", files=files, on_progress=upload_progress(set_progress))
+
+            # Check for HTTP errors
+            if response.status_code >= 400:
+                error_detail = response.json().get("detail", "Unknown error")
+                return None, dbc.Alert(f"Error during inspection: {error_detail}", color="danger"), {"display": "block"}
+
+            # Process successful response
+            inspection_results = response.json()
+            inspection_cache.put(cache_key, inspection_results)
 
         # Create a simplified results display
         stats = inspection_results.get("slide_stats", {})
@@ -547,24 +967,25 @@ def inspect_files(n_clicks, pptx_data, pdf_data):
             ])
         ])
 
-        return inspection_results, results_display, {"display": "block"}, "Inspect Files", "ms-2 d-none"
+        return inspection_results, results_display, {"display": "block"}
 
+    except UploadNotFound:
+        return None, dbc.Alert("Uploaded files have expired. Please upload them again.", color="warning"), {"display": "block"}
     except requests.RequestException as e:
-        return None, dbc.Alert(f"Error connecting to API: {str(e)}", color="danger"), {"display": "block"}, "Inspect Files", "ms-2 d-none"
+        return None, dbc.Alert(f"Error connecting to API: {str(e)}", color="danger"), {"display": "block"}
     except Exception as e:
-        return None, dbc.Alert(f"Error: {str(e)}", color="danger"), {"display": "block"}, "Inspect Files", "ms-2 d-none"
+        return None, dbc.Alert(f"Error: {str(e)}", color="danger"), {"display": "block"}
 
 # Function to fetch available generators
 def fetch_generators():
     try:
-        response = requests.get(f"{API_URL}/generators/")
-        if response.status_code == 200:
-            # Extract the generators list from the response
-            response_data = response.json()
-            return response_data.get("generators", [])
-        else:
-            print(f"Failed to fetch generators: {response.status_code}")
-            return []
+        # Served from the process-wide TTL cache
+        response_data = api_cache.get_json(api, "/generators/")
+        # Extract the generators list from the response
+        return response_data.get("generators", [])
+    except requests.HTTPError as e:
+        print(f"Failed to fetch generators: {e.response.status_code}")
+        return []
     except Exception as e:
         print(f"Error fetching generators: {str(e)}")
         return []
@@ -607,6 +1028,22 @@ def show_processing_form(inspection_results):
                 ], width=12, className="mb-3")
             ]),
 
+            dbc.Row([
+                dbc.Col([
+                    html.Label("Priority", className="small"),
+                    dcc.Dropdown(
+                        id="job-priority",
+                        options=[{"label": priority.title(), "value": priority} for priority in JOB_PRIORITIES],
+                        value=INTERACTIVE_PRIORITY,
+                        clearable=False
+                    ),
+                    dbc.Tooltip(
+                        "Higher priority jobs are processed ahead of batch runs",
+                        target="job-priority"
+                    )
+                ], width=12, className="mb-3")
+            ]),
+
             dbc.Row([
                 dbc.Col([
                     html.Label("Prompt: Market, Brand Context and Additional Instructions", className="small"),
@@ -650,7 +1087,11 @@ Additional instructions: """,
                         id="process-button",
                         color="primary",
                         className="w-100"
-                    )
+                    ),
+                    # Shown while the files are being uploaded for processing
+                    dbc.Progress(id="process-upload-progress", value=0, className="mt-2", style={"display": "none"}),
+                    dbc.Button("Cancel", id="process-cancel-button", color="link", size="sm",
+                               className="mt-1 w-100", style={"display": "none"})
                 ], width=12)
             ])
         ])
@@ -658,7 +1099,7 @@ Additional instructions: """,
 
     return form, {"display": "block"}
 
-# Callback to process files and start job
+# Callback to process files and start job (the upload runs in a background worker)
 @callback(
     Output('job-id-store', 'data'),
     Output('job-status-interval', 'disabled'),
@@ -672,32 +1113,42 @@ Additional instructions: """,
     State('generator-dropdown', 'value'),
     State('user-prompt', 'value'),
     State('context-window-size', 'value'),
+    State('job-priority', 'value'),
+    State('client-id-store', 'data'),
+    State('inspection-results-store', 'data'),
+    background=True,
+    running=[
+        (Output('process-button', 'disabled'), True, False),
+        (Output('process-upload-progress', 'style'), {"display": "flex"}, {"display": "none"}),
+        (Output('process-cancel-button', 'style'), {"display": "block"}, {"display": "none"}),
+    ],
+    progress=[Output('process-upload-progress', 'value'), Output('process-upload-progress', 'label')],
+    cancel=[Input('process-cancel-button', 'n_clicks')],
     prevent_initial_call=True
 )
-def process_files(n_clicks, pptx_data, pdf_data, generator_id, user_prompt, context_window_size):
+def process_files(set_progress, n_clicks, pptx_data, pdf_data, generator_id, user_prompt, context_window_size,
+                  priority, client_id, inspection_results):
     if n_clicks is None or n_clicks == 0:
         raise PreventUpdate
+    set_progress((0, "Uploading..."))
 
     try:
-        # Decode file contents
-        pptx_content = base64.b64decode(pptx_data['content'])
-        pdf_content = base64.b64decode(pdf_data['content'])
-
-        # Prepare files for upload
-        files = {
-            "pptx_file": (pptx_data['filename'], pptx_content, "application/vnd.openxmlformats-officedocument.presentationml.presentation"),
-            "pdf_file": (pdf_data['filename'], pdf_content, "application/pdf"),
-        }
-
         # Prepare form data
         data = {
             "user_prompt": user_prompt,
             "context_window_size": str(context_window_size),
             "generator_id": generator_id,
+            "priority": priority,
         }
 
-        # Submit job
-        response = requests.post(f"{API_URL}/upload-and-process/", files=files, data=data)
+        # Stream the stored uploads from disk to the API
+        with upload_store.open(pptx_data['handle']) as pptx_content, upload_store.open(pdf_data['handle']) as pdf_content:
+            files = deck_files(pptx_data['filename'], pptx_content, pdf_data['filename'], pdf_content)
+
+            # Submit job (decks kept by the API after inspection are referenced, not uploaded again)
+            response = api.post_decks("/upload-and-process/", fields=data, files=files,
+                                      upload_id=(inspection_results or {}).get("upload_id"),
+                                      on_progress=upload_progress(set_progress))
 
         # Check for HTTP errors
         if response.status_code >= 400:
@@ -726,6 +1177,13 @@ def process_files(n_clicks, pptx_data, pdf_data, generator_id, user_prompt, cont
         response_data = response.json()
         job_id = response_data["job_id"]
 
+        # Record the job so a reloaded page can resume tracking it
+        job_registry.register(client_id or "anonymous", job_id, pptx_name=pptx_data['filename'],
+                              pdf_name=pdf_data['filename'], pptx_hash=pptx_data['handle'], pdf_hash=pdf_data['handle'],
+                              generator_id=generator_id, user_prompt=user_prompt,
+                              context_window_size=context_window_size,
+                              content_slides=content_slide_count(inspection_results))
+
         # Display any warnings
         warnings_display = []
         if "warnings" in response_data and response_data["warnings"]:
@@ -742,11 +1200,58 @@ def process_files(n_clicks, pptx_data, pdf_data, generator_id, user_prompt, cont
 
         return job_id, False, {"display": "none"}, html.Div(warnings_display), process_button_text, "ms-2 d-inline-block"
 
+    except UploadNotFound:
+        return None, True, {"display": "none"}, dbc.Alert("Uploaded files have expired. Please upload them again.", color="warning"), "Generate Headlines", "ms-2 d-none"
     except requests.RequestException as e:
         return None, True, {"display": "none"}, dbc.Alert(f"Error connecting to API: {str(e)}", color="danger"), "Generate Headlines", "ms-2 d-none"
     except Exception as e:
         return None, True, {"display": "none"}, dbc.Alert(f"Error: {str(e)}", color="danger"), "Generate Headlines", "ms-2 d-none"
 
+# Callback to start each new job on a fresh poll schedule
+@callback(
+    Output('job-poll-store', 'data'),
+    Output('job-status-interval', 'interval'),
+    Output('processing-completed', 'data', allow_duplicate=True),
+    Input('job-id-store', 'data'),
+    prevent_initial_call=True
+)
+def reset_job_polling(job_id):
+    # Reattached jobs keep their original start time so the ETA stays right
+    registered_job = job_registry.get(job_id) if job_id else None
+    scheduler = PollScheduler(start_time=registered_job["created_at"] if registered_job else None)
+    return scheduler.to_dict(), int(scheduler.min_interval * 1000), False
+
+# Callback to give this browser a stable client id on first visit
+@callback(
+    Output('client-id-store', 'data'),
+    Input('url', 'pathname'),
+    State('client-id-store', 'data'),
+)
+def ensure_client_id(pathname, client_id):
+    if client_id:
+        raise PreventUpdate
+    return uuid.uuid4().hex
+
+# Callback to resume tracking this browser's newest unfinished job after a reload
+@callback(
+    Output('job-id-store', 'data', allow_duplicate=True),
+    Output('job-status-interval', 'disabled', allow_duplicate=True),
+    Output('results-container', 'children', allow_duplicate=True),
+    Input('url', 'pathname'),
+    Input('client-id-store', 'data'),
+    State('job-id-store', 'data'),
+    prevent_initial_call='initial_duplicate'
+)
+def reattach_job(pathname, client_id, current_job_id):
+    if pathname != "/headlines-ai" or not client_id or current_job_id:
+        raise PreventUpdate
+    resumed_job = resumable_job(api, client_id, registry=job_registry)
+    if resumed_job is None:
+        raise PreventUpdate
+    return resumed_job["job_id"], False, dbc.Alert(
+        f"Resuming your job for {resumed_job['pptx_name']}", color="info"
+    )
+
 # Callback to update job status
 @callback(
     Output('processing-completed', 'data'),
@@ -754,31 +1259,48 @@ def process_files(n_clicks, pptx_data, pdf_data, generator_id, user_prompt, cont
     Output('results-container', 'children', allow_duplicate=True),
     Output('process-button-text', 'children', allow_duplicate=True),
     Output('process-spinner', 'className', allow_duplicate=True),
+    Output('job-status-interval', 'interval', allow_duplicate=True),
+    Output('job-poll-store', 'data', allow_duplicate=True),
+    Output('cancel-job-button', 'style'),
     Input('job-status-interval', 'n_intervals'),
     State('job-id-store', 'data'),
     State('processing-completed', 'data'),
+    State('job-poll-store', 'data'),
+    State('inspection-results-store', 'data'),
+    State('client-id-store', 'data'),
     prevent_initial_call=True
 )
-def update_job_status(n_intervals, job_id, completed):
+def update_job_status(n_intervals, job_id, completed, poll_state, inspection_results, client_id=None):
     if job_id is None:
         raise PreventUpdate
 
     if completed:
         # If processing is already completed, don't update anything
-        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
 
     try:
-        status_response = requests.get(f"{API_URL}/job-status/{job_id}")
+        # A background watcher follows the job (push stream or polling fallback);
+        # interval ticks only read its latest status and make no API calls
+        watch_job(api, job_id)
+        job_status = latest_status(job_id)
 
-        if status_response.status_code == 200:
-            job_status = status_response.json()
+        # Back off the browser tick rate while the status stays the same
+        scheduler = PollScheduler.from_dict(poll_state) if poll_state else PollScheduler()
+        scheduler.observe(job_status)
+        interval = int(scheduler.next_interval() * 1000)
+
+        if job_status is not None:
             status = job_status["status"]
 
             if status == "completed":
+                job_registry.update(job_id, status, output_filename=job_status.get("output_filename"),
+                                    metrics=job_status.get("metrics"))
+
                 # Create metrics display
                 metrics_display = []
                 if "metrics" in job_status and job_status["metrics"]:
                     metrics = job_status["metrics"]
+                    record_job_metrics(metrics)
 
                     metrics_display = [
                         html.H5("Performance Metrics", className="mt-4 mb-3"),
@@ -828,18 +1350,23 @@ def update_job_status(n_intervals, job_id, completed):
                         ])
                     ]
 
-                # Create download button
-                download_url = f"{API_URL}/download/{job_id}"
+                # Create download button (served through the local download cache), only
+                # for the browser the job was submitted from
                 download_filename = job_status.get("output_filename", f"processed_presentation.pptx")
+                registered_job = job_registry.get(job_id)
+                if registered_job and registered_job["owner"] == (client_id or "anonymous"):
+                    download_link = html.A([
+                        html.I(className="fas fa-file-powerpoint fa-2x me-2 text-primary"),
+                        html.Span(download_filename, className="text-primary")
+                    ], href=download_url(job_id, download_filename), download=download_filename, target="_blank",
+                        className="text-decoration-none")
+                else:
+                    download_link = dbc.Alert("The output can only be downloaded from the browser that submitted this job.",
+                                              color="warning")
 
                 download_section = [
                     html.H5("Download Results", className="mt-4 mb-3"),
-                    html.Div([
-                        html.A([
-                            html.I(className="fas fa-file-powerpoint fa-2x me-2 text-primary"),
-                            html.Span(download_filename, className="text-primary")
-                        ], href=download_url, download=download_filename, target="_blank", className="text-decoration-none")
-                    ], className="text-center")
+                    html.Div([download_link], className="text-center")
                 ]
 
                 # Combine all results
@@ -857,53 +1384,309 @@ def update_job_status(n_intervals, job_id, completed):
                 process_spinner_class = "ms-2 d-none"
 
                 # Hide the progress container when completed
-                return True, {"display": "none"}, new_results, process_button_text, process_spinner_class
+                return True, {"display": "none"}, new_results, process_button_text, process_spinner_class, dash.no_update, dash.no_update, {"display": "none"}
 
             elif status == "failed":
+                job_registry.update(job_id, status, message=job_status.get("message"))
+
                 # Reset the process button
                 process_button_text = "Generate Headlines"
                 process_spinner_class = "ms-2 d-none"
 
-                return True, {"display": "none"}, dbc.Alert(f"Processing failed: {job_status.get('message', 'Unknown error')}", color="danger"), process_button_text, process_spinner_class
+                return True, {"display": "none"}, dbc.Alert(f"Processing failed: {job_status.get('message', 'Unknown error')}", color="danger"), process_button_text, process_spinner_class, dash.no_update, dash.no_update, {"display": "none"}
+
+            elif status == "cancelled":
+                job_registry.update(job_id, status, message="Cancelled by the user")
+                return True, {"display": "none"}, dbc.Alert("Processing was cancelled.", color="warning"), "Generate Headlines", "ms-2 d-none", dash.no_update, dash.no_update, {"display": "none"}
 
             else:  # processing
-                # Calculate progress based on elapsed time
-                elapsed_time = n_intervals  # Each interval is 1 second
-
-                # Update progress based on elapsed time
-                if elapsed_time <= 5:
-                    # Stage 1: 5% to 20%
-                    progress_value = min(5 + (elapsed_time / 5) * 15, 20)
-                    detail_text = "Slide processing..."
-                elif elapsed_time <= 30:
-                    # Stage 2: 20% to 80%
-                    progress_value = min(20 + ((elapsed_time - 5) / 25) * 60, 80)
-                    detail_text = "Generating observations..."
-                elif elapsed_time <= 45:
-                    # Stage 3: 80% to 95%
-                    progress_value = min(80 + ((elapsed_time - 30) / 15) * 15, 95)
-                    detail_text = "Generating headlines..."
-                else:
-                    # Stage 4: 95% to 99%
-                    progress_value = min(95 + ((elapsed_time - 45) / 15) * 4, 99)
-                    detail_text = "Updating presentation..."
+                # Server-reported slide counters when available, otherwise an ETA
+                # from historic time per content slide
+                progress_model = ProgressModel(content_slides=content_slide_count(inspection_results),
+                                               start_time=scheduler.start_time)
+                estimate = progress_model.estimate(job_status)
 
                 # Update button text with progress and status
-                process_button_text = f"Processing ({int(progress_value)}%) - {detail_text}"
+                process_button_text = f"Processing ({estimate['percent']}%) - {describe(estimate)}"
 
-                return False, {"display": "none"}, dash.no_update, process_button_text, "ms-2 d-inline-block"
+                return False, {"display": "none"}, dash.no_update, process_button_text, "ms-2 d-inline-block", interval, scheduler.to_dict(), {"display": "block"}
 
-        return False, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+        return False, dash.no_update, dash.no_update, dash.no_update, dash.no_update, interval, scheduler.to_dict(), dash.no_update
 
     except Exception as e:
         print(f"Error polling job status: {str(e)}")
-        return False, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+        return False, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+
+# Callback to cancel the running job (update_job_status picks up the cancelled status and resets the form)
+@callback(
+    Output('results-container', 'children', allow_duplicate=True),
+    Output('job-status-interval', 'interval', allow_duplicate=True),
+    Input('cancel-job-button', 'n_clicks'),
+    State('job-id-store', 'data'),
+    prevent_initial_call=True
+)
+def cancel_running_job(n_clicks, job_id):
+    if not n_clicks or not job_id:
+        raise PreventUpdate
+    try:
+        cancel_job(api, job_id)
+    except CancelRejected as e:
+        return dbc.Alert(f"Could not cancel the job: {str(e)}", color="warning"), dash.no_update
+    except requests.RequestException as e:
+        return dbc.Alert(f"Error connecting to API: {str(e)}", color="danger"), dash.no_update
+    # Tick right away so the form is reset without waiting for the backed-off interval
+    return dbc.Alert("Cancelling...", color="info"), 200
+
+################################################################################
+# BATCH CALLBACKS
+################################################################################
+
+# Callback to store batch uploads (zips and loose decks) server-side
+@callback(
+    Output('batch-files-store', 'data'),
+    Output('batch-upload-output', 'children'),
+    Output('upload-batch', 'contents'),
+    Input('upload-batch', 'contents'),
+    State('upload-batch', 'filename'),
+    State('batch-files-store', 'data'),
+    prevent_initial_call=True
+)
+def store_batch_files(contents, filenames, stored_files):
+    if not contents:
+        raise PreventUpdate
+    stored_files = list(stored_files or [])
+    for content, filename in zip(contents, filenames):
+        content_type, content_string = content.split(',')
+        stored_files.append({'handle': upload_store.put_base64(content_string), 'filename': filename})
+    return stored_files, html.Ul([
+        html.Li([html.I(className="fas fa-check-circle text-success me-2"), f"Uploaded: {f['filename']}"])
+        for f in stored_files
+    ], className="list-unstyled"), None
+
+# Callback to pair the uploaded decks and start the batch
+@callback(
+    Output('batch-id-store', 'data'),
+    Output('batch-submit-output', 'children'),
+    Output('batch-files-store', 'data', allow_duplicate=True),
+    Output('batch-status-interval', 'disabled', allow_duplicate=True),
+    Input('batch-submit-button', 'n_clicks'),
+    State('batch-files-store', 'data'),
+    State('batch-generator-dropdown', 'value'),
+    State('batch-user-prompt', 'value'),
+    State('batch-context-window-size', 'value'),
+    State('batch-concurrency', 'value'),
+    State('batch-priority', 'value'),
+    prevent_initial_call=True
+)
+def submit_batch(n_clicks, stored_files, generator_id, user_prompt, context_window_size, concurrency, priority):
+    if not n_clicks:
+        raise PreventUpdate
+    if not stored_files:
+        return dash.no_update, dbc.Alert("Please upload a zip or deck files first.", color="warning"), dash.no_update, dash.no_update
+    try:
+        concurrency = int(concurrency) if concurrency not in (None, "") else BATCH_MAX_CONCURRENCY
+    except (TypeError, ValueError):
+        return dash.no_update, dbc.Alert("Parallel jobs must be a whole number.", color="warning"), dash.no_update, dash.no_update
+
+    try:
+        batch_id, input_dir = new_batch_dir()
+        for stored in stored_files:
+            with upload_store.open(stored['handle']) as content:
+                add_input(input_dir, stored['filename'], content)
+        pairs, unmatched = collect_pairs(input_dir)
+
+        start_batch(api, batch_id, pairs, {
+            "user_prompt": user_prompt or "",
+            "context_window_size": str(context_window_size),
+            "generator_id": generator_id,
+            "priority": priority,
+        }, max_concurrency=concurrency)
+
+        messages = [dbc.Alert(f"Submitted {len(pairs)} deck pairs.", color="success")]
+        if unmatched:
+            messages.append(dbc.Alert(
+                f"Skipping {len(unmatched)} file(s) without a partner: {', '.join(os.path.basename(p) for p in unmatched)}",
+                color="warning"
+            ))
+        return batch_id, html.Div(messages), [], False
+
+    except UploadNotFound:
+        return dash.no_update, dbc.Alert("Uploaded files have expired. Please upload them again.", color="warning"), [], dash.no_update
+    except BatchError as e:
+        return dash.no_update, dbc.Alert(str(e), color="danger"), dash.no_update, dash.no_update
+    except Exception as e:
+        return dash.no_update, dbc.Alert(f"Error: {str(e)}", color="danger"), dash.no_update, dash.no_update
+
+# Callback to show the aggregated batch status
+@callback(
+    Output('batch-status-container', 'children'),
+    Output('batch-status-interval', 'disabled'),
+    Input('batch-status-interval', 'n_intervals'),
+    State('batch-id-store', 'data'),
+)
+def update_batch_status(n_intervals, batch_id):
+    batch = get_batch(batch_id) if batch_id else None
+    if batch is None:
+        return None, True
+
+    summary = batch.summary()
+    status_colors = {"completed": "success", "failed": "danger", "cancelled": "warning", "processing": "primary", "uploading": "info", "queued": "secondary"}
+    rows = [
+        html.Tr([
+            html.Td(job["name"]),
+            html.Td(dbc.Badge(job["status"], color=status_colors[job["status"]])),
+            html.Td(dbc.Progress(value=job["percent"], label=f"{job['percent']}%", style={"height": "18px"})),
+            html.Td(job["detail"], className="small"),
+        ])
+        for job in batch.snapshot()
+    ]
+
+    children = [
+        html.P(f"{summary['completed']} completed, {summary['failed']} failed, "
+               f"{summary['processing'] + summary['uploading']} running, "
+               f"{summary['queued']} queued of {summary['total']} decks", className="mb-2"),
+        dbc.Progress(value=summary["percent"], label=f"{summary['percent']}%", className="mb-3"),
+        dbc.Table([
+            html.Thead(html.Tr([html.Th("Deck"), html.Th("Status"), html.Th("Progress"), html.Th("Details")])),
+            html.Tbody(rows)
+        ], bordered=True, hover=True, size="sm"),
+    ]
+    if summary["done"] and summary["completed"]:
+        children.append(html.A([
+            html.I(className="fas fa-file-archive fa-2x me-2 text-primary"),
+            html.Span(f"Download {summary['completed']} processed presentations (zip)", className="text-primary")
+        ], href=f"/batch-download/{batch_id}", target="_blank", className="text-decoration-none"))
+
+    return dbc.Card([dbc.CardHeader("Batch Status"), dbc.CardBody(children)]), summary["done"]
+
+################################################################################
+# LOGS CALLBACKS
+################################################################################
+
+def _date_range_to_epoch(start_date, end_date):
+    """DatePickerRange dates (YYYY-MM-DD, local time) to an epoch range; the end day is inclusive"""
+    since = time.mktime(time.strptime(start_date[:10], "%Y-%m-%d")) if start_date else None
+    until = time.mktime(time.strptime(end_date[:10], "%Y-%m-%d")) + 86400 if end_date else None
+    return since, until
+
+def owner_label(owner):
+    """
+    Submitter shown on the Logs page. Dash browser ids and batch ids give access
+    to those jobs, so only a short digest of them is shown; user names are shown as is.
+    """
+    if owner.startswith("batch:") or re.fullmatch(r"[0-9a-f]{32}", owner):
+        kind = "Batch" if owner.startswith("batch:") else "Browser"
+        return f"{kind} {hashlib.sha256(owner.encode()).hexdigest()[:8]}"
+    return owner
+
+# Callback to go back to the first page whenever the filters change
+@callback(
+    Output('logs-table', 'page_current'),
+    Input('logs-search', 'value'),
+    Input('logs-status-filter', 'value'),
+    Input('logs-generator-filter', 'value'),
+    Input('logs-date-range', 'start_date'),
+    Input('logs-date-range', 'end_date'),
+    prevent_initial_call=True
+)
+def reset_logs_page(search, status, generator_id, start_date, end_date):
+    return 0
+
+# Callback to load one page of the job history (filtering and paging run in SQL)
+@callback(
+    Output('logs-table', 'data'),
+    Output('logs-table', 'page_count'),
+    Output('logs-summary', 'children'),
+    Input('logs-table', 'page_current'),
+    Input('logs-table', 'page_size'),
+    Input('logs-search', 'value'),
+    Input('logs-status-filter', 'value'),
+    Input('logs-generator-filter', 'value'),
+    Input('logs-date-range', 'start_date'),
+    Input('logs-date-range', 'end_date'),
+)
+def update_logs_table(page_current, page_size, search, status, generator_id, start_date, end_date):
+    since, until = _date_range_to_epoch(start_date, end_date)
+    page_current = page_current or 0
+    jobs, total = job_registry.search(status=status, generator_id=generator_id, text=(search or "").strip() or None,
+                                      since=since, until=until, offset=page_current * page_size, limit=page_size)
+
+    rows = []
+    for job in jobs:
+        row = {column_id: job.get(column_id) for column_id, _ in LOGS_COLUMNS}
+        row["owner"] = owner_label(job["owner"])
+        row["created"] = time.strftime("%Y-%m-%d %H:%M", time.localtime(job["created_at"]))
+        for field in ("total_time_seconds", "average_time_per_content_slide"):
+            if row[field] is not None:
+                row[field] = round(row[field], 1)
+        rows.append(row)
+
+    page_count = max(1, -(-total // page_size))
+    return rows, page_count, f"{total} jobs"
+
+# Callback to plot daily latency percentiles of completed jobs
+@callback(
+    Output('logs-latency-graph', 'figure'),
+    Input('logs-latency-metric', 'value'),
+    Input('logs-latency-days', 'value'),
+    Input('logs-generator-filter', 'value'),
+)
+def update_latency_graph(metric, days, generator_id):
+    if metric not in METRIC_FIELDS:
+        raise PreventUpdate
+    # Imported here rather than at startup: only the Logs page draws graphs
+    import plotly.graph_objects as go
+
+    series = job_registry.latency_by_day(metric, days=days, generator_id=generator_id)
+    figure = go.Figure()
+    days_axis = [point["day"] for point in series]
+    for key, label in (("p50", "p50"), ("p90", "p90"), ("p99", "p99")):
+        figure.add_trace(go.Scatter(x=days_axis, y=[point[key] for point in series], mode="lines+markers", name=label))
+    figure.add_trace(go.Bar(x=days_axis, y=[point["count"] for point in series], name="Jobs", yaxis="y2",
+                            opacity=0.2, marker_color="#6c757d"))
+    figure.update_layout(
+        margin={"l": 40, "r": 40, "t": 10, "b": 30},
+        yaxis={"title": "Seconds", "rangemode": "tozero"},
+        yaxis2={"title": "Jobs", "overlaying": "y", "side": "right", "showgrid": False, "rangemode": "tozero"},
+        legend={"orientation": "h", "y": 1.1},
+        template="plotly_white",
+    )
+    if not series:
+        figure.add_annotation(text="No completed jobs in this period", showarrow=False,
+                              xref="paper", yref="paper", x=0.5, y=0.5)
+    return figure
 
 ################################################################################
 # OPTIONAL: ABOUT PAGE CALLBACKS
 ################################################################################
-# If you want to check API status in the About page, define a callback referencing "api-status-about".
 
+@callback(
+    Output('api-status-about', 'children'),
+    Input('url', 'pathname')
+)
+def show_api_status(pathname):
+    """
+    Show the API status on the About page (cached for HEALTH_CHECK_TTL seconds).
+    """
+    if pathname != "/about":
+        raise PreventUpdate
+    try:
+        api_info = api_cache.get_json(api, "/", ttl=HEALTH_CHECK_TTL, stale_ttl=HEALTH_CHECK_TTL)
+        status = dbc.Alert(f"API is online (v{api_info.get('version', 'unknown')})", color="success")
+    except requests.HTTPError:
+        status = dbc.Alert("API is not responding correctly", color="danger")
+    except Exception:
+        status = dbc.Alert("Cannot connect to API", color="danger")
+
+    stats = api_cache.stats()
+    return html.Div([
+        status,
+        html.P(f"Response cache: {stats['hits'] + stats['stale_hits']} hits, {stats['misses']} misses",
+               className="text-muted small")
+    ])
+
+
+startup_timing.mark("layout and callbacks")
 
 ################################################################################
 # MAIN
@@ -0,0 +1,186 @@
+import hashlib
+import hmac
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+
+from params import DATA_DIR
+
+# Local disk cache for processed presentations.
+# Each job's output is downloaded from the API once, streamed to disk in
+# chunks, and served from there afterwards. Least recently used files are
+# evicted when the cache exceeds its size or entry limits.
+# Links to a cached output are signed (sign_download / download_signature_valid),
+# so only the session that was shown the link can fetch it; knowing a job id
+# is not enough.
+
+DOWNLOAD_CACHE_DIR = os.getenv("DOWNLOAD_CACHE_DIR", os.path.join(DATA_DIR, "downloads"))
+DOWNLOAD_CACHE_MAX_BYTES = int(float(os.getenv("DOWNLOAD_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+DOWNLOAD_CACHE_MAX_ENTRIES = int(os.getenv("DOWNLOAD_CACHE_MAX_ENTRIES", "50"))
+CHUNK_SIZE = 256 * 1024
+DOWNLOAD_LINK_TTL_SECONDS = int(os.getenv("DOWNLOAD_LINK_TTL_SECONDS", "86400"))
+# Several instances must share one secret; by default each host creates its own key file
+DOWNLOAD_LINK_SECRET = os.getenv("DOWNLOAD_LINK_SECRET")
+DOWNLOAD_LINK_KEY_PATH = os.path.join(DATA_DIR, "download_link.key")
+
+# Job IDs end up in file names, so only accept simple identifiers
+_JOB_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+
+class DownloadCache:
+    """Disk-backed LRU cache of job outputs keyed by job_id"""
+
+    def __init__(self, root=DOWNLOAD_CACHE_DIR, max_bytes=DOWNLOAD_CACHE_MAX_BYTES,
+                 max_entries=DOWNLOAD_CACHE_MAX_ENTRIES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._job_locks = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, job_id):
+        if not _JOB_ID_RE.match(str(job_id)):
+            raise ValueError(f"Invalid job id: {job_id!r}")
+        return os.path.join(self.root, f"{job_id}.pptx")
+
+    def _job_lock(self, job_id):
+        with self._lock:
+            return self._job_locks.setdefault(job_id, threading.Lock())
+
+    def get(self, job_id):
+        """Return the cached file path for a job, or None if not cached"""
+        path = self._path(job_id)
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            return None
+        return path
+
+    def fetch(self, client, job_id, token=None):
+        """Return the local path of a job's output, downloading it on first use"""
+        # One download per job even if several sessions ask at once
+        with self._job_lock(job_id):
+            path = self.get(job_id)
+            if path:
+                return path
+
+            path = self._path(job_id)
+            with client.get(f"/download/{job_id}", token=token, stream=True) as response:
+                response.raise_for_status()
+                fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".download-")
+                try:
+                    with os.fdopen(fd, "wb") as tmp:
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            tmp.write(chunk)
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    os.remove(tmp_path)
+                    raise
+
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Remove least recently used files until the cache is within its limits"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.root):
+                if not name.endswith(".pptx"):
+                    continue
+                path = os.path.join(self.root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            count = len(entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes and count <= self.max_entries:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                count -= 1
+
+
+_link_key = None
+_link_key_lock = threading.Lock()
+
+
+def _read_or_create_key(path):
+    """Key shared by every process on this host: created once, then read from the file"""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".key-")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(secrets.token_bytes(32))
+        try:
+            # Fails if another process got there first; its key wins
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+    finally:
+        os.remove(tmp_path)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _download_link_key():
+    global _link_key
+    with _link_key_lock:
+        if _link_key is None:
+            if DOWNLOAD_LINK_SECRET:
+                _link_key = DOWNLOAD_LINK_SECRET.encode()
+            else:
+                _link_key = _read_or_create_key(DOWNLOAD_LINK_KEY_PATH)
+        return _link_key
+
+
+def _signature(job_id, expires):
+    return hmac.new(_download_link_key(), f"{job_id}:{expires}".encode(), hashlib.sha256).hexdigest()
+
+
+def sign_download(job_id, ttl=DOWNLOAD_LINK_TTL_SECONDS):
+    """Query parameters of a download link for a job, valid for ttl seconds"""
+    expires = int(time.time() + ttl)
+    return {"expires": str(expires), "signature": _signature(job_id, expires)}
+
+
+def download_signature_valid(job_id, expires, signature):
+    """Whether the query parameters of a download link were issued for this job and are still valid"""
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < time.time() or not isinstance(signature, str):
+        return False
+    return hmac.compare_digest(_signature(job_id, expires), signature)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_download_cache():
+    """Return the process-wide download cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DownloadCache()
+        return _cache
@@ -0,0 +1,80 @@
+import gc
+import os
+import shutil
+
+# Production server for the Dash app (the App Engine entrypoint in app.yaml):
+#
+#   gunicorn -c gunicorn.conf.py main:server
+#
+# gthread workers: each request is I/O bound (API calls, disk reads of the
+# upload store and download cache), so a few threads per process keep the
+# CPU busy, and one process per core gets around the GIL. Uploads and job
+# submission run as Dash background callbacks in their own processes, so a
+# slow upload never holds a worker thread for long.
+#
+# The app is imported once in the master process (preload_app) and the
+# workers are forked from it, so the imported modules, the compressed
+# component bundles and Plotly are shared copy-on-write between them.
+# Workers are recycled after max_requests (with jitter, so they do not all
+# restart at once) and get graceful_timeout to finish their requests.
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", str(len(os.sched_getaffinity(0)))))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+preload_app = True
+
+# gthread workers are only killed when their main loop stops answering the
+# master for this long, never for a long request
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+# Long enough for an upload in flight when a worker is recycled or the instance shuts down
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", os.getenv("API_UPLOAD_TIMEOUT", "600")))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "500"))
+
+# The worker heartbeat file is written constantly: keep it off the disk
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+# App Engine terminates TLS in front of the instance
+forwarded_allow_ips = "*"
+
+
+def _metrics_workers_dir(server):
+    from api_metrics import API_METRICS_SPOOL_DIR
+
+    return os.path.join(API_METRICS_SPOOL_DIR, f"workers-{server.pid}")
+
+
+def on_starting(server):
+    # Totals left by an earlier server that had the same pid
+    shutil.rmtree(_metrics_workers_dir(server), ignore_errors=True)
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded, before any worker is forked"""
+    import dash_app
+
+    bundles = dash_app.preload()
+    server.log.info("Preloaded Plotly and %d compressed bundles", bundles)
+    # Objects that exist now are never collected: the workers' garbage
+    # collector then leaves their pages alone and they stay shared
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # The API client's keep-alive connections are already reset by its fork hook.
+    # Whichever worker answers /metrics reports the API calls of all of them.
+    from api_metrics import get_api_metrics
+    import dash_app
+
+    get_api_metrics().share_between_workers(_metrics_workers_dir(server))
+    # Each worker starts its background callbacks from its own forkserver (background_jobs.py)
+    dash_app.background_callback_manager.get().start()
+
+
+def worker_exit(server, worker):
+    """Runs in a worker that is stopping (recycled or shut down)"""
+    from api_metrics import get_api_metrics
+
+    # Its last calls stay in the totals reported by the others
+    get_api_metrics().write_snapshot()
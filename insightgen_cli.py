@@ -0,0 +1,356 @@
+import argparse
+import getpass
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+import requests
+from dotenv import load_dotenv
+
+from params import DATA_DIR
+from api_client import get_client
+from streaming_upload import deck_files
+from inspection_cache import file_sha256, get_inspection_cache, inspection_key
+from preinspect import preinspect
+from auth_cache import get_token_verifier
+from download_cache import get_download_cache
+from batch import BATCH_MAX_CONCURRENCY, BatchError, Batch, add_input, collect_pairs
+from job_progress import BULK_PRIORITY, JOB_PRIORITIES, CancelRejected, cancel_job
+
+# Headless InsightGen client for scripted and overnight runs.
+# Uses the same client modules as the web UIs (pooled API client, streaming
+# uploads, push/poll job progress, inspection and download caches, batch
+# runner). `run` keeps its job state in a JSON file next to the outputs, so an
+# interrupted run can simply be started again: finished decks are skipped and
+# jobs still running on the API are reattached instead of uploaded again.
+# Per-job results and metrics are appended to a JSON-lines file.
+#
+#   python insightgen_cli.py login --username demo
+#   python insightgen_cli.py run decks.zip -o out/ -j 4 --generator bgs_default --prompt "Market: Vietnam"
+
+load_dotenv()
+
+DEFAULT_API_URL = os.getenv("API_URL", "http://localhost:8080")
+CREDENTIALS_FILE = os.path.join(DATA_DIR, "cli_credentials.json")
+STATE_FILENAME = "insightgen_state.json"
+METRICS_FILENAME = "metrics.jsonl"
+
+
+def log(message):
+    print(f"{time.strftime('%H:%M:%S')} {message}", file=sys.stderr, flush=True)
+
+
+def _write_json(path, data):
+    """Write JSON atomically so an interrupted run never leaves a torn file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+################################################################################
+# Authentication
+################################################################################
+
+def save_token(api_url, token, user):
+    credentials = _read_json(CREDENTIALS_FILE, {})
+    credentials[api_url] = {"token": token, "user": user}
+    os.makedirs(DATA_DIR, exist_ok=True)
+    _write_json(CREDENTIALS_FILE, credentials)
+    os.chmod(CREDENTIALS_FILE, 0o600)
+
+
+def load_token(args):
+    """Token from --token, INSIGHTGEN_TOKEN or the saved login (None if there is none)"""
+    return args.token or os.getenv("INSIGHTGEN_TOKEN") or _read_json(CREDENTIALS_FILE, {}).get(args.api_url, {}).get("token")
+
+
+def token_provider(client, token):
+    """Callable returning a valid token, refreshing it when it nears expiry"""
+    verifier = get_token_verifier()
+    current = [token]
+    lock = threading.Lock()
+
+    def provide():
+        if current[0] is None:
+            return None
+        with lock:
+            try:
+                result = verifier.verify(client, current[0])
+            except requests.RequestException:
+                return current[0]
+            if result["valid"] and result["token"] != current[0]:
+                current[0] = result["token"]
+                save_token(client.base_url, current[0], result["user"])
+            return current[0]
+
+    return provide
+
+
+def cmd_login(client, args):
+    password = args.password or os.getenv("INSIGHTGEN_PASSWORD") or getpass.getpass("Password: ")
+    response = client.post("/api/auth/login", json={"username": args.username, "password": password})
+    if response.status_code != 200:
+        log(f"Login failed ({response.status_code})")
+        return 1
+    data = response.json()
+    save_token(client.base_url, data["access_token"], data.get("user"))
+    log(f"Logged in as {args.username}")
+    return 0
+
+
+################################################################################
+# Single-job commands
+################################################################################
+
+def cmd_inspect(client, args):
+    inspection_cache = get_inspection_cache()
+    with open(args.pptx, "rb") as pptx_file, open(args.pdf, "rb") as pdf_file:
+        cache_key = inspection_key(file_sha256(pptx_file), file_sha256(pdf_file))
+        results = None if args.no_cache else inspection_cache.get(cache_key)
+        if results is None:
+            # Obviously invalid pairs are reported without uploading anything
+            results = preinspect(pptx_file, pdf_file)
+        if results.get("source") == "local" and results["is_valid"]:
+            files = deck_files(os.path.basename(args.pptx), pptx_file, os.path.basename(args.pdf), pdf_file)
+            response = client.post_multipart("/inspect-files/", files=files, token=load_token(args))
+            if response.status_code >= 400:
+                log(f"Inspection failed: {response.json().get('detail', 'Unknown error')}")
+                return 1
+            results = response.json()
+            inspection_cache.put(cache_key, results)
+    print(json.dumps(results, indent=2))
+    return 0 if results.get("is_valid", False) else 1
+
+
+def cmd_status(client, args):
+    response = client.get(f"/job-status/{args.job_id}", token=load_token(args))
+    print(json.dumps(response.json(), indent=2))
+    return 0 if response.status_code == 200 else 1
+
+
+def cmd_cancel(client, args):
+    try:
+        job_status = cancel_job(client, args.job_id, token=load_token(args))
+    except CancelRejected as e:
+        log(f"Cancel failed: {str(e)}")
+        return 1
+    print(json.dumps(job_status, indent=2))
+    return 0
+
+
+def cmd_download(client, args):
+    path = get_download_cache().fetch(client, args.job_id, token=load_token(args))
+    output = args.output or f"processed_{args.job_id}.pptx"
+    shutil.copyfile(path, output)
+    log(f"Saved {output}")
+    return 0
+
+
+################################################################################
+# Resumable batch runs
+################################################################################
+
+def _input_pairs(inputs, out_dir):
+    """Deck pairs from a folder, or from zips/loose files staged under out_dir"""
+    if len(inputs) == 1 and os.path.isdir(inputs[0]):
+        return collect_pairs(os.path.abspath(inputs[0]))
+    input_dir = os.path.join(out_dir, "inputs")
+    os.makedirs(input_dir, exist_ok=True)
+    for path in inputs:
+        with open(path, "rb") as f:
+            add_input(input_dir, path, f)
+    return collect_pairs(input_dir)
+
+
+class RunState:
+    """Job state of a CLI run, persisted to JSON after every status change"""
+
+    def __init__(self, path, metrics_path):
+        self.path = path
+        self.metrics_path = metrics_path
+        self.data = _read_json(path, {"fields": {}, "jobs": {}})
+        self._lock = threading.Lock()
+
+    def save(self):
+        _write_json(self.path, self.data)
+
+    def record(self, job):
+        """Batch on_change hook: persist the job and copy finished outputs"""
+        with self._lock:
+            entry = self.data["jobs"].setdefault(job["pptx"], {})
+            entry.update(name=job["name"], pptx=job["pptx"], pdf=job["pdf"], user_prompt=job["user_prompt"],
+                         job_id=job["job_id"], status=job["status"], detail=job["detail"])
+            if job["status"] == "completed":
+                entry["output"] = self._copy_output(job)
+            self.save()
+        log(f"[{job['name']}] {job['status']}: {job['detail']}" + (f" (job {job['job_id']})" if job["job_id"] else ""))
+
+        if job["status"] in ("completed", "failed"):
+            line = json.dumps({
+                "time": time.time(), "name": job["name"], "job_id": job["job_id"], "status": job["status"],
+                "detail": job["detail"], "output": entry.get("output"), "metrics": job["metrics"],
+            })
+            with self._lock:
+                if self.metrics_path == "-":
+                    print(line, flush=True)
+                else:
+                    with open(self.metrics_path, "a") as f:
+                        f.write(line + "\n")
+
+    def _copy_output(self, job):
+        out_dir = os.path.dirname(self.path)
+        target = os.path.join(out_dir, job["output_filename"])
+        taken = {entry.get("output") for key, entry in self.data["jobs"].items() if key != job["pptx"]}
+        if target in taken:
+            target = os.path.join(out_dir, f"{job['name']}_{job['output_filename']}")
+        shutil.copyfile(job["output_path"], target)
+        return target
+
+
+def cmd_run(client, args):
+    out_dir = os.path.abspath(args.output_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    state = RunState(args.state or os.path.join(out_dir, STATE_FILENAME),
+                     args.metrics or os.path.join(out_dir, METRICS_FILENAME))
+
+    # Stored fields from an earlier run, overridden by anything given now
+    fields = dict(state.data["fields"])
+    if args.generator:
+        fields["generator_id"] = args.generator
+    if args.prompt_file:
+        with open(args.prompt_file) as f:
+            fields["user_prompt"] = f.read()
+    elif args.prompt is not None:
+        fields["user_prompt"] = args.prompt
+    if args.slide_memory is not None:
+        fields["context_window_size"] = str(args.slide_memory)
+    if args.priority:
+        fields["priority"] = args.priority
+    fields.setdefault("generator_id", "bgs_default")
+    fields.setdefault("user_prompt", "")
+    fields.setdefault("context_window_size", "20")
+    fields.setdefault("priority", BULK_PRIORITY)
+    state.data["fields"] = fields
+
+    try:
+        if args.inputs:
+            pairs, unmatched = _input_pairs(args.inputs, out_dir)
+            for path in unmatched:
+                log(f"Skipping {os.path.basename(path)}: no matching PPTX/PDF")
+        else:
+            pairs = [dict(entry) for entry in state.data["jobs"].values()]
+    except BatchError as e:
+        log(str(e))
+        return 2
+    if not pairs:
+        log("Nothing to run: give input files or an existing state file")
+        return 2
+
+    pending = []
+    for pair in pairs:
+        entry = state.data["jobs"].setdefault(pair["pptx"], {
+            "name": pair["name"], "pptx": pair["pptx"], "pdf": pair["pdf"],
+            "user_prompt": pair.get("user_prompt"), "job_id": None, "status": "queued",
+        })
+        if entry.get("status") == "completed" and os.path.exists(entry.get("output") or ""):
+            continue
+        if entry.get("status") in ("uploading", "processing") and entry.get("job_id"):
+            pair["job_id"] = entry["job_id"]  # still running on the API: reattach
+        else:
+            pair.pop("job_id", None)
+        pending.append(pair)
+    state.save()
+
+    log(f"{len(pairs) - len(pending)} of {len(pairs)} decks already done; running {len(pending)} "
+        f"with {args.jobs} in parallel")
+    batch = Batch(client, os.path.basename(out_dir), pending, fields,
+                  token=token_provider(client, load_token(args)), max_concurrency=args.jobs, on_change=state.record)
+    batch.start()
+    try:
+        batch.wait()
+    except KeyboardInterrupt:
+        log(f"Interrupted; rerun with the same output directory to resume ({state.path})")
+        # The state file is already current; don't wait for the worker threads
+        sys.stdout.flush()
+        os._exit(130)
+
+    summary = batch.summary()
+    log(f"Done: {summary['completed']} completed, {summary['failed']} failed")
+    return 0 if summary["failed"] == 0 else 1
+
+
+################################################################################
+# MAIN
+################################################################################
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless InsightGen client")
+    parser.add_argument("--api-url", default=DEFAULT_API_URL, help=f"API base URL (default {DEFAULT_API_URL})")
+    parser.add_argument("--token", help="Bearer token (default: INSIGHTGEN_TOKEN or the token saved by 'login')")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    login = commands.add_parser("login", help="Log in and save the token for later commands")
+    login.add_argument("--username", required=True)
+    login.add_argument("--password", help="Password (default: INSIGHTGEN_PASSWORD or prompt)")
+    login.set_defaults(handler=cmd_login)
+
+    inspect = commands.add_parser("inspect", help="Inspect a PPTX/PDF pair and print the results as JSON")
+    inspect.add_argument("pptx")
+    inspect.add_argument("pdf")
+    inspect.add_argument("--no-cache", action="store_true", help="Ignore cached inspection results")
+    inspect.set_defaults(handler=cmd_inspect)
+
+    run = commands.add_parser("run", help="Process many decks in parallel (resumable)")
+    run.add_argument("inputs", nargs="*", help="Zip files, deck files or one folder (omit to resume from the state file)")
+    run.add_argument("-o", "--output-dir", default=".", help="Where outputs, state and metrics are written")
+    run.add_argument("-j", "--jobs", type=int, default=BATCH_MAX_CONCURRENCY, help="Concurrent jobs on the API")
+    run.add_argument("--generator", help="Generator ID (default bgs_default)")
+    run.add_argument("--prompt", help="Prompt for decks without their own prompt in the manifest")
+    run.add_argument("--prompt-file", help="Read the prompt from a file")
+    run.add_argument("--slide-memory", type=int, help="Number of previous slides kept in context (default 20)")
+    run.add_argument("--priority", choices=JOB_PRIORITIES, help=f"Queue priority of the jobs (default {BULK_PRIORITY})")
+    run.add_argument("--state", help=f"Job state file (default <output-dir>/{STATE_FILENAME})")
+    run.add_argument("--metrics", help=f"JSON-lines results file, '-' for stdout (default <output-dir>/{METRICS_FILENAME})")
+    run.set_defaults(handler=cmd_run)
+
+    status = commands.add_parser("status", help="Print a job's status as JSON")
+    status.add_argument("job_id")
+    status.set_defaults(handler=cmd_status)
+
+    cancel = commands.add_parser("cancel", help="Cancel a queued or running job")
+    cancel.add_argument("job_id")
+    cancel.set_defaults(handler=cmd_cancel)
+
+    download = commands.add_parser("download", help="Download a job's processed presentation")
+    download.add_argument("job_id")
+    download.add_argument("-o", "--output", help="Output path (default processed_<job_id>.pptx)")
+    download.set_defaults(handler=cmd_download)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    client = get_client(args.api_url.rstrip("/"))
+    try:
+        return args.handler(client, args)
+    except requests.RequestException as e:
+        log(f"Error connecting to API: {str(e)}")
+        return 1
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
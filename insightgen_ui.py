@@ -2,10 +2,27 @@ import streamlit as st
 import requests
 import time
 import os
+import json
+import uuid
 from pathlib import Path
 import tempfile
 from dotenv import load_dotenv
 
+from api_client import get_client
+from api_metrics import API_DEBUG_PANEL, PHASES, get_api_metrics, serve_metrics, set_session
+from streaming_upload import deck_files
+from progress_model import ProgressModel, content_slide_count
+from download_cache import get_download_cache
+from api_cache import HEALTH_CHECK_TTL, get_api_cache
+from auth_cache import get_token_verifier
+from inspection_cache import file_sha256, get_inspection_cache, inspection_key
+from preinspect import preinspect
+from job_registry import get_job_registry, resumable_job
+from job_tracker import JOB_TRACKER_REFRESH_SECONDS, get_tracker, start_tracking
+from job_progress import BULK_PRIORITY, INTERACTIVE_PRIORITY, JOB_PRIORITIES, CancelRejected
+from batch import BATCH_MAX_CONCURRENCY, BatchError, add_input, collect_pairs, get_batch, new_batch_dir, start_batch
+from state_backend import SessionStore, get_state_backend
+
 # Load environment variables
 load_dotenv()
 
@@ -19,21 +36,111 @@ API_URL = os.getenv('GCP_API_URL', "https://insightgen-api-195411721870.us-centr
 # Log the API URL being used (helpful for debugging)
 print(f"Using API URL: {API_URL}")
 
+# Shared pooled client (keep-alive connections, retries on idempotent calls)
+api = get_client(API_URL)
+
+# Prometheus /metrics of the API calls made by this process (when API_METRICS_PORT is set)
+serve_metrics()
+
+# Local disk cache for processed presentations
+download_cache = get_download_cache()
+
+# TTL cache for read-mostly endpoints (generator catalog, API status)
+api_cache = get_api_cache()
+
+# Token verification cache (local JWT expiry checks, periodic server verification)
+token_verifier = get_token_verifier()
+
+# Inspection results keyed by the SHA-256 of both files
+inspection_cache = get_inspection_cache()
+
+# Submitted jobs per user, so a new session can resume tracking unfinished ones
+job_registry = get_job_registry()
+
+# Work state saved in the state backend (STATE_BACKEND) under the session id in
+# the URL (?sid=...), so a session survives a reconnect to another instance or
+# a server restart: the generator and prompt, the running job and batch.
+# Inspection results are not saved: they are only usable together with the
+# uploaded files, which a new connection does not have. The login
+# itself is never saved (the id travels in links, history and referrers): the
+# saved state is only handed back after its owner logs in again.
+session_store = SessionStore(get_state_backend())
+PERSISTED_SESSION_KEYS = ("selected_generator_id", "current_prompt", "job_id", "job_completed", "job_metrics",
+                          "output_filename", "reattach_checked", "batch_id")
+
+def restore_session():
+    """Hold on to the saved state of the session named in the URL until its owner logs in"""
+    if "session_id" in st.session_state:
+        return
+    session_id = st.query_params.get("sid")
+    saved = session_store.load(session_id)
+    if saved is None:
+        session_id = SessionStore.new_id()
+    st.session_state.saved_session = saved
+    st.session_state.session_id = session_id
+    st.query_params["sid"] = session_id
+
+def rotate_session(username):
+    """Move the session to a new id on login, taking over the saved state if username owns it
+
+    The old id stops working, so a shared or planted link cannot follow the session.
+    """
+    saved = st.session_state.pop("saved_session", None)
+    if saved and saved.get("owner") == username:
+        for key in PERSISTED_SESSION_KEYS:
+            if key in saved.get("state", {}):
+                st.session_state[key] = saved["state"][key]
+    session_store.delete(st.session_state.session_id)
+    st.session_state.session_id = SessionStore.new_id()
+    st.query_params["sid"] = st.session_state.session_id
+    st.session_state.session_owner = username
+    st.session_state.persisted_state = None
+
+def persist_session():
+    """Save the persisted keys of a logged-in session when they changed since the last save"""
+    if not st.session_state.get("is_authenticated") or not st.session_state.get("session_owner"):
+        return
+    state = {"owner": st.session_state.session_owner,
+             "state": {key: st.session_state[key] for key in PERSISTED_SESSION_KEYS if key in st.session_state}}
+    encoded = json.dumps(state, sort_keys=True)
+    if encoded != st.session_state.get("persisted_state"):
+        session_store.save(st.session_state.session_id, state)
+        st.session_state.persisted_state = encoded
+
 # Authentication functions
+def set_auth_token(token):
+    """Store the session's token where both reruns and its background job trackers see it"""
+    st.session_state.auth_token = token
+    st.session_state.setdefault("auth_token_holder", {})["token"] = token
+
+def auth_token_provider():
+    """Callable returning the session's current token
+
+    Job trackers run on worker threads, which cannot read st.session_state
+    and outlive the rerun that started them, so they get this instead of a
+    token that goes stale when verify_auth() refreshes it.
+    """
+    holder = st.session_state.setdefault("auth_token_holder", {"token": st.session_state.get("auth_token")})
+    return lambda: holder["token"]
+
 def login(username, password):
     """Authenticate user with the backend API"""
     try:
-        response = requests.post(
-            f"{API_URL}/api/auth/login",
+        response = api.post(
+            "/api/auth/login",
             json={"username": username, "password": password}
         )
 
         if response.status_code == 200:
             # Store auth token and user info in session state
             data = response.json()
-            st.session_state.auth_token = data.get("access_token")
+            set_auth_token(data.get("access_token"))
             st.session_state.user = data.get("user", {})
             st.session_state.is_authenticated = True
+            rotate_session(username)
+
+            # The server just issued this token, so the next reruns need not re-verify it
+            token_verifier.remember(st.session_state.auth_token, st.session_state.user)
 
             # Also store auth token in cookie
             headers = response.headers
@@ -66,8 +173,8 @@ def register(username, password, full_name, email, company="", designation=""):
         }
 
         # Call the registration API
-        response = requests.post(
-            f"{API_URL}/api/auth/register",
+        response = api.post(
+            "/api/auth/register",
             json=registration_data
         )
 
@@ -100,19 +207,19 @@ def verify_auth():
         return False
 
     try:
-        # Call verify endpoint
-        response = requests.get(
-            f"{API_URL}/api/auth/verify",
-            headers={"Authorization": f"Bearer {token}"}
-        )
+        # Checks expiry locally and only calls the verify endpoint when the
+        # cached verification is older than AUTH_VERIFY_INTERVAL
+        result = token_verifier.verify(api, token)
 
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("authenticated", False):
-                # Update user info in session
-                if "user" in data:
-                    st.session_state.user = data["user"]
-                return True
+        # Token was refreshed because it was close to expiry
+        if result["token"] != token:
+            set_auth_token(result["token"])
+
+        if result["valid"]:
+            # Update user info in session
+            if result["user"]:
+                st.session_state.user = result["user"]
+            return True
 
         # If we get here, authentication failed
         logout()
@@ -124,34 +231,101 @@ def verify_auth():
 def logout():
     """Clear authentication data"""
     if "auth_token" in st.session_state:
+        token_verifier.forget(st.session_state.auth_token)
         del st.session_state.auth_token
+        st.session_state.setdefault("auth_token_holder", {})["token"] = None
     if "user" in st.session_state:
         del st.session_state.user
     if "is_authenticated" in st.session_state:
         del st.session_state.is_authenticated
     if "auth_cookie" in st.session_state:
         del st.session_state.auth_cookie
+    st.session_state.pop("session_owner", None)
+    # The next user to log in gets their own unfinished jobs reattached
+    st.session_state.reattach_checked = False
 
 # Function to fetch available generators
 def fetch_generators():
     try:
-        # Include auth token if available
-        headers = {}
-        if "auth_token" in st.session_state:
-            headers["Authorization"] = f"Bearer {st.session_state.auth_token}"
-
-        response = requests.get(f"{API_URL}/generators/", headers=headers)
-        if response.status_code == 200:
-            # Extract the generators list from the response
-            response_data = response.json()
-            return response_data.get("generators", [])
-        else:
-            st.error(f"Failed to fetch generators: {response.status_code}")
-            return []
+        # Include auth token if available; served from the process-wide TTL cache
+        response_data = api_cache.get_json(api, "/generators/", token=st.session_state.get("auth_token"))
+        # Extract the generators list from the response
+        return response_data.get("generators", [])
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch generators: {e.response.status_code}")
+        return []
     except Exception as e:
         st.error(f"Error fetching generators: {str(e)}")
         return []
 
+def upload_progress(label):
+    """Return a progress bar and a bytes-sent callback that updates it"""
+    bar = st.progress(0, text=label)
+    last_percent = [-1]
+
+    def on_progress(bytes_sent, total_bytes):
+        percent = int(bytes_sent * 100 / total_bytes) if total_bytes else 100
+        # Only redraw when the whole percentage changes
+        if percent != last_percent[0]:
+            last_percent[0] = percent
+            bar.progress(percent, text=f"{label} {bytes_sent / 1e6:.1f} / {total_bytes / 1e6:.1f} MB")
+
+    return bar, on_progress
+
+def current_owner():
+    """Job registry key for the logged-in user"""
+    user = st.session_state.get("user") or {}
+    return user.get("username") or user.get("email") or "anonymous"
+
+def show_job_progress(state):
+    """Progress bar, status line and warnings of a tracked job"""
+    for warning in state["warnings"]:
+        if "Filename mismatch" in warning:
+            st.error(f"⚠️ {warning}")
+            st.warning("Processing will continue, but please consider using matching filenames in the future.")
+    st.progress(state["estimate"]["percent"])
+    st.info(state["detail"])
+
+@st.fragment(run_every=JOB_TRACKER_REFRESH_SECONDS)
+def follow_job(job_id):
+    """Refresh a running job's progress on a timer, without rerunning the page or blocking the session"""
+    tracker = get_tracker(job_id)
+    if tracker is None or tracker.done:
+        # Rerun the whole page to show the results
+        st.rerun()
+    show_job_progress(tracker.snapshot())
+    if st.button("Cancel job", key=f"cancel_job_{job_id}"):
+        try:
+            tracker.cancel()
+            st.info("Cancelling...")
+        except CancelRejected as e:
+            st.warning(f"Could not cancel the job: {str(e)}")
+        except requests.RequestException as e:
+            st.error(f"Error connecting to API: {str(e)}")
+
+def show_batch_progress(batch):
+    """Progress, counts and per-deck table of a batch; returns its summary"""
+    summary = batch.summary()
+    st.progress(summary["percent"])
+    st.info(f"{summary['completed']} completed, {summary['failed']} failed, "
+            f"{summary['processing'] + summary['uploading']} running, "
+            f"{summary['queued']} queued of {summary['total']} decks")
+    st.dataframe(
+        [{"Deck": job["name"], "Status": job["status"], "Progress": job["percent"],
+          "Job ID": job["job_id"], "Details": job["detail"]} for job in batch.snapshot()],
+        use_container_width=True,
+        hide_index=True,
+    )
+    return summary
+
+@st.fragment(run_every=JOB_TRACKER_REFRESH_SECONDS)
+def follow_batch(batch_id):
+    """Refresh a running batch on a timer until every job has finished"""
+    batch = get_batch(batch_id)
+    if batch is None or batch.finished_at is not None:
+        st.rerun()
+    show_batch_progress(batch)
+
 # Page configuration
 st.set_page_config(
     page_title="InsightGen",
@@ -159,6 +333,9 @@ st.set_page_config(
     layout="wide",
 )
 
+# Pick up the saved state of a session that reconnected (possibly to another instance)
+restore_session()
+
 # Initialize session state variables
 if "is_authenticated" not in st.session_state:
     st.session_state.is_authenticated = False
@@ -180,6 +357,8 @@ if 'inspection_done' not in st.session_state:
     st.session_state.inspection_done = False
 if 'inspection_results' not in st.session_state:
     st.session_state.inspection_results = None
+if 'file_hashes' not in st.session_state:
+    st.session_state.file_hashes = None
 if 'selected_generator_id' not in st.session_state:
     st.session_state.selected_generator_id = ""
 if 'current_prompt' not in st.session_state:
@@ -195,6 +374,14 @@ if 'job_metrics' not in st.session_state:
     st.session_state.job_metrics = None
 if 'output_filename' not in st.session_state:
     st.session_state.output_filename = None
+if 'reattach_checked' not in st.session_state:
+    st.session_state.reattach_checked = False
+# API calls made by this session's script runs are labelled for the timing panel
+if 'metrics_session' not in st.session_state:
+    st.session_state.metrics_session = uuid.uuid4().hex
+set_session(st.session_state.metrics_session)
+# Changes made by a run that ended in st.stop() or st.rerun() are saved here
+persist_session()
 
 # Header area with title and user info
 col1, col2 = st.columns([3, 1])
@@ -210,7 +397,7 @@ with col2:
         if st.button("Logout"):
             # Call logout endpoint
             try:
-                response = requests.post(f"{API_URL}/api/auth/logout")
+                response = api.post("/api/auth/logout")
                 logout()
                 st.rerun()
             except Exception as e:
@@ -393,48 +580,64 @@ def update_generator_selection():
 
 if inspect_button and pptx_file and pdf_file:
     with st.spinner("Inspecting files..."):
-        # Prepare files for inspection
-        files = {
-            "pptx_file": (pptx_file.name, pptx_file.getvalue(), "application/vnd.openxmlformats-officedocument.presentationml.presentation"),
-            "pdf_file": (pdf_file.name, pdf_file.getvalue(), "application/pdf"),
-        }
+        # Identical file pairs are answered from the local inspection cache
+        st.session_state.file_hashes = (file_sha256(pptx_file), file_sha256(pdf_file))
+        cache_key = inspection_key(*st.session_state.file_hashes)
+        cached_results = inspection_cache.get(cache_key)
+        # Obviously invalid pairs are rejected locally, without uploading anything
+        local_results = preinspect(pptx_file, pdf_file) if cached_results is None else None
+
+        if cached_results is not None:
+            st.session_state.inspection_results = cached_results
+            st.session_state.inspection_done = True
+        elif not local_results["is_valid"]:
+            st.session_state.inspection_results = local_results
+            st.session_state.inspection_done = True
+        else:
+            # Prepare files for inspection (streamed from the upload buffers, not copied)
+            files = deck_files(pptx_file.name, pptx_file, pdf_file.name, pdf_file)
 
-        # Include auth token in headers
-        headers = {}
-        if "auth_token" in st.session_state:
-            headers["Authorization"] = f"Bearer {st.session_state.auth_token}"
+            try:
+                # Call the inspect-files endpoint
+                upload_bar, on_progress = upload_progress("Uploading files...")
+                response = api.post_multipart("/inspect-files/", files=files, token=st.session_state.get("auth_token"),
+                                              on_progress=on_progress)
+                upload_bar.empty()
 
-        try:
-            # Call the inspect-files endpoint
-            response = requests.post(f"{API_URL}/inspect-files/", files=files, headers=headers)
-
-            # Check for HTTP errors
-            if response.status_code >= 400:
-                error_detail = response.json().get("detail", "Unknown error")
-                st.error(f"❌ Error during inspection: {error_detail}")
-
-                # Handle authentication errors specifically
-                if response.status_code == 401:
-                    logout()
-                    st.error("Your session has expired. Please login again.")
-                    st.rerun()
+                # Check for HTTP errors
+                if response.status_code >= 400:
+                    error_detail = response.json().get("detail", "Unknown error")
+                    st.error(f"❌ Error during inspection: {error_detail}")
 
-                st.stop()
+                    # Handle authentication errors specifically
+                    if response.status_code == 401:
+                        logout()
+                        st.error("Your session has expired. Please login again.")
+                        st.rerun()
 
-            # Process successful response
-            inspection_results = response.json()
-            st.session_state.inspection_results = inspection_results
-            st.session_state.inspection_done = True
+                    st.stop()
 
-        except requests.RequestException as e:
-            st.error(f"Error connecting to API: {str(e)}")
-        except Exception as e:
-            st.error(f"Error: {str(e)}")
+                # Process successful response
+                inspection_results = response.json()
+                inspection_cache.put(cache_key, inspection_results)
+                st.session_state.inspection_results = inspection_results
+                st.session_state.inspection_done = True
+
+            except requests.RequestException as e:
+                st.error(f"Error connecting to API: {str(e)}")
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
 
 # Display inspection results if available
 if st.session_state.inspection_done and st.session_state.inspection_results:
     results = st.session_state.inspection_results
 
+    # Display errors found before upload
+    if results.get("errors"):
+        st.subheader("❌ Files cannot be processed")
+        for error in results["errors"]:
+            st.error(error)
+
     # Display warnings
     if results["warnings"]:
         st.subheader("⚠️ Warnings")
@@ -523,10 +726,21 @@ if st.session_state.inspection_done and st.session_state.inspection_results and
             help="Number of previous slides to maintain in context"
         )
 
+        priority = st.selectbox(
+            "Priority",
+            JOB_PRIORITIES,
+            index=JOB_PRIORITIES.index(INTERACTIVE_PRIORITY),
+            format_func=str.title,
+            help="Higher priority jobs are processed ahead of batch runs"
+        )
+
         # Use the session state to determine if the button should be disabled
         submit_button = st.form_submit_button("Submit", disabled=not is_generator_selected)
 
-    if submit_button:
+    if submit_button and not (pptx_file and pdf_file):
+        # The uploaders are empty after a reconnect or when a file was removed
+        st.warning("Please upload the PowerPoint and PDF files again, then inspect them before submitting.")
+    elif submit_button:
         with st.spinner("Uploading files and starting processing..."):
             # Reset job completion state for new submissions
             st.session_state.job_completed = False
@@ -534,26 +748,23 @@ if st.session_state.inspection_done and st.session_state.inspection_results and
             st.session_state.job_metrics = None
             st.session_state.output_filename = None
 
-            # Prepare form data
-            files = {
-                "pptx_file": (pptx_file.name, pptx_file.getvalue(), "application/vnd.openxmlformats-officedocument.presentationml.presentation"),
-                "pdf_file": (pdf_file.name, pdf_file.getvalue(), "application/pdf"),
-            }
+            # Prepare form data (files are streamed from the upload buffers, not copied)
+            files = deck_files(pptx_file.name, pptx_file, pdf_file.name, pdf_file)
 
             data = {
                 "user_prompt": user_prompt,
                 "context_window_size": str(context_window_size),
                 "generator_id": st.session_state.selected_generator_id,  # Use the generator ID from session state
+                "priority": priority,
             }
 
-            # Submit job
+            # Submit job (decks kept by the API after inspection are referenced, not uploaded again)
             try:
-                # Include auth token in headers
-                headers = {}
-                if "auth_token" in st.session_state:
-                    headers["Authorization"] = f"Bearer {st.session_state.auth_token}"
-
-                response = requests.post(f"{API_URL}/upload-and-process/", files=files, data=data, headers=headers)
+                upload_bar, on_progress = upload_progress("Uploading files...")
+                response = api.post_decks("/upload-and-process/", fields=data, files=files,
+                                          upload_id=(st.session_state.inspection_results or {}).get("upload_id"),
+                                          token=st.session_state.get("auth_token"), on_progress=on_progress)
+                upload_bar.empty()
 
                 # Check for HTTP errors (4xx, 5xx)
                 if response.status_code >= 400:
@@ -587,118 +798,65 @@ if st.session_state.inspection_done and st.session_state.inspection_results and
                             st.error(f"⚠️ {warning}")
                             st.warning("Processing will continue, but please consider using matching filenames in the future.")
 
-                # Create progress bar and status text
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-
-                # Set initial stage
-                current_stage = "Slide processing"
-                progress_bar.progress(5)
-                status_text.info(f"Stage 1/4: {current_stage} - Preparing slides for analysis...")
-
-                # Poll for job status
-                completed = False
-                start_time = time.time()
-                last_status_update = time.time()
-
-                # Track processing stage
-                processing_stage = 1
-
-                while not completed and time.time() - start_time < 3600:  # 1 hour timeout
-                    # Include auth token in headers for status check
-                    headers = {}
-                    if "auth_token" in st.session_state:
-                        headers["Authorization"] = f"Bearer {st.session_state.auth_token}"
-
-                    status_response = requests.get(f"{API_URL}/job-status/{job_id}", headers=headers)
-
-                    if status_response.status_code == 200:
-                        job_status = status_response.json()
-                        status = job_status["status"]
-
-                        # Display any warnings from job status
-                        if "warnings" in job_status and job_status["warnings"] and not completed:
-                            for warning in job_status["warnings"]:
-                                if "Filename mismatch" in warning and not completed:
-                                    st.error(f"⚠️ {warning}")
-                                    st.warning("Processing will continue, but please consider using matching filenames in the future.")
-
-                        if status == "completed":
-                            progress_bar.progress(100)
-                            status_text.empty()  # Clear the status text instead
-
-                            # Store completion status and output filename in session state
-                            st.session_state.job_completed = True
-                            st.session_state.output_filename = job_status.get("output_filename", f"processed_{pptx_file.name}")
-
-                            # Store metrics in session state
-                            if "metrics" in job_status and job_status["metrics"]:
-                                st.session_state.job_metrics = job_status["metrics"]
-
-                            # We'll now let the persistent section at the bottom display the metrics
-                            # This prevents duplicate display of metrics and download button
-                            completed = True
-
-                        elif status == "failed":
-                            progress_bar.progress(100)
-                            status_text.error(f"Processing failed: {job_status.get('message', 'Unknown error')}")
-                            completed = True
-
-                        else:  # processing
-                            # Update progress based on elapsed time and estimated stage durations
-                            elapsed = time.time() - start_time
-
-                            # Update processing stage based on elapsed time
-                            # These thresholds are estimates and should be adjusted based on actual processing times
-                            if elapsed > 5 and processing_stage == 1:
-                                # Move to stage 2 after 5 seconds
-                                processing_stage = 2
-                                current_stage = "Generating observations"
-                                progress_value = 20
-                                status_text.info(f"Stage 2/4: {current_stage} - Analyzing slide content...")
-                                progress_bar.progress(progress_value)
-                            elif elapsed > 30 and processing_stage == 2:
-                                # Move to stage 3 after 30 seconds (adjust based on actual timing)
-                                processing_stage = 3
-                                current_stage = "Generating headlines"
-                                progress_value = 80
-                                status_text.info(f"Stage 3/4: {current_stage} - Creating impactful headlines...")
-                                progress_bar.progress(progress_value)
-                            elif elapsed > 45 and processing_stage == 3:
-                                # Move to stage 4 after 45 seconds (adjust based on actual timing)
-                                processing_stage = 4
-                                current_stage = "Updating presentation"
-                                progress_value = 95
-                                status_text.info(f"Stage 4/4: {current_stage} - Inserting headlines into slides...")
-                                progress_bar.progress(progress_value)
-                            elif time.time() - last_status_update > 5:
-                                # Update progress within the current stage
-                                if processing_stage == 1:
-                                    # Stage 1: 5% to 20%
-                                    progress_value = min(5 + (elapsed / 5) * 15, 20)
-                                elif processing_stage == 2:
-                                    # Stage 2: 20% to 80%
-                                    progress_value = min(20 + ((elapsed - 5) / 25) * 60, 80)
-                                elif processing_stage == 3:
-                                    # Stage 3: 80% to 95%
-                                    progress_value = min(80 + ((elapsed - 30) / 15) * 15, 95)
-                                else:
-                                    # Stage 4: 95% to 99%
-                                    progress_value = min(95 + ((elapsed - 45) / 15) * 4, 99)
-
-                                progress_bar.progress(int(progress_value))
-                                last_status_update = time.time()
-
-                    time.sleep(1)  # Poll more frequently for smoother updates
-
-                if not completed:
-                    status_text.error("Processing timed out. Please check the job status manually.")
+                # Record the job so a new session can resume tracking it
+                pptx_hash, pdf_hash = st.session_state.file_hashes or (None, None)
+                content_slides = content_slide_count(st.session_state.inspection_results)
+                job_registry.register(current_owner(), job_id, pptx_name=pptx_file.name, pdf_name=pdf_file.name,
+                                      pptx_hash=pptx_hash, pdf_hash=pdf_hash, generator_id=data["generator_id"],
+                                      user_prompt=user_prompt, context_window_size=context_window_size,
+                                      content_slides=content_slides)
+
+                # Progress model: server-reported slide counters when available,
+                # otherwise an ETA from historic time per content slide.
+                # The job is followed by a background worker; the page below only shows its progress.
+                start_tracking(api, job_id, ProgressModel(content_slides=content_slides), f"processed_{pptx_file.name}",
+                               token=auth_token_provider())
 
             except requests.RequestException as e:
                 st.error(f"Error connecting to API: {str(e)}")
             except Exception as e:
                 st.error(f"Error: {str(e)}")
 
+# Reattach to this user's newest unfinished job once per session (after a browser
+# refresh, a lost session or a UI restart the API keeps processing it)
+if not st.session_state.reattach_checked and st.session_state.job_id is None:
+    st.session_state.reattach_checked = True
+    resumed_job = resumable_job(api, current_owner(), token=st.session_state.get("auth_token"), registry=job_registry)
+    if resumed_job:
+        st.info(f"Resuming your job for {resumed_job['pptx_name']} "
+                f"(submitted {time.strftime('%Y-%m-%d %H:%M', time.localtime(resumed_job['created_at']))})")
+        st.session_state.job_id = resumed_job["job_id"]
+        start_tracking(api, resumed_job["job_id"],
+                       ProgressModel(content_slides=resumed_job["content_slides"], start_time=resumed_job["created_at"]),
+                       f"processed_{resumed_job['pptx_name']}", token=auth_token_provider())
+
+# A session restored on this instance (or after a restart) follows its job from here
+if st.session_state.job_id and not st.session_state.job_completed and get_tracker(st.session_state.job_id) is None:
+    registered_job = job_registry.get(st.session_state.job_id)
+    if registered_job and registered_job["status"] not in ("failed", "cancelled"):
+        start_tracking(api, registered_job["job_id"],
+                       ProgressModel(content_slides=registered_job["content_slides"],
+                                     start_time=registered_job["created_at"]),
+                       f"processed_{registered_job['pptx_name']}", token=auth_token_provider())
+
+# Progress of the session's job, read from its background tracker
+job_tracker = get_tracker(st.session_state.job_id) if st.session_state.job_id else None
+if job_tracker and not st.session_state.job_completed:
+    job_state = job_tracker.snapshot()
+    if not job_state["done"]:
+        follow_job(job_tracker.job_id)
+    elif job_state["status"] == "completed":
+        # Store completion status, output filename and metrics for the results section below
+        st.session_state.job_completed = True
+        st.session_state.output_filename = job_state["output_filename"]
+        st.session_state.job_metrics = job_state["metrics"]
+    elif job_state["status"] == "failed":
+        st.error(f"Processing failed: {job_state['message']}")
+    elif job_state["status"] == "cancelled":
+        st.warning(job_state["message"])
+    else:
+        st.error(job_state["message"])
+
 # Check if we have completed a job and need to display results
 if st.session_state.job_completed and st.session_state.job_id and st.session_state.job_metrics:
     # Display a success message
@@ -720,18 +878,77 @@ if st.session_state.job_completed and st.session_state.job_id and st.session_sta
         st.metric("Total Processing Time (s)", round(metrics.get("total_time_seconds", 0), 2))
         st.metric("Avg. Time per Slide (s)", round(metrics.get("average_time_per_content_slide", 0), 2))
 
-    # Download button with auth header
-    headers = {}
-    if "auth_token" in st.session_state:
-        headers["Authorization"] = f"Bearer {st.session_state.auth_token}"
-
-    st.download_button(
-        "Download Processed Presentation",
-        requests.get(f"{API_URL}/download/{st.session_state.job_id}", headers=headers).content,
-        file_name=st.session_state.output_filename,
-        mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        key="download_button_persistent"
-    )
+    # Download button: the output is fetched once into the local download cache,
+    # so reruns read it from disk instead of re-downloading it from the API.
+    # st.download_button has no streaming source: it reads the whole file into
+    # memory on every rerun (unlike the Dash app's /download route)
+    try:
+        output_path = download_cache.fetch(api, st.session_state.job_id, token=st.session_state.get("auth_token"))
+        with open(output_path, "rb") as output_file:
+            st.download_button(
+                "Download Processed Presentation",
+                output_file,
+                file_name=st.session_state.output_filename,
+                mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                key="download_button_persistent"
+            )
+    except requests.RequestException as e:
+        st.error(f"Error downloading the processed presentation: {str(e)}")
+
+# Batch mode: many deck pairs submitted at once
+with st.expander("Batch processing (many decks at once)", expanded=bool(st.session_state.get("batch_id"))):
+    st.markdown("""
+    Upload a zip (or several PPTX and PDF files). Each PDF is paired with the PPTX of the same name;
+    add a `manifest.csv` with `pptx`, `pdf` and optional `name` / `user_prompt` columns to pair them explicitly.
+    """)
+
+    batch_generators = fetch_generators()
+    batch_generator_options = {g["name"]: g["id"] for g in batch_generators} if batch_generators else {"Brand Growth Study (Default)": "bgs_default"}
+
+    with st.form("batch_form"):
+        batch_files = st.file_uploader("Upload zip or deck files", type=["zip", "pptx", "pdf", "csv"], accept_multiple_files=True)
+        batch_generator = st.selectbox("Select Generator", list(batch_generator_options.keys()))
+        batch_prompt = st.text_area("Prompt (used for every deck without its own prompt in the manifest)", height=100)
+        batch_context_window_size = st.slider("Slide Memory", min_value=0, max_value=50, value=20, key="batch_context_window_size")
+        batch_concurrency = st.slider("Parallel jobs", min_value=1, max_value=max(BATCH_MAX_CONCURRENCY, 16), value=BATCH_MAX_CONCURRENCY)
+        batch_priority = st.selectbox("Priority", JOB_PRIORITIES, index=JOB_PRIORITIES.index(BULK_PRIORITY), format_func=str.title)
+        batch_submit = st.form_submit_button("Submit Batch")
+
+    if batch_submit and batch_files:
+        try:
+            batch_id, input_dir = new_batch_dir()
+            for uploaded in batch_files:
+                add_input(input_dir, uploaded.name, uploaded)
+            pairs, unmatched = collect_pairs(input_dir)
+            if unmatched:
+                st.warning(f"Skipping {len(unmatched)} file(s) without a partner: "
+                           f"{', '.join(os.path.basename(path) for path in unmatched)}")
+            start_batch(api, batch_id, pairs, {
+                "user_prompt": batch_prompt,
+                "context_window_size": str(batch_context_window_size),
+                "generator_id": batch_generator_options[batch_generator],
+                "priority": batch_priority,
+            }, token=st.session_state.get("auth_token"), max_concurrency=batch_concurrency)
+            st.session_state.batch_id = batch_id
+        except BatchError as e:
+            st.error(f"❌ {str(e)}")
+
+    batch = get_batch(st.session_state.get("batch_id"), client=api, token=st.session_state.get("auth_token"))
+    if batch and batch.finished_at is None:
+        # The batch runs on background workers; only its progress display refreshes
+        follow_batch(batch.batch_id)
+    elif batch:
+        summary = show_batch_progress(batch)
+        if summary["completed"]:
+            # Read into memory like the single-deck download above
+            with open(batch.output_zip(), "rb") as batch_output:
+                st.download_button(
+                    f"Download {summary['completed']} Processed Presentations (zip)",
+                    batch_output,
+                    file_name=f"insightgen_batch_{batch.batch_id}.zip",
+                    mime="application/zip",
+                    key="batch_download_button"
+                )
 
 # Add sidebar with additional information
 with st.sidebar:
@@ -754,10 +971,32 @@ with st.sidebar:
     # Add API status check
     st.subheader("API Status")
     try:
-        api_response = requests.get(f"{API_URL}/")
-        if api_response.status_code == 200:
-            st.success(f"API is online (v{api_response.json().get('version', 'unknown')})")
-        else:
-            st.error("API is not responding correctly")
+        api_info = api_cache.get_json(api, "/", ttl=HEALTH_CHECK_TTL, stale_ttl=HEALTH_CHECK_TTL)
+        st.success(f"API is online (v{api_info.get('version', 'unknown')})")
+    except requests.HTTPError:
+        st.error("API is not responding correctly")
     except:
         st.error("Cannot connect to API")
+
+    # Timing of this session's API calls, to tell UI, network and API time apart
+    if API_DEBUG_PANEL or st.query_params.get("debug") == "api":
+        with st.expander("API timing (this session)"):
+            calls = get_api_metrics().recent(session=st.session_state.metrics_session, limit=20)
+            if not calls:
+                st.caption("No API calls yet")
+            else:
+                network = sum(call[phase] for call in calls for phase in PHASES if phase != "wait")
+                st.caption(f"Last {len(calls)} calls: {network * 1000:.0f} ms network, "
+                           f"{sum(call['wait'] for call in calls) * 1000:.0f} ms waiting for the API")
+                st.dataframe(
+                    [{"Call": f"{call['method']} {call['endpoint']}", "Status": call["status"] or call["error"],
+                      **{f"{phase} ms": round(call[phase] * 1000, 1) for phase in PHASES},
+                      "TTFB ms": round(call["ttfb"] * 1000, 1), "Total ms": round(call["total"] * 1000, 1),
+                      "Up KB": round(call["bytes_up"] / 1024, 1), "Down KB": round(call["bytes_down"] / 1024, 1)}
+                     for call in calls],
+                    use_container_width=True,
+                    hide_index=True,
+                )
+
+# Save what this run changed (a run that stops early is saved at the start of the next one)
+persist_session()
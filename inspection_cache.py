@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from params import DATA_DIR
+from state_backend import get_state_backend
+
+# Client-side cache of /inspect-files/ results.
+# Results are keyed by the SHA-256 of both files, so re-inspecting an
+# identical PPTX/PDF pair (e.g. after tweaking the prompt) returns instantly
+# without uploading the decks again. Entries live in a small SQLite database
+# and are evicted by age and least recent use. With a shared state backend
+# (state_backend.py) results are also stored there, so an inspection done on
+# one instance is answered from cache on all of them. Cached results are
+# shared by every user, so per-upload fields such as the upload_id the API
+# returns are kept only in the caller's session, never in the cache.
+
+INSPECTION_CACHE_PATH = os.getenv("INSPECTION_CACHE_PATH", os.path.join(DATA_DIR, "inspection_cache.sqlite"))
+INSPECTION_CACHE_MAX_ENTRIES = int(os.getenv("INSPECTION_CACHE_MAX_ENTRIES", "500"))
+INSPECTION_CACHE_TTL_DAYS = float(os.getenv("INSPECTION_CACHE_TTL_DAYS", "30"))
+HASH_CHUNK_SIZE = 1024 * 1024
+# Fields of an inspection result that belong to one upload, not to the file contents
+UPLOAD_FIELDS = ("upload_id",)
+
+
+def file_sha256(fileobj, chunk_size=HASH_CHUNK_SIZE):
+    """Hash a seekable file object chunk by chunk, leaving it rewound"""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def inspection_key(pptx_hash, pdf_hash):
+    return f"{pptx_hash}:{pdf_hash}"
+
+
+def shareable(result):
+    """Copy of an inspection result without the fields tied to one upload"""
+    return {name: value for name, value in result.items() if name not in UPLOAD_FIELDS}
+
+
+class InspectionCache:
+    """SQLite-backed cache of inspection results keyed by file hashes
+
+    With a shared state backend, local misses are looked up there too.
+    """
+
+    def __init__(self, path=INSPECTION_CACHE_PATH, max_entries=INSPECTION_CACHE_MAX_ENTRIES,
+                 ttl_seconds=INSPECTION_CACHE_TTL_DAYS * 86400, shared=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS inspections ("
+                " key TEXT PRIMARY KEY, result TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS inspections_last_used ON inspections (last_used)")
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed"""
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get(self, key):
+        """Return the cached inspection result for key, or None"""
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT result FROM inspections WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is not None:
+                db.execute("UPDATE inspections SET last_used = ? WHERE key = ?", (now, key))
+        if row is not None:
+            return shareable(json.loads(row[0]))
+        result = self.shared.get_json(f"inspection:{key}") if self.shared else None
+        if result is not None:
+            result = shareable(result)
+            self._put_local(key, result)
+        return result
+
+    def put(self, key, result):
+        """Store an inspection result, minus its upload fields, and evict old entries"""
+        result = shareable(result)
+        self._put_local(key, result)
+        if self.shared:
+            self.shared.set_json(f"inspection:{key}", result, ttl=self.ttl_seconds)
+
+    def _put_local(self, key, result):
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO inspections (key, result, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(result), now, now),
+            )
+            db.execute("DELETE FROM inspections WHERE created_at <= ?", (now - self.ttl_seconds,))
+            db.execute(
+                "DELETE FROM inspections WHERE key NOT IN"
+                " (SELECT key FROM inspections ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_inspection_cache():
+    """Return the process-wide inspection cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            backend = get_state_backend()
+            _cache = InspectionCache(shared=backend if backend.shared else None)
+        return _cache
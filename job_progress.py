@@ -0,0 +1,288 @@
+import json
+import os
+import threading
+import time
+
+import requests
+
+from poll_scheduler import PollScheduler
+from state_backend import get_state_backend
+
+# Job progress subscription.
+# Consumes a server-sent-events (or WebSocket) stream of job-status payloads
+# when the API offers one, and falls back to adaptive polling of /job-status/
+# otherwise.
+# Both transports yield the same payload the /job-status/ endpoint returns.
+# Also holds job control shared by the front ends: cancellation and the
+# priority jobs are submitted with.
+
+JOB_EVENTS_PATH = os.getenv("JOB_EVENTS_PATH", "/job-events/{job_id}")
+JOB_WS_PATH = os.getenv("JOB_WS_PATH", "/ws/job-status/{job_id}")
+# "auto" tries SSE, then WebSocket, then polling; "poll" skips push entirely
+JOB_PUSH_TRANSPORT = os.getenv("JOB_PUSH_TRANSPORT", "auto")
+# Read timeout on the event stream; the server should send keep-alives more often
+STREAM_READ_TIMEOUT = float(os.getenv("JOB_STREAM_READ_TIMEOUT", "60"))
+
+JOB_CANCEL_PATH = os.getenv("JOB_CANCEL_PATH", "/cancel-job/{job_id}")
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# Submission priorities, highest first: single decks checked interactively jump
+# ahead of batch and command-line runs in the API's queue
+JOB_PRIORITIES = ("high", "normal", "low")
+INTERACTIVE_PRIORITY = os.getenv("JOB_PRIORITY_INTERACTIVE", "high")
+BULK_PRIORITY = os.getenv("JOB_PRIORITY_BULK", "low")
+
+# An API that refuses a push channel outright is not asked again for this long
+PUSH_RETRY_SECONDS = float(os.getenv("JOB_PUSH_RETRY_SECONDS", "600"))
+# Responses on a push route meaning the API does not offer it at all
+PUSH_REFUSED_STATUSES = (404, 405, 501)
+
+# (base URL, transport) -> time until which the API is known not to offer it
+_push_refused_until = {}
+
+
+class PushUnavailable(Exception):
+    """Raised when a push channel cannot be used for this subscription (network error, bad response)"""
+
+
+class PushUnsupported(PushUnavailable):
+    """Raised when the API does not offer the push channel at all"""
+
+
+class CancelRejected(ValueError):
+    """Raised when the API refuses to cancel a job (unknown, already finished, unsupported)"""
+
+
+def resolve_token(token):
+    """token may be a string or a callable returning the current one (so refreshed tokens are picked up)"""
+    return token() if callable(token) else token
+
+
+def is_terminal(job_status):
+    return bool(job_status) and job_status.get("status") in TERMINAL_STATUSES
+
+
+def iter_sse_events(lines):
+    """Parse server-sent-event lines into (event, data) tuples"""
+    event, data = "message", []
+    for line in lines:
+        if line is None:
+            continue
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.rstrip("\r")
+        if not line:
+            # Blank line dispatches the event
+            if data:
+                yield event, "\n".join(data)
+            event, data = "message", []
+        elif line.startswith(":"):
+            continue  # keep-alive comment
+        else:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
+    if data:
+        yield event, "\n".join(data)
+
+
+def _stream_sse(client, job_id, token):
+    """Yield job-status payloads from the SSE endpoint"""
+    try:
+        response = client.get(
+            JOB_EVENTS_PATH.format(job_id=job_id),
+            token=resolve_token(token),
+            headers={"Accept": "text/event-stream"},
+            stream=True,
+            timeout=(client.timeout[0], STREAM_READ_TIMEOUT),
+        )
+    except requests.RequestException as e:
+        raise PushUnavailable(str(e))
+
+    content_type = response.headers.get("Content-Type", "")
+    if response.status_code in PUSH_REFUSED_STATUSES or (
+            response.status_code == 200 and not content_type.startswith("text/event-stream")):
+        response.close()
+        raise PushUnsupported(f"SSE not offered ({response.status_code} {content_type})")
+    if response.status_code != 200:
+        response.close()
+        raise PushUnavailable(f"SSE stream refused ({response.status_code})")
+
+    with response:
+        # chunk_size=None hands over each chunk as soon as it arrives
+        for event, data in iter_sse_events(response.iter_lines(chunk_size=None)):
+            if event not in ("message", "status"):
+                continue
+            yield json.loads(data)
+
+
+def _stream_websocket(client, job_id, token):
+    """Yield job-status payloads from the WebSocket endpoint (needs websocket-client)"""
+    try:
+        import websocket
+    except ImportError:
+        raise PushUnsupported("websocket-client is not installed")
+
+    url = client.url(JOB_WS_PATH.format(job_id=job_id)).replace("http", "ws", 1)
+    token = resolve_token(token)
+    header = [f"Authorization: Bearer {token}"] if token else []
+    try:
+        ws = websocket.create_connection(url, header=header, timeout=STREAM_READ_TIMEOUT)
+    except Exception as e:
+        # WebSocketBadStatusException carries the HTTP status of a refused handshake
+        if getattr(e, "status_code", None) in PUSH_REFUSED_STATUSES:
+            raise PushUnsupported(str(e))
+        raise PushUnavailable(str(e))
+
+    try:
+        while True:
+            message = ws.recv()
+            if not message:
+                break
+            yield json.loads(message)
+    finally:
+        ws.close()
+
+
+def _push_streams():
+    if JOB_PUSH_TRANSPORT == "sse":
+        return [("sse", _stream_sse)]
+    if JOB_PUSH_TRANSPORT == "websocket":
+        return [("websocket", _stream_websocket)]
+    if JOB_PUSH_TRANSPORT == "auto":
+        return [("sse", _stream_sse), ("websocket", _stream_websocket)]
+    return []
+
+
+def _poll(client, job_id, token, deadline, scheduler, stop):
+    """Poll /job-status/ on the adaptive schedule"""
+    while time.time() < deadline and not stop.is_set():
+        try:
+            response = client.get(f"/job-status/{job_id}", token=resolve_token(token))
+            if response.status_code == 200:
+                job_status = response.json()
+                scheduler.observe(job_status)
+                yield job_status
+                if is_terminal(job_status):
+                    return
+        except requests.RequestException as e:
+            print(f"Error polling job status: {str(e)}")
+        stop.wait(max(0, min(scheduler.next_interval(), deadline - time.time())))
+
+
+def subscribe_job_status(client, job_id, token=None, timeout=3600, scheduler=None, stop=None):
+    """Yield job-status payloads until the job finishes, times out or stop (a threading.Event) is set
+
+    Uses a push stream when the API offers one; if push is unavailable or
+    the stream drops before the job finishes, falls back to polling on
+    the given (or a fresh) PollScheduler. token may be a callable, which
+    is asked for the current token on every request. Only an API that refuses the push
+    route itself is skipped by later subscriptions (for PUSH_RETRY_SECONDS);
+    other failures affect this subscription alone.
+    """
+    stop = stop or threading.Event()
+    deadline = time.time() + timeout
+    for name, stream in _push_streams():
+        if _push_refused_until.get((client.base_url, name), 0) > time.time():
+            continue
+        try:
+            for job_status in stream(client, job_id, token):
+                yield job_status
+                if is_terminal(job_status) or time.time() >= deadline or stop.is_set():
+                    return
+            break  # stream ended early; finish with polling
+        except PushUnsupported as e:
+            _push_refused_until[(client.base_url, name)] = time.time() + PUSH_RETRY_SECONDS
+            print(f"Job push channel '{name}' not offered: {str(e)}")
+        except PushUnavailable as e:
+            print(f"Job push channel '{name}' unavailable: {str(e)}")
+        except (requests.RequestException, ValueError) as e:
+            print(f"Job push channel '{name}' dropped: {str(e)}")
+            break
+
+    yield from _poll(client, job_id, token, deadline, scheduler or PollScheduler(), stop)
+
+
+def cancel_job(client, job_id, token=None):
+    """Ask the API to cancel a job and stop its background watcher; returns the job-status payload"""
+    response = client.post(JOB_CANCEL_PATH.format(job_id=job_id), token=resolve_token(token))
+    if response.status_code >= 400:
+        try:
+            detail = response.json().get("detail", "Unknown error")
+        except ValueError:
+            detail = f"HTTP {response.status_code}"
+        raise CancelRejected(detail)
+    job_status = response.json()
+    watcher = _watchers.get(job_id)
+    if watcher:
+        watcher["status"] = job_status
+        watcher["stop"].set()
+    _publish_status(job_id, job_status)
+    return job_status
+
+
+################################################################################
+# Background watchers (used by the Dash app)
+################################################################################
+
+# Finished watchers are kept this long so late browser ticks still see the result
+WATCHER_RETENTION_SECONDS = 3600
+
+# With a shared state backend, every status a watcher sees is published there,
+# so a browser tick that lands on another instance shows the latest status
+# while that instance's own watcher connects.
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def _run_watcher(client, job_id, token, timeout):
+    watcher = _watchers[job_id]
+    try:
+        for job_status in subscribe_job_status(client, job_id, token=token, timeout=timeout, stop=watcher["stop"]):
+            if watcher["stop"].is_set():
+                break  # cancelled: keep the status set by cancel_job
+            watcher["status"] = job_status
+            _publish_status(job_id, job_status)
+    except Exception as e:
+        print(f"Job watcher for {job_id} stopped: {str(e)}")
+    finally:
+        watcher["finished_at"] = time.time()
+
+
+def watch_job(client, job_id, token=None, timeout=3600):
+    """Track a job in a background thread (no-op if already watched)"""
+    now = time.time()
+    with _watchers_lock:
+        for stale_id in [j for j, w in _watchers.items()
+                         if w["finished_at"] and now - w["finished_at"] > WATCHER_RETENTION_SECONDS]:
+            del _watchers[stale_id]
+
+        watcher = _watchers.get(job_id)
+        if watcher and not (watcher["finished_at"] and not is_terminal(watcher["status"])):
+            return
+        # New job, or a watcher that gave up before the job finished: (re)start it
+        _watchers[job_id] = {"status": watcher["status"] if watcher else None, "finished_at": None,
+                             "stop": threading.Event()}
+        thread = threading.Thread(target=_run_watcher, args=(client, job_id, token, timeout),
+                                  name=f"job-watcher-{job_id}", daemon=True)
+        thread.start()
+
+
+def _publish_status(job_id, job_status):
+    backend = get_state_backend()
+    if backend.shared:
+        backend.set_json(f"job-status:{job_id}", job_status, ttl=WATCHER_RETENTION_SECONDS)
+
+
+def latest_status(job_id):
+    """Return the most recent job-status payload seen by the watcher (or another instance's), if any"""
+    watcher = _watchers.get(job_id)
+    if watcher and watcher["status"] is not None:
+        return watcher["status"]
+    backend = get_state_backend()
+    return backend.get_json(f"job-status:{job_id}") if backend.shared else None
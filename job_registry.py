@@ -0,0 +1,273 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from params import DATA_DIR
+from state_backend import get_state_backend
+
+# Persistent registry of submitted jobs.
+# Every job the UIs submit is recorded here with its owner (the logged-in user
+# in Streamlit, a browser-local client id in Dash), file hashes, generator,
+# prompt and last known status. Because the API keeps processing after a
+# browser tab is closed or the UI server restarts, a fresh session can look up
+# the owner's unfinished jobs and resume tracking them instead of resubmitting.
+# The registry doubles as the job history behind the Dash Logs page: the
+# metrics of finished jobs are stored in indexed columns so jobs can be
+# filtered and paginated in SQL and latency percentiles computed per day.
+# With a shared state backend (state_backend.py) each job record and every
+# owner's newest job are mirrored there, so a page reloaded onto another
+# instance can still look up and reattach the job; the history itself stays
+# in each instance's database.
+
+JOB_REGISTRY_PATH = os.getenv("JOB_REGISTRY_PATH", os.path.join(DATA_DIR, "jobs.sqlite"))
+# Unfinished jobs older than this are assumed lost and not reattached
+JOB_REATTACH_WINDOW_SECONDS = float(os.getenv("JOB_REATTACH_WINDOW_HOURS", "24")) * 3600
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+# Metrics payload fields copied into their own columns when a job finishes
+METRIC_FIELDS = ("total_slides", "content_slides_processed", "total_time_seconds", "average_time_per_content_slide",
+                 "errors")
+
+_COLUMNS = ("job_id", "owner", "created_at", "updated_at", "pptx_name", "pdf_name", "pptx_hash", "pdf_hash",
+            "generator_id", "user_prompt", "context_window_size", "content_slides", "status", "output_filename",
+            "message", "metrics", "finished_at") + METRIC_FIELDS
+
+# Columns added after the first release of the table (added to existing databases on open)
+_ADDED_COLUMNS = (("finished_at", "REAL"), ("total_slides", "INTEGER"), ("content_slides_processed", "INTEGER"),
+                  ("total_time_seconds", "REAL"), ("average_time_per_content_slide", "REAL"), ("errors", "INTEGER"))
+
+
+def percentile(sorted_values, fraction):
+    """Linearly interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class JobRegistry:
+    """SQLite-backed record of submitted jobs keyed by owner, optionally mirrored to a shared state backend"""
+
+    def __init__(self, path=JOB_REGISTRY_PATH, shared=None):
+        self.path = path
+        self.shared = shared
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY, owner TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL,"
+                " pptx_name TEXT, pdf_name TEXT, pptx_hash TEXT, pdf_hash TEXT, generator_id TEXT, user_prompt TEXT,"
+                " context_window_size INTEGER, content_slides INTEGER, status TEXT NOT NULL, output_filename TEXT,"
+                " message TEXT, metrics TEXT)"
+            )
+            existing = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+            added = [name for name, _ in _ADDED_COLUMNS if name not in existing]
+            for name, column_type in _ADDED_COLUMNS:
+                if name in added:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {column_type}")
+            if added:
+                # Backfill the new columns from the stored metrics payloads
+                db.execute(
+                    "UPDATE jobs SET finished_at = updated_at, "
+                    + ", ".join(f"{field} = json_extract(metrics, '$.{field}')" for field in METRIC_FIELDS)
+                    + f" WHERE status IN ({', '.join('?' * len(FINISHED_STATUSES))})",
+                    FINISHED_STATUSES,
+                )
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_owner_created ON jobs (owner, created_at)")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at)")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_generator_created ON jobs (generator_id, created_at)")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)")
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed"""
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _row_to_job(row):
+        if row is None:
+            return None
+        job = dict(zip(_COLUMNS, row))
+        job["metrics"] = json.loads(job["metrics"]) if job["metrics"] else None
+        return job
+
+    def register(self, owner, job_id, pptx_name=None, pdf_name=None, pptx_hash=None, pdf_hash=None,
+                 generator_id=None, user_prompt=None, context_window_size=None, content_slides=None):
+        """Record a newly submitted job"""
+        now = time.time()
+        values = ((job_id, owner, now, now, pptx_name, pdf_name, pptx_hash, pdf_hash, generator_id, user_prompt,
+                   context_window_size, content_slides, "processing", None, None, None, None)
+                  + (None,) * len(METRIC_FIELDS))
+        with self._connect() as db:
+            db.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                values,
+            )
+        if self.shared:
+            self.shared.set_json(f"job:{job_id}", dict(zip(_COLUMNS, values)), ttl=JOB_REATTACH_WINDOW_SECONDS)
+            self.shared.set_json(f"owner-job:{owner}", job_id, ttl=JOB_REATTACH_WINDOW_SECONDS)
+
+    def update(self, job_id, status, output_filename=None, message=None, metrics=None):
+        """Store the latest status of a job (other fields are kept if not given)"""
+        now = time.time()
+        metric_values = tuple((metrics or {}).get(field) for field in METRIC_FIELDS)
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, output_filename = COALESCE(?, output_filename),"
+                " message = COALESCE(?, message), metrics = COALESCE(?, metrics),"
+                " finished_at = CASE WHEN ? THEN COALESCE(finished_at, ?) ELSE finished_at END, "
+                + ", ".join(f"{field} = COALESCE(?, {field})" for field in METRIC_FIELDS)
+                + " WHERE job_id = ?",
+                (status, now, output_filename, message, json.dumps(metrics) if metrics else None,
+                 status in FINISHED_STATUSES, now) + metric_values + (job_id,),
+            )
+        job = self.shared.get_json(f"job:{job_id}") if self.shared else None
+        if job:
+            job.update(status=status, updated_at=now)
+            for field, value in (("output_filename", output_filename), ("message", message), ("metrics", metrics)):
+                if value:
+                    job[field] = value
+            if status in FINISHED_STATUSES and not job["finished_at"]:
+                job["finished_at"] = now
+            job.update({field: value for field, value in zip(METRIC_FIELDS, metric_values) if value is not None})
+            self.shared.set_json(f"job:{job_id}", job, ttl=JOB_REATTACH_WINDOW_SECONDS)
+
+    def get(self, job_id):
+        with self._connect() as db:
+            row = db.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None and self.shared:
+            return self.shared.get_json(f"job:{job_id}")
+        return self._row_to_job(row)
+
+    def unfinished(self, owner, now=None):
+        """The owner's jobs that were still running when last seen, newest first"""
+        now = now if now is not None else time.time()
+        with self._connect() as db:
+            rows = db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE owner = ?"
+                f" AND status NOT IN ({', '.join('?' * len(FINISHED_STATUSES))}) AND created_at > ? ORDER BY created_at DESC",
+                (owner, *FINISHED_STATUSES, now - JOB_REATTACH_WINDOW_SECONDS),
+            ).fetchall()
+        jobs = [self._row_to_job(row) for row in rows]
+        if self.shared:
+            # The owner's newest job may have been submitted through another instance
+            job_id = self.shared.get_json(f"owner-job:{owner}")
+            job = self.shared.get_json(f"job:{job_id}") if job_id else None
+            if (job and job["status"] not in FINISHED_STATUSES and job["created_at"] > now - JOB_REATTACH_WINDOW_SECONDS
+                    and all(j["job_id"] != job_id for j in jobs)):
+                jobs.append(job)
+                jobs.sort(key=lambda j: j["created_at"], reverse=True)
+        return jobs
+
+    def recent(self, owner, limit=20):
+        """The owner's most recent jobs, newest first"""
+        with self._connect() as db:
+            rows = db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE owner = ? ORDER BY created_at DESC LIMIT ?",
+                (owner, limit),
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def search(self, status=None, generator_id=None, text=None, since=None, until=None, offset=0, limit=20):
+        """One page of jobs matching the filters (newest first) and the total match count"""
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if generator_id:
+            clauses.append("generator_id = ?")
+            params.append(generator_id)
+        if text:
+            # Owners only match in full: Dash browser ids must not be guessable piece by piece
+            clauses.append("(pptx_name LIKE ? OR pdf_name LIKE ? OR job_id LIKE ? OR owner = ?)")
+            params.extend([f"%{text}%"] * 3 + [text])
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as db:
+            total = db.execute(f"SELECT COUNT(*) FROM jobs{where}", params).fetchone()[0]
+            rows = db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs{where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows], total
+
+    def generator_ids(self):
+        with self._connect() as db:
+            rows = db.execute("SELECT DISTINCT generator_id FROM jobs WHERE generator_id IS NOT NULL").fetchall()
+        return sorted(row[0] for row in rows)
+
+    def latency_by_day(self, field="total_time_seconds", days=30, generator_id=None, now=None):
+        """Per-day count and p50/p90/p99 of a metric over completed jobs"""
+        if field not in METRIC_FIELDS:
+            raise ValueError(f"Unknown metric: {field}")
+        now = now if now is not None else time.time()
+        params = [now - days * 86400]
+        generator_clause = ""
+        if generator_id:
+            generator_clause = " AND generator_id = ?"
+            params.append(generator_id)
+        with self._connect() as db:
+            rows = db.execute(
+                f"SELECT date(finished_at, 'unixepoch', 'localtime'), {field} FROM jobs"
+                f" WHERE status = 'completed' AND finished_at >= ? AND {field} IS NOT NULL{generator_clause}"
+                f" ORDER BY finished_at",
+                params,
+            ).fetchall()
+
+        by_day = {}
+        for day, value in rows:
+            by_day.setdefault(day, []).append(value)
+        result = []
+        for day, values in sorted(by_day.items()):
+            values.sort()
+            result.append({"day": day, "count": len(values), "p50": percentile(values, 0.5),
+                           "p90": percentile(values, 0.9), "p99": percentile(values, 0.99)})
+        return result
+
+
+def resumable_job(client, owner, token=None, registry=None):
+    """The owner's newest unfinished job that the API still knows about, or None"""
+    registry = registry or get_job_registry()
+    for job in registry.unfinished(owner):
+        try:
+            response = client.get(f"/job-status/{job['job_id']}", token=token)
+        except requests.RequestException:
+            return job  # API unreachable right now: let status tracking retry
+        if response.status_code == 404:
+            registry.update(job["job_id"], "failed", message="Job no longer known to the API")
+            continue
+        return job
+    return None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_job_registry():
+    """Return the process-wide job registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            backend = get_state_backend()
+            _registry = JobRegistry(shared=backend if backend.shared else None)
+        return _registry
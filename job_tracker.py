@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from job_progress import cancel_job, is_terminal, subscribe_job_status
+from progress_model import describe, record_job_metrics
+from job_registry import get_job_registry
+
+# Background tracking of single jobs for the Streamlit UI.
+# Following a job used to block the session's script thread for up to an
+# hour. Instead, each job is followed by a worker from a shared pool that
+# keeps the latest status, progress estimate and result in a JobTracker; the
+# page only reads a snapshot on each refresh. Trackers are process-wide and
+# keyed by job id, so a refreshed tab or a second session following the same
+# job shares one worker and one status stream.
+
+JOB_TRACKER_MAX_WORKERS = int(os.getenv("JOB_TRACKER_MAX_WORKERS", "32"))
+# Finished trackers are dropped after this long
+JOB_TRACKER_RETENTION_SECONDS = int(os.getenv("JOB_TRACKER_RETENTION_SECONDS", "3600"))
+# How often pages re-read a running tracker
+JOB_TRACKER_REFRESH_SECONDS = float(os.getenv("JOB_TRACKER_REFRESH_SECONDS", "1"))
+JOB_TIMEOUT_SECONDS = 3600
+
+
+class JobTracker:
+    """Latest known state of one job, updated by a background worker
+
+    token may be a string or a callable returning the current token; a callable
+    is asked again for every request, so refreshed tokens are used.
+    """
+
+    def __init__(self, client, job_id, progress_model, default_output_filename, token=None):
+        self.client = client
+        self.job_id = job_id
+        self.progress_model = progress_model
+        self.token = token
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._stop = threading.Event()
+        self._state = {
+            "status": "processing",
+            "estimate": progress_model.estimate(None),
+            "message": None,
+            "warnings": [],
+            "output_filename": default_output_filename,
+            "metrics": None,
+        }
+
+    @property
+    def done(self):
+        return self._finished.is_set()
+
+    @property
+    def status(self):
+        with self._lock:
+            return self._state["status"]
+
+    def _update(self, **changes):
+        with self._lock:
+            self._state.update(changes)
+
+    def run(self):
+        job_status = None
+        try:
+            for job_status in subscribe_job_status(self.client, self.job_id, token=self.token,
+                                                   timeout=JOB_TIMEOUT_SECONDS, stop=self._stop):
+                if job_status.get("warnings"):
+                    self._update(warnings=list(job_status["warnings"]))
+                if not is_terminal(job_status):
+                    self._update(estimate=self.progress_model.estimate(job_status))
+
+            if self._stop.is_set() or (job_status and job_status["status"] == "cancelled"):
+                get_job_registry().update(self.job_id, "cancelled", message="Cancelled by the user")
+                self._update(status="cancelled", message="Processing was cancelled")
+            elif not is_terminal(job_status):
+                self._update(status="timeout", message="Processing timed out. Please check the job status manually.")
+            elif job_status["status"] == "failed":
+                get_job_registry().update(self.job_id, "failed", message=job_status.get("message"))
+                self._update(status="failed", message=job_status.get("message", "Unknown error"))
+            else:
+                with self._lock:
+                    output_filename = job_status.get("output_filename") or self._state["output_filename"]
+                if job_status.get("metrics"):
+                    record_job_metrics(job_status["metrics"])
+                get_job_registry().update(self.job_id, "completed", output_filename=output_filename,
+                                          metrics=job_status.get("metrics"))
+                self._update(status="completed", output_filename=output_filename, metrics=job_status.get("metrics"))
+        except requests.RequestException as e:
+            self._update(status="error", message=f"Error connecting to API: {str(e)}")
+        finally:
+            self.finished_at = time.time()
+            self._finished.set()
+
+    def cancel(self):
+        """Cancel the job on the API and stop following it (raises CancelRejected if the API refuses)"""
+        cancel_job(self.client, self.job_id, token=self.token)
+        self._stop.set()
+
+    def wait(self, timeout=None):
+        """Block until the job has finished; returns False on timeout"""
+        return self._finished.wait(timeout)
+
+    def snapshot(self):
+        """Copy of the current state for display"""
+        with self._lock:
+            state = dict(self._state, warnings=list(self._state["warnings"]))
+        state["done"] = self.done
+        state["detail"] = describe(state["estimate"])
+        return state
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=JOB_TRACKER_MAX_WORKERS, thread_name_prefix="job-tracker")
+
+
+def _drop_expired_trackers(now):
+    for job_id in [j for j, tracker in _trackers.items()
+                   if tracker.finished_at and now - tracker.finished_at > JOB_TRACKER_RETENTION_SECONDS]:
+        del _trackers[job_id]
+
+
+def start_tracking(client, job_id, progress_model, default_output_filename, token=None):
+    """Follow a job in the background and return its JobTracker (shared if already tracked)"""
+    with _trackers_lock:
+        _drop_expired_trackers(time.time())
+        tracker = _trackers.get(job_id)
+        # A tracker that lost the API connection is replaced; the job itself may still be running
+        if tracker is None or tracker.status == "error":
+            tracker = JobTracker(client, job_id, progress_model, default_output_filename, token=token)
+            _trackers[job_id] = tracker
+            _executor.submit(tracker.run)
+        return tracker
+
+
+def get_tracker(job_id):
+    """Return the tracker of a running or recently finished job, or None"""
+    return _trackers.get(job_id)
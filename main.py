@@ -1,6 +1,7 @@
 from dash_app import server
 
 # This file is required by App Engine to serve the app
+# (gunicorn -c gunicorn.conf.py main:server, see app.yaml)
 # The server variable is imported from dash_app.py
 
 if __name__ == "__main__":
@@ -0,0 +1,525 @@
+import argparse
+import base64
+import email
+import gzip
+import hashlib
+import hmac
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local mock of the InsightGen API for development and testing.
+# Implements the endpoints the UIs call, simulates jobs that move through the
+# processing stages over a configurable duration, and streams job progress as
+# server-sent events on /job-events/{job_id}. Compressed request bodies
+# (gzip, and zstd when zstandard is installed) are accepted and advertised with
+# Accept-Encoding, and inspected uploads are kept for reuse by upload id;
+# /_mock/stats reports request counts and request bytes on the wire. Response
+# latency and payload sizes are configurable for load testing
+# (benchmarks/load_test.py).
+#
+# Run it with:  python mock_api.py --port 8080 --job-duration 60
+# and point the UI at it (the default local API URL is http://localhost:8080).
+
+MOCK_SECRET = b"insightgen-mock-secret"
+TOKEN_LIFETIME_SECONDS = 3600
+
+# (stage name, fraction of the job duration at which the stage ends)
+# Queue order of job priorities when the number of workers is limited
+PRIORITY_RANK = {"high": 0, "normal": 1, "low": 2}
+
+STAGES = [
+    ("Slide processing", 0.1),
+    ("Generating observations", 0.7),
+    ("Generating headlines", 0.9),
+    ("Updating presentation", 1.0),
+]
+
+
+def decodable_encodings():
+    """Request encodings the mock can decode"""
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return ("gzip",)
+    return ("gzip", "zstd")
+
+
+def decode_body(body, encoding):
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    import zstandard
+    return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+
+
+class UnsupportedEncoding(Exception):
+    pass
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def make_token(username, lifetime=TOKEN_LIFETIME_SECONDS):
+    """Issue an HS256 JWT like the real API does"""
+    header = _b64url(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    claims = {"sub": username, "iat": int(time.time()), "exp": int(time.time() + lifetime)}
+    payload = _b64url(json.dumps(claims).encode())
+    signature = hmac.new(MOCK_SECRET, f"{header}.{payload}".encode(), hashlib.sha256).digest()
+    return f"{header}.{payload}.{_b64url(signature)}"
+
+
+def check_token(token):
+    """Return the token claims if the signature and expiry are valid"""
+    try:
+        header, payload, signature = token.split(".")
+        expected = hmac.new(MOCK_SECRET, f"{header}.{payload}".encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(_b64url(expected), signature):
+            return None
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return claims if claims.get("exp", 0) > time.time() else None
+    except (ValueError, AttributeError):
+        return None
+
+
+class MockState:
+    """Jobs, users and request counters shared by all handler threads"""
+
+    def __init__(self, job_duration=30.0, total_slides=20, header_slides=2, push=True,
+                 download_size=1024 * 1024, progress_counters=False, compression=True, upload_ids=True,
+                 upload_ttl=3600, workers=None, latency=0.0, latency_jitter=0.0, generators=1):
+        self.job_duration = job_duration
+        # Added to every API response: latency plus a uniform random share of latency_jitter
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.generators = generators
+        # With a worker limit, queued jobs start by priority, then submission time
+        self.workers = workers
+        self.request_encodings = decodable_encodings() if compression else ()
+        self.upload_ids = upload_ids
+        self.upload_ttl = upload_ttl
+        self.uploads = {}
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+        self.progress_counters = progress_counters
+        self.total_slides = total_slides
+        self.header_slides = header_slides
+        self.push = push
+        self.download_size = download_size
+        self.users = {"demo": {"password": "Demo1234", "full_name": "Demo User", "username": "demo"}}
+        self.jobs = {}
+        self.request_counts = {}
+        self.lock = threading.Lock()
+
+    def count(self, method, path):
+        # Group per-job paths so counts stay readable
+        key = f"{method} {re.sub(r'/[0-9a-f-]{8,}', '/{id}', path)}"
+        with self.lock:
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+
+    def delay(self):
+        if self.latency or self.latency_jitter:
+            time.sleep(self.latency + random.uniform(0, self.latency_jitter))
+
+    def generator_catalog(self):
+        generators = [{
+            "id": "bgs_default",
+            "name": "Brand Growth Study",
+            "example_prompt": "Market: Vietnam;\nClient brands: ;\nCompetitors: ;\nAdditional instructions: ",
+        }]
+        # Extra generators only make the catalog payload bigger
+        for number in range(2, self.generators + 1):
+            generators.append({"id": f"generator_{number}", "name": f"Generator {number}",
+                               "example_prompt": f"Market: ;\nCategory: ;\nGenerator {number} instructions: "})
+        return {"generators": generators}
+
+    def count_bytes(self, received, decoded):
+        with self.lock:
+            self.bytes_received += received
+            self.bytes_decoded += decoded
+
+    def keep_upload(self, files):
+        """Keep inspected files for /upload-and-process/ and return their upload id"""
+        upload_id = str(uuid.uuid4())
+        with self.lock:
+            self.uploads[upload_id] = (time.time(), files)
+        return upload_id
+
+    def take_upload(self, upload_id):
+        with self.lock:
+            created, files = self.uploads.get(upload_id, (0, None))
+        return files if time.time() - created < self.upload_ttl else None
+
+    def slide_stats(self):
+        header_numbers = list(range(1, self.header_slides + 1))
+        content_numbers = list(range(self.header_slides + 1, self.total_slides + 1))
+        return {
+            "total_slides": self.total_slides,
+            "header_slides": {"count": len(header_numbers), "slide_numbers": header_numbers},
+            "content_slides": {"count": len(content_numbers), "slide_numbers": content_numbers},
+            "missing_placeholders": {"count": 0, "slide_numbers": []},
+        }
+
+    def create_job(self, fields, pptx_name):
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self.lock:
+            self.jobs[job_id] = {
+                "created": now,
+                "started": None if self.workers else now,
+                "cancelled_at": None,
+                "priority": fields.get("priority", "normal"),
+                "duration": self.job_duration,
+                "fields": fields,
+                "output_filename": f"processed_{pptx_name or 'presentation.pptx'}",
+            }
+        return job_id
+
+    def cancel_job(self, job_id):
+        """Cancel a job; returns its status, or None if it is unknown"""
+        job_status = self.job_status(job_id)
+        if job_status is not None and job_status["status"] not in ("completed", "failed", "cancelled"):
+            with self.lock:
+                self.jobs[job_id]["cancelled_at"] = time.time()
+        return job_status
+
+    @staticmethod
+    def _job_end(job):
+        end = job["started"] + job["duration"]
+        return min(end, job["cancelled_at"]) if job["cancelled_at"] else end
+
+    def _schedule(self, now):
+        """Start queued jobs on workers freed up to now (replayed at the times the workers became free)"""
+        while True:
+            jobs = list(self.jobs.values())
+            queued = [j for j in jobs if j["started"] is None and not j["cancelled_at"]]
+            if not queued:
+                return
+            started = [j for j in jobs if j["started"] is not None]
+            first = min(j["created"] for j in queued)
+            times = sorted({first} | {self._job_end(j) for j in started if self._job_end(j) > first})
+            for t in times:
+                if t > now:
+                    return
+                running = sum(1 for j in started if j["started"] <= t < self._job_end(j))
+                waiting = [j for j in queued if j["created"] <= t]
+                if running < self.workers and waiting:
+                    job = min(waiting, key=lambda j: (PRIORITY_RANK.get(j["priority"], 1), j["created"]))
+                    job["started"] = t
+                    break
+            else:
+                return
+
+    def job_status(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job["cancelled_at"]:
+            return {"job_id": job_id, "status": "cancelled", "message": "Job cancelled"}
+        if self.workers:
+            with self.lock:
+                self._schedule(time.time())
+            if job["started"] is None:
+                return {"job_id": job_id, "status": "processing", "message": "Waiting for a worker..."}
+        elapsed = time.time() - job["started"]
+        content_slides = self.total_slides - self.header_slides
+        if elapsed >= job["duration"]:
+            return {
+                "job_id": job_id,
+                "status": "completed",
+                "message": "Processing completed",
+                "output_filename": job["output_filename"],
+                "metrics": {
+                    "total_slides": self.total_slides,
+                    "content_slides_processed": content_slides,
+                    "observations_generated": content_slides,
+                    "headlines_generated": content_slides,
+                    "errors": 0,
+                    "total_time_seconds": job["duration"],
+                    "average_time_per_content_slide": job["duration"] / max(content_slides, 1),
+                },
+            }
+        fraction = elapsed / job["duration"]
+        stage_start = 0.0
+        for stage, stage_end in STAGES:
+            if fraction < stage_end:
+                break
+            stage_start = stage_end
+        job_status = {"job_id": job_id, "status": "processing", "message": f"{stage}...", "stage": stage}
+        if self.progress_counters:
+            # Per-slide counters within the current stage
+            stage_fraction = (fraction - stage_start) / (stage_end - stage_start)
+            job_status["progress"] = {"stage": stage, "slides_completed": int(stage_fraction * content_slides),
+                                      "slides_total": content_slides}
+        return job_status
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY small responses wait on delayed ACKs
+    disable_nagle_algorithm = True
+    state = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    # Helpers ------------------------------------------------------------------
+
+    def _send_json(self, payload, status=200, headers=None, etag=False):
+        body = json.dumps(payload).encode("utf-8")
+        if etag:
+            # Conditional GET support for cacheable endpoints
+            tag = f'"{hashlib.sha1(body).hexdigest()}"'
+            headers = dict(headers or {}, ETag=tag)
+            if self.headers.get("If-None-Match") == tag:
+                self.send_response(304)
+                self.send_header("ETag", tag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.state.request_encodings:
+            self.send_header("Accept-Encoding", ", ".join(self.state.request_encodings))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                body += self.rfile.read(size)
+                self.rfile.readline()
+            body = bytes(body)
+        else:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        received = len(body)
+        encoding = self.headers.get("Content-Encoding", "identity").lower()
+        if encoding != "identity":
+            if encoding not in self.state.request_encodings:
+                raise UnsupportedEncoding(encoding)
+            body = decode_body(body, encoding)
+        self.state.count_bytes(received, len(body))
+        return body
+
+    def _read_form(self):
+        """Parse a multipart body into (fields, files) where files maps name -> (filename, bytes)"""
+        body = self._read_body()
+        content_type = self.headers.get("Content-Type", "")
+        if not content_type.startswith("multipart/form-data"):
+            return {}, {}
+        message = email.message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        fields, files = {}, {}
+        for part in message.get_payload():
+            name = part.get_param("name", header="content-disposition")
+            payload = part.get_payload(decode=True) or b""
+            if part.get_filename():
+                files[name] = (part.get_filename(), payload)
+            else:
+                fields[name] = payload.decode("utf-8")
+        return fields, files
+
+    # Routing --------------------------------------------------------------------
+
+    def do_GET(self):
+        self.state.count("GET", self.path)
+        path = self.path.split("?")[0]
+        if path == "/_mock/stats":
+            return self._send_json({"requests": self.state.request_counts, "jobs": len(self.state.jobs),
+                                    "bytes_received": self.state.bytes_received,
+                                    "bytes_decoded": self.state.bytes_decoded})
+        self.state.delay()
+        if path == "/":
+            return self._send_json({"message": "InsightGen API (mock)", "version": "mock"}, etag=True)
+        if path == "/api/auth/verify":
+            auth = self.headers.get("Authorization", "")
+            claims = check_token(auth[len("Bearer "):]) if auth.startswith("Bearer ") else None
+            if claims is None:
+                return self._send_json({"authenticated": False}, status=401)
+            user = self.state.users.get(claims["sub"], {})
+            return self._send_json({"authenticated": True, "user": {k: v for k, v in user.items() if k != "password"}})
+        if path == "/generators/":
+            return self._send_json(self.state.generator_catalog(), etag=True)
+        match = re.match(r"^/job-status/([^/]+)$", path)
+        if match:
+            job_status = self.state.job_status(match.group(1))
+            if job_status is None:
+                return self._send_json({"detail": "Job not found"}, status=404)
+            return self._send_json(job_status)
+        match = re.match(r"^/job-events/([^/]+)$", path)
+        if match and self.state.push:
+            return self._stream_job_events(match.group(1))
+        match = re.match(r"^/download/([^/]+)$", path)
+        if match and match.group(1) in self.state.jobs:
+            return self._send_download(match.group(1))
+        return self._send_json({"detail": "Not Found"}, status=404)
+
+    def do_POST(self):
+        self.state.count("POST", self.path)
+        self.state.delay()
+        try:
+            return self._route_post(self.path.split("?")[0])
+        except UnsupportedEncoding as e:
+            return self._send_json({"detail": f"Unsupported Content-Encoding: {e}"}, status=415)
+
+    def _route_post(self, path):
+        if path == "/api/auth/login":
+            credentials = json.loads(self._read_body() or b"{}")
+            user = self.state.users.get(credentials.get("username"))
+            if not user or user["password"] != credentials.get("password"):
+                return self._send_json({"detail": "Invalid username or password"}, status=401)
+            token = make_token(user["username"])
+            return self._send_json(
+                {"access_token": token, "token_type": "bearer",
+                 "user": {k: v for k, v in user.items() if k != "password"}},
+                headers={"Set-Cookie": f"access_token={token}; HttpOnly; Path=/"},
+            )
+        if path == "/api/auth/register":
+            data = json.loads(self._read_body() or b"{}")
+            if data.get("username") in self.state.users:
+                return self._send_json({"detail": {"message": "Registration failed", "errors": ["Username already exists"]}}, status=400)
+            self.state.users[data["username"]] = data
+            return self._send_json({"message": "Registration successful"})
+        if path == "/api/auth/refresh":
+            self._read_body()
+            auth = self.headers.get("Authorization", "")
+            claims = check_token(auth[len("Bearer "):]) if auth.startswith("Bearer ") else None
+            if claims is None:
+                return self._send_json({"detail": "Invalid or expired token"}, status=401)
+            user = self.state.users.get(claims["sub"], {})
+            return self._send_json({"access_token": make_token(claims["sub"]), "token_type": "bearer",
+                                    "user": {k: v for k, v in user.items() if k != "password"}})
+        if path == "/api/auth/logout":
+            self._read_body()
+            return self._send_json({"message": "Logged out"})
+        if path == "/inspect-files/":
+            fields, files = self._read_form()
+            if "pptx_file" not in files or "pdf_file" not in files:
+                return self._send_json({"detail": "Both pptx_file and pdf_file are required"}, status=422)
+            results = {"is_valid": True, "warnings": [], "slide_stats": self.state.slide_stats()}
+            if self.state.upload_ids:
+                results["upload_id"] = self.state.keep_upload(files)
+            return self._send_json(results)
+        if path == "/upload-and-process/":
+            fields, files = self._read_form()
+            if self.state.upload_ids and "upload_id" in fields and not files:
+                files = self.state.take_upload(fields.pop("upload_id"))
+                if files is None:
+                    return self._send_json({"detail": "Upload not found or expired"}, status=404)
+            if "pptx_file" not in files or "pdf_file" not in files:
+                return self._send_json({"detail": "Both pptx_file and pdf_file are required"}, status=422)
+            job_id = self.state.create_job(fields, files["pptx_file"][0])
+            return self._send_json({"job_id": job_id, "status": "processing", "warnings": []})
+        match = re.match(r"^/cancel-job/([^/]+)$", path)
+        if match:
+            self._read_body()
+            job_status = self.state.cancel_job(match.group(1))
+            if job_status is None:
+                return self._send_json({"detail": "Job not found"}, status=404)
+            if job_status["status"] != "processing":
+                return self._send_json({"detail": f"Job already {job_status['status']}"}, status=409)
+            return self._send_json(self.state.job_status(match.group(1)))
+        return self._send_json({"detail": "Not Found"}, status=404)
+
+    # Streaming responses ----------------------------------------------------------
+
+    def _stream_job_events(self, job_id):
+        if job_id not in self.state.jobs:
+            return self._send_json({"detail": "Job not found"}, status=404)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        last_sent = None
+        last_write = 0
+        try:
+            while True:
+                job_status = self.state.job_status(job_id)
+                key = (job_status["status"], job_status.get("stage"), json.dumps(job_status.get("progress")))
+                if key != last_sent:
+                    self._write_chunk(f"event: status\ndata: {json.dumps(job_status)}\n\n".encode("utf-8"))
+                    last_sent, last_write = key, time.time()
+                elif time.time() - last_write > 15:
+                    self._write_chunk(b": keep-alive\n\n")
+                    last_write = time.time()
+                if job_status["status"] in ("completed", "failed", "cancelled"):
+                    self._write_chunk(b"")
+                    return
+                time.sleep(0.2)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_download(self, job_id):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.openxmlformats-officedocument.presentationml.presentation")
+        self.send_header("Content-Length", str(self.state.download_size))
+        self.send_header("Content-Disposition", f'attachment; filename="{self.state.jobs[job_id]["output_filename"]}"')
+        self.end_headers()
+        chunk = b"\0" * 65536
+        remaining = self.state.download_size
+        while remaining > 0:
+            self.wfile.write(chunk[:remaining])
+            remaining -= len(chunk)
+
+
+def make_server(host="127.0.0.1", port=0, **options):
+    """Create (but do not start) a mock API server; port 0 picks a free port"""
+    handler = type("BoundMockHandler", (MockHandler,), {"state": MockState(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = handler.state
+    return server
+
+
+def start_in_thread(**options):
+    """Start a mock API server in a daemon thread and return (server, base_url)"""
+    server = make_server(**options)
+    threading.Thread(target=server.serve_forever, name="mock-api", daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local mock of the InsightGen API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--job-duration", type=float, default=30.0, help="Seconds each simulated job takes")
+    parser.add_argument("--slides", type=int, default=20, help="Total slides reported by inspection")
+    parser.add_argument("--no-push", action="store_true", help="Disable the SSE job-events endpoint")
+    parser.add_argument("--progress-counters", action="store_true", help="Report per-slide progress counters")
+    parser.add_argument("--no-compression", action="store_true", help="Refuse compressed request bodies")
+    parser.add_argument("--no-upload-ids", action="store_true", help="Do not keep inspected uploads for processing")
+    parser.add_argument("--workers", type=int, help="Run at most this many jobs at once, queued by priority")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Up to this many more seconds, at random")
+    parser.add_argument("--download-kb", type=int, default=1024, help="Size of processed presentations")
+    parser.add_argument("--generators", type=int, default=1, help="Generators in the catalog")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, job_duration=args.job_duration, total_slides=args.slides,
+                         push=not args.no_push, progress_counters=args.progress_counters,
+                         compression=not args.no_compression, upload_ids=not args.no_upload_ids, workers=args.workers,
+                         latency=args.latency, latency_jitter=args.latency_jitter,
+                         download_size=args.download_kb * 1024, generators=args.generators)
+    print(f"Mock InsightGen API listening on http://{args.host}:{args.port} (login: demo / Demo1234)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
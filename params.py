@@ -1,3 +1,22 @@
+import os
+import tempfile
+
+
+def _default_data_dir():
+    """~/.insightgen, or a directory under the system temp dir when the home directory is read-only
+
+    (App Engine standard, for one, only lets the app write to /tmp.)
+    """
+    home = os.path.expanduser("~")
+    path = os.path.join(home, ".insightgen")
+    if os.path.isdir(path) or (os.path.isdir(home) and os.access(home, os.W_OK)):
+        return path
+    return os.path.join(tempfile.gettempdir(), "insightgen")
+
+
+# Local directory for client-side caches and job history
+DATA_DIR = os.getenv("INSIGHTGEN_DATA_DIR") or _default_data_dir()
+
 # Default few-shot examples for headline generation
 
 DEFAULT_FEW_SHOT_EXAMPLES = '''# Example 1:
@@ -0,0 +1,84 @@
+import os
+import statistics
+import time
+
+# Adaptive poll interval for job-status polling.
+# Starts at MIN_INTERVAL, backs off exponentially while the job status stays
+# the same (never polling faster than a small fraction of the elapsed job
+# time), and is capped both by MAX_INTERVAL and by a fraction of the stage
+# durations observed so far (so short stages are still picked up quickly).
+# Any status change resets the interval to MIN_INTERVAL.
+
+MIN_INTERVAL = float(os.getenv("JOB_POLL_MIN_INTERVAL", "1"))
+MAX_INTERVAL = float(os.getenv("JOB_POLL_MAX_INTERVAL", "8"))
+BACKOFF_FACTOR = float(os.getenv("JOB_POLL_BACKOFF_FACTOR", "1.5"))
+# While the status is unchanged, poll at most every elapsed * ELAPSED_FRACTION seconds (e.g. 2% of the run time)
+ELAPSED_FRACTION = 0.02
+# Poll at most every STAGE_FRACTION of the typical observed stage duration
+STAGE_FRACTION = 0.1
+
+
+def status_key(job_status):
+    """Part of a job-status payload whose change should reset the backoff"""
+    if not job_status:
+        return None
+    return [job_status.get("status"), job_status.get("stage")]
+
+
+class PollScheduler:
+    """Computes the delay before the next job-status poll"""
+
+    def __init__(self, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL, factor=BACKOFF_FACTOR,
+                 start_time=None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.start_time = start_time if start_time is not None else time.time()
+        self.last_key = None
+        self.stage_started = self.start_time
+        self.stage_durations = []
+        self.polls_since_change = 0
+
+    def observe(self, job_status, now=None):
+        """Record a poll result; returns True if the status changed"""
+        now = now if now is not None else time.time()
+        key = status_key(job_status)
+        if key == self.last_key:
+            self.polls_since_change += 1
+            return False
+        if self.last_key is not None:
+            self.stage_durations.append(now - self.stage_started)
+        self.last_key = key
+        self.stage_started = now
+        self.polls_since_change = 0
+        return True
+
+    def next_interval(self, now=None):
+        """Seconds to wait before the next poll"""
+        now = now if now is not None else time.time()
+        interval = self.min_interval * self.factor ** self.polls_since_change
+        if self.polls_since_change:
+            # Right after a change the next poll comes quickly, however long the job has run
+            interval = max(interval, (now - self.start_time) * ELAPSED_FRACTION)
+        if self.stage_durations:
+            interval = min(interval, STAGE_FRACTION * statistics.median(self.stage_durations))
+        return max(self.min_interval, min(interval, self.max_interval))
+
+    def to_dict(self):
+        """Serializable state (e.g. for a dcc.Store between Dash callbacks)"""
+        return {
+            "start_time": self.start_time,
+            "last_key": self.last_key,
+            "stage_started": self.stage_started,
+            "stage_durations": self.stage_durations,
+            "polls_since_change": self.polls_since_change,
+        }
+
+    @classmethod
+    def from_dict(cls, data, **kwargs):
+        scheduler = cls(start_time=data.get("start_time"), **kwargs)
+        scheduler.last_key = data.get("last_key")
+        scheduler.stage_started = data.get("stage_started", scheduler.start_time)
+        scheduler.stage_durations = list(data.get("stage_durations", []))
+        scheduler.polls_since_change = data.get("polls_since_change", 0)
+        return scheduler
@@ -0,0 +1,172 @@
+import gzip
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import flask
+
+from api_client import parse_accept_encoding
+
+# Compressed static responses for the Dash server.
+# Dash serves its component bundles (React, dash-renderer, core and bootstrap
+# components: several MB of JavaScript) and /assets uncompressed. Each
+# response is compressed once per process (brotli when the brotli package is
+# installed and the browser accepts it, gzip otherwise) and the compressed
+# copy is kept in memory, so every later visitor gets it without any
+# compression work. warm() fills the cache for everything the index page
+# references, so not even the first visitor after a cold start waits for it.
+# The cache is keyed by path and Dash's cache-busting parameters only (so
+# junk query strings do not add entries) and bounded, least recently used
+# copies going first.
+# Files under /assets/ with a .br or .gz sibling written by build_assets.py are
+# served from that sibling instead, and the fingerprinted build output in
+# /assets/dist/ gets an immutable one-year cache lifetime.
+
+COMPRESSIBLE_PREFIXES = ("/_dash-component-suites/", "/assets/")
+COMPRESSIBLE_MIMETYPES = frozenset([
+    "application/javascript", "text/javascript", "text/css", "application/json", "image/svg+xml", "text/plain",
+])
+STATIC_COMPRESSION_MIN_BYTES = int(os.getenv("STATIC_COMPRESSION_MIN_BYTES", "1024"))
+STATIC_GZIP_LEVEL = int(os.getenv("STATIC_GZIP_LEVEL", "9"))
+STATIC_BROTLI_QUALITY = int(os.getenv("STATIC_BROTLI_QUALITY", "11"))
+STATIC_CACHE_MAX_BYTES = int(os.getenv("STATIC_CACHE_MAX_MB", "32")) * 1024 * 1024
+STATIC_CACHE_MAX_ENTRIES = 1024
+# Query parameters Dash adds to static URLs when their files change (m: assets mtime, v: package version)
+FINGERPRINT_PARAMS = ("m", "v")
+ASSETS_PREFIX = "/assets/"
+FINGERPRINTED_PREFIX = "/assets/dist/"
+FINGERPRINTED_MAX_AGE = 365 * 24 * 3600
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# Script and stylesheet URLs in the index page
+_INDEX_URL_RE = re.compile(r'(?:src|href)="([^"]+)"')
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def supported_encodings():
+    """Response encodings this process can produce, preferred first"""
+    return ("br", "gzip") if _brotli() else ("gzip",)
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return _brotli().compress(data, quality=STATIC_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=STATIC_GZIP_LEVEL, mtime=0)
+
+
+class CompressedStatic:
+    """after_request hook serving cached compressed copies of static responses"""
+
+    def __init__(self, assets_folder=None, max_bytes=STATIC_CACHE_MAX_BYTES, max_entries=STATIC_CACHE_MAX_ENTRIES):
+        self.assets_folder = assets_folder
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        # (path, fingerprint, encoding) -> compressed body, or None when compression does not pay off;
+        # least recently used first
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            body = self._cache.get(key, False)
+            if body is not False:
+                self._cache.move_to_end(key)
+            return body
+
+    def _put(self, key, body):
+        with self._lock:
+            previous = self._cache.pop(key, None)
+            self._cache_bytes -= len(previous or b"")
+            self._cache[key] = body
+            self._cache_bytes += len(body or b"")
+            while self._cache_bytes > self.max_bytes or len(self._cache) > self.max_entries:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= len(evicted or b"")
+
+    def install(self, server):
+        server.after_request(self.compress_response)
+        server.after_request(self.cache_fingerprinted)
+
+    def cache_fingerprinted(self, response):
+        if flask.request.path.startswith(FINGERPRINTED_PREFIX) and response.status_code in (200, 304):
+            # Flask marks static files no-cache by default
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = FINGERPRINTED_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    def precompressed_file(self, path, encoding):
+        """Contents of the build's compressed sibling of an /assets/ file, or None"""
+        if not self.assets_folder or not path.startswith(ASSETS_PREFIX):
+            return None
+        root = os.path.abspath(self.assets_folder)
+        filename = os.path.abspath(os.path.join(root, path[len(ASSETS_PREFIX):])) + ENCODING_SUFFIXES[encoding]
+        if not filename.startswith(root + os.sep):
+            return None
+        try:
+            with open(filename, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def compress_response(self, response):
+        request = flask.request
+        if (request.method != "GET" or response.status_code != 200 or "Content-Encoding" in response.headers
+                or "Range" in request.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or not request.path.startswith(COMPRESSIBLE_PREFIXES)):
+            return response
+        response.vary.add("Accept-Encoding")
+        accepted = parse_accept_encoding(request.headers.get("Accept-Encoding", ""))
+        encoding = next((e for e in supported_encodings() if e in accepted), None)
+        if encoding is None:
+            return response
+
+        key = (request.path, tuple(request.args.get(name) for name in FINGERPRINT_PARAMS), encoding)
+        body = self._get(key)
+        if body is False:
+            body = self.precompressed_file(request.path, encoding)
+            if body is None:
+                # send_file responses stream from disk; read them once to compress
+                response.direct_passthrough = False
+                data = response.get_data()
+                body = compress(data, encoding) if len(data) >= STATIC_COMPRESSION_MIN_BYTES else None
+                if body is not None and len(body) >= len(data):
+                    body = None
+            self._put(key, body)
+        if body is None:
+            return response
+
+        response.direct_passthrough = False
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        if response.headers.get("ETag"):
+            # A different representation needs its own validator
+            response.set_etag(f"{response.get_etag()[0]}-{encoding}", weak=True)
+            # The static route compared If-None-Match with the uncompressed validator
+            response.make_conditional(request)
+        return response
+
+    def warm(self, server):
+        """Compress everything the index page references; returns the number of responses cached"""
+        client = server.test_client()
+        index = client.get("/").get_data(as_text=True)
+        urls = [url for url in _INDEX_URL_RE.findall(index) if url.startswith(COMPRESSIBLE_PREFIXES)]
+        for url in urls:
+            for encoding in supported_encodings():
+                client.get(url, headers={"Accept-Encoding": encoding}).close()
+        return len(urls)
+
+    def stats(self):
+        with self._lock:
+            cached = [body for body in self._cache.values() if body is not None]
+        return {"responses": len(cached), "bytes": sum(len(body) for body in cached)}
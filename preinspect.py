@@ -0,0 +1,308 @@
+import mmap
+import posixpath
+import re
+import zipfile
+import zlib
+from contextlib import contextmanager
+from xml.etree import ElementTree
+
+# Local pre-inspection of a PPTX/PDF pair before anything is uploaded.
+# Reads slide order, layout names, hidden flags and title placeholders from
+# the PPTX zip (one small XML part at a time) and the page count from the PDF
+# (linearization header, or trailer /Root -> catalog /Pages -> /Count, found
+# by scanning the memory-mapped file rather than parsing it). The result mirrors the
+# /inspect-files/ response so the UIs can render it unchanged; pairs that are
+# obviously invalid (corrupt files, slide/page count mismatch) never reach the
+# network. The API's inspection stays authoritative for everything else.
+
+HEADER_LAYOUT_PREFIX = "HEADER"
+TITLE_PLACEHOLDER_TYPES = ("title", "ctrTitle")
+
+_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_LINEARIZED_RE = re.compile(rb"/Linearized\s[^>]*?/N\s+(\d+)", re.S)
+_PAGES_RE = re.compile(rb"/Type\s*/Pages(?![A-Za-z0-9])")
+_COUNT_RE = re.compile(rb"/Count\s+(\d+)")
+_ROOT_RE = re.compile(rb"/Root\s+(\d+)\s+(\d+)\s+R")
+_PAGES_REF_RE = re.compile(rb"/Pages\s+(\d+)\s+(\d+)\s+R")
+_OBJSTM_RE = re.compile(rb"/Type\s*/ObjStm(?![A-Za-z0-9])")
+_LENGTH_RE = re.compile(rb"/Length\s+(\d+)(?!\s+\d+\s+R)")
+_STREAM_RE = re.compile(rb"\s*stream\r?\n")
+_ENDSTREAM_RE = re.compile(rb"endstream")
+# How far around a match to look for the enclosing << >> dictionary
+_DICT_WINDOW = 4096
+# How much of the end of the file to search for the trailer
+_TRAILER_WINDOW = 64 * 1024
+
+
+class PreinspectError(ValueError):
+    """Raised when a file cannot be read as a PPTX or PDF"""
+
+
+################################################################################
+# PPTX
+################################################################################
+
+def _rels(archive, part):
+    """Relationship id -> (type, target part) for an OPC part"""
+    directory, name = posixpath.split(part)
+    rels_part = posixpath.join(directory, "_rels", f"{name}.rels")
+    try:
+        root = ElementTree.fromstring(archive.read(rels_part))
+    except KeyError:
+        return {}
+    rels = {}
+    for rel in root.iter(f"{_REL}Relationship"):
+        target = rel.get("Target", "")
+        target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(directory, target))
+        rels[rel.get("Id")] = (rel.get("Type", ""), target)
+    return rels
+
+
+def _scan_slide(archive, part):
+    """(hidden, has_title_placeholder) for a slide, streamed with iterparse"""
+    hidden, has_title = False, False
+    with archive.open(part) as f:
+        for event, element in ElementTree.iterparse(f, events=("start",)):
+            if element.tag == f"{_P}sld":
+                hidden = element.get("show") in ("0", "false")
+            elif element.tag == f"{_P}ph" and element.get("type") in TITLE_PLACEHOLDER_TYPES:
+                has_title = True
+                break
+    return hidden, has_title
+
+
+def _layout_name(archive, part):
+    with archive.open(part) as f:
+        for event, element in ElementTree.iterparse(f, events=("start",)):
+            if element.tag == f"{_P}cSld":
+                return element.get("name", "")
+    return ""
+
+
+def inspect_pptx(fileobj):
+    """Slides of a PPTX in presentation order: [{number, layout, hidden, has_title}]"""
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise PreinspectError(f"Invalid or corrupt PPTX file: {str(e)}")
+
+    try:
+        with archive:
+            presentation_rels = _rels(archive, "ppt/presentation.xml")
+            presentation = ElementTree.fromstring(archive.read("ppt/presentation.xml"))
+            layout_names = {}
+            slides = []
+            for number, slide_id in enumerate(presentation.iter(f"{_P}sldId"), start=1):
+                _, slide_part = presentation_rels[slide_id.get(f"{_R}id")]
+                hidden, has_title = _scan_slide(archive, slide_part)
+                layout_part = next((target for rel_type, target in _rels(archive, slide_part).values()
+                                    if rel_type.endswith("/slideLayout")), None)
+                if layout_part and layout_part not in layout_names:
+                    layout_names[layout_part] = _layout_name(archive, layout_part)
+                slides.append({"number": number, "layout": layout_names.get(layout_part, ""),
+                               "hidden": hidden, "has_title": has_title})
+            return slides
+    except (KeyError, ElementTree.ParseError, zipfile.BadZipFile) as e:
+        raise PreinspectError(f"Invalid or corrupt PPTX file: {str(e)}")
+    finally:
+        fileobj.seek(0)
+
+
+################################################################################
+# PDF
+################################################################################
+
+@contextmanager
+def _pdf_buffer(fileobj):
+    """Bytes-like view of a file: memory-mapped when it is on disk"""
+    try:
+        fileno = fileobj.fileno()
+    except (AttributeError, OSError):
+        fileno = None
+    if fileno is not None:
+        try:
+            buffer = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise PreinspectError("Invalid or corrupt PDF file: the file is empty")
+        try:
+            yield buffer
+        finally:
+            buffer.close()
+    elif hasattr(fileobj, "getbuffer"):
+        yield fileobj.getbuffer()
+    else:
+        fileobj.seek(0)
+        yield fileobj.read()
+        fileobj.seek(0)
+
+
+def _enclosing_dict(data, pos):
+    """Bytes of the innermost << >> dictionary around pos (within a small window), or None"""
+    low = max(0, pos - _DICT_WINDOW)
+    window = bytes(data[low:min(len(data), pos + _DICT_WINDOW)])
+    offset = pos - low
+
+    depth, i = 0, offset
+    while i >= 2:
+        pair = window[i - 2:i]
+        if pair == b">>":
+            depth += 1
+            i -= 2
+        elif pair == b"<<":
+            if depth == 0:
+                break
+            depth -= 1
+            i -= 2
+        else:
+            i -= 1
+    else:
+        return None
+
+    start = i - 2
+    depth, i = 0, start
+    while i < len(window) - 1:
+        pair = window[i:i + 2]
+        if pair == b"<<":
+            depth += 1
+            i += 2
+        elif pair == b">>":
+            depth -= 1
+            i += 2
+            if depth == 0:
+                return window[start:i]
+        else:
+            i += 1
+    return None
+
+
+def _object_dict(data, number, generation):
+    """Dictionary of an uncompressed indirect object, or None"""
+    header = re.search(rb"(?<!\d)%d\s+%d\s+obj\s*<<" % (number, generation), data)
+    return _enclosing_dict(data, header.end()) if header else None
+
+
+def _trailer_count(data):
+    """/Count of the page tree root, following the trailer's /Root to the catalog"""
+    # The last /Root reference is in the newest trailer (or cross-reference stream dictionary)
+    root = None
+    for root in _ROOT_RE.finditer(data, max(0, len(data) - _TRAILER_WINDOW)):
+        pass
+    catalog = _object_dict(data, int(root.group(1)), int(root.group(2))) if root else None
+    pages_ref = _PAGES_REF_RE.search(catalog) if catalog else None
+    pages = _object_dict(data, int(pages_ref.group(1)), int(pages_ref.group(2))) if pages_ref else None
+    count = _COUNT_RE.search(pages) if pages else None
+    return int(count.group(1)) if count else None
+
+
+def _page_tree_counts(data):
+    """/Count of every /Type /Pages dictionary in data"""
+    counts = []
+    for match in _PAGES_RE.finditer(data):
+        dictionary = _enclosing_dict(data, match.start())
+        count = _COUNT_RE.search(dictionary) if dictionary else None
+        if count:
+            counts.append(int(count.group(1)))
+    return counts
+
+
+def _object_streams(data):
+    """Decompressed contents of the PDF's object streams (PDF 1.5+ compressed objects)"""
+    for match in _OBJSTM_RE.finditer(data):
+        dictionary = _enclosing_dict(data, match.start())
+        if not dictionary or b"/FlateDecode" not in dictionary:
+            continue
+        dict_end = bytes(data[match.start():match.start() + _DICT_WINDOW]).find(dictionary[-32:])
+        if dict_end < 0:
+            continue
+        stream_start = match.start() + dict_end + len(dictionary[-32:])
+        header = _STREAM_RE.match(bytes(data[stream_start:stream_start + 8]))
+        if not header:
+            continue
+        stream_start += header.end()
+        length = _LENGTH_RE.search(dictionary)
+        if length:
+            raw = data[stream_start:stream_start + int(length.group(1))]
+        else:
+            end = _ENDSTREAM_RE.search(data, stream_start)
+            raw = data[stream_start:end.start()] if end else b""
+        try:
+            yield zlib.decompressobj().decompress(bytes(raw))
+        except zlib.error:
+            continue
+
+
+def pdf_page_count(fileobj):
+    """Number of pages in a PDF, or None if it cannot be determined cheaply"""
+    with _pdf_buffer(fileobj) as data:
+        if b"%PDF-" not in bytes(data[:1024]):
+            raise PreinspectError("Invalid or corrupt PDF file: missing PDF header")
+
+        # Linearized PDFs state the page count in their first object
+        linearized = _LINEARIZED_RE.search(bytes(data[:2048]))
+        if linearized:
+            return int(linearized.group(1))
+
+        count = _trailer_count(data)
+        if count is not None:
+            return count
+
+        # Catalog not found (e.g. stored in an object stream): the root of the page tree has the largest /Count
+        counts = _page_tree_counts(data)
+        if not counts:
+            for contents in _object_streams(data):
+                counts.extend(_page_tree_counts(contents))
+        return max(counts) if counts else None
+
+
+################################################################################
+# Pre-inspection
+################################################################################
+
+def preinspect(pptx_fileobj, pdf_fileobj):
+    """Inspect a PPTX/PDF pair locally; the result is shaped like the /inspect-files/ response
+
+    is_valid is False only for problems the API would reject anyway
+    (unreadable files, slide/page count mismatch).
+    """
+    errors, warnings = [], []
+    slides, page_count = [], None
+    try:
+        slides = inspect_pptx(pptx_fileobj)
+    except PreinspectError as e:
+        errors.append(str(e))
+    try:
+        page_count = pdf_page_count(pdf_fileobj)
+    except PreinspectError as e:
+        errors.append(str(e))
+
+    header_numbers = [s["number"] for s in slides if s["layout"].strip().upper().startswith(HEADER_LAYOUT_PREFIX)]
+    content = [s for s in slides if s["number"] not in header_numbers]
+    missing_numbers = [s["number"] for s in content if not s["has_title"]]
+    hidden_numbers = [s["number"] for s in slides if s["hidden"]]
+
+    if slides and page_count is not None and page_count != len(slides):
+        message = f"Slide count mismatch: the PPTX has {len(slides)} slides but the PDF has {page_count} pages"
+        if hidden_numbers and page_count == len(slides) - len(hidden_numbers):
+            message += f" (hidden slides: {', '.join(map(str, hidden_numbers))})"
+        errors.append(message)
+    elif hidden_numbers:
+        warnings.append(f"The PPTX has hidden slides: {', '.join(map(str, hidden_numbers))}")
+    if slides and not header_numbers:
+        warnings.append(f"No header slides found (layout names starting with '{HEADER_LAYOUT_PREFIX}')")
+
+    return {
+        "is_valid": not errors,
+        "errors": errors,
+        "warnings": warnings,
+        "source": "local",
+        "pdf_pages": page_count,
+        "slide_stats": {
+            "total_slides": len(slides),
+            "header_slides": {"count": len(header_numbers), "slide_numbers": header_numbers},
+            "content_slides": {"count": len(content), "slide_numbers": [s["number"] for s in content]},
+            "missing_placeholders": {"count": len(missing_numbers), "slide_numbers": missing_numbers},
+        },
+    }
@@ -0,0 +1,148 @@
+import json
+import os
+import statistics
+import threading
+import time
+
+from params import DATA_DIR
+
+# Job progress model shared by the Streamlit and Dash front ends.
+# Uses the per-slide counters in the job-status payload when the API reports
+# them. Otherwise estimates progress and ETA from the historic average time
+# per content slide (from completed jobs' metrics) times the number of
+# content slides found during inspection.
+
+# (stage name, detail text, progress % at stage start, progress % at stage end)
+STAGES = [
+    ("Slide processing", "Preparing slides for analysis...", 5, 20),
+    ("Generating observations", "Analyzing slide content...", 20, 80),
+    ("Generating headlines", "Creating impactful headlines...", 80, 95),
+    ("Updating presentation", "Inserting headlines into slides...", 95, 99),
+]
+
+# Used until the first job has completed on this machine
+DEFAULT_SECONDS_PER_SLIDE = float(os.getenv("DEFAULT_SECONDS_PER_SLIDE", "8"))
+HISTORY_FILE = os.path.join(DATA_DIR, "eta_history.json")
+HISTORY_SIZE = 50
+
+_history_lock = threading.Lock()
+
+
+def _load_history():
+    try:
+        with open(HISTORY_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def record_job_metrics(metrics):
+    """Add a completed job's per-slide time to the ETA history"""
+    seconds_per_slide = (metrics or {}).get("average_time_per_content_slide")
+    if not seconds_per_slide or seconds_per_slide <= 0:
+        return
+    with _history_lock:
+        history = _load_history()
+        history.append(seconds_per_slide)
+        os.makedirs(DATA_DIR, exist_ok=True)
+        with open(HISTORY_FILE, "w") as f:
+            json.dump(history[-HISTORY_SIZE:], f)
+
+
+# (history file mtime, median) so callers don't re-read the file on every tick
+_median_cache = [None, None]
+
+
+def historic_seconds_per_slide():
+    """Median time per content slide over recent jobs (or the default)"""
+    try:
+        mtime = os.path.getmtime(HISTORY_FILE)
+    except OSError:
+        return DEFAULT_SECONDS_PER_SLIDE
+    if _median_cache[0] != mtime:
+        history = _load_history()
+        _median_cache[:] = [mtime, statistics.median(history) if history else DEFAULT_SECONDS_PER_SLIDE]
+    return _median_cache[1]
+
+
+def content_slide_count(inspection_results):
+    """Number of content slides from an /inspect-files/ response"""
+    stats = (inspection_results or {}).get("slide_stats") or {}
+    return (stats.get("content_slides") or {}).get("count")
+
+
+def _stage_index(name):
+    for index, stage in enumerate(STAGES):
+        if stage[0] == name:
+            return index
+    return None
+
+
+def _stage_for_percent(percent):
+    for index, (_, _, start, end) in enumerate(STAGES):
+        if percent < end:
+            return index
+    return len(STAGES) - 1
+
+
+class ProgressModel:
+    """Turns job-status payloads into a progress percentage, stage and ETA"""
+
+    def __init__(self, content_slides=None, seconds_per_slide=None, start_time=None):
+        self.content_slides = content_slides
+        self.seconds_per_slide = seconds_per_slide or historic_seconds_per_slide()
+        self.start_time = start_time if start_time is not None else time.time()
+
+    @property
+    def expected_seconds(self):
+        return self.seconds_per_slide * (self.content_slides or 1)
+
+    def estimate(self, job_status, now=None):
+        """Return {percent, stage_number, stage, detail, eta_seconds, source}"""
+        now = now if now is not None else time.time()
+        elapsed = max(0.0, now - self.start_time)
+        job_status = job_status or {}
+        progress = job_status.get("progress") or {}
+        reported_stage = _stage_index(job_status.get("stage") or progress.get("stage"))
+        completed_slides = progress.get("slides_completed")
+        total_slides = progress.get("slides_total")
+
+        if completed_slides is not None and total_slides:
+            # Server-reported counters: position within the current stage
+            source = "server"
+            stage = reported_stage if reported_stage is not None else 1
+            _, _, start, end = STAGES[stage]
+            percent = start + (end - start) * min(completed_slides / total_slides, 1.0)
+            fraction = percent / 100
+            eta = elapsed * (1 - fraction) / fraction if fraction > 0.05 else self.expected_seconds - elapsed
+        else:
+            # ETA model: expected duration from historic per-slide time
+            source = "estimate"
+            fraction = min(elapsed / self.expected_seconds, 1.0)
+            percent = STAGES[0][2] + (STAGES[-1][3] - STAGES[0][2]) * fraction
+            stage = _stage_for_percent(percent)
+            if reported_stage is not None and reported_stage != stage:
+                # Trust the server's stage: clamp the estimate into it
+                stage = reported_stage
+                percent = min(max(percent, STAGES[stage][2]), STAGES[stage][3])
+            eta = self.expected_seconds - elapsed
+
+        name, detail, _, _ = STAGES[stage]
+        return {
+            "percent": int(min(percent, 99)),
+            "stage_number": stage + 1,
+            "stage": name,
+            "detail": detail,
+            # Past the expected duration there is no meaningful ETA
+            "eta_seconds": max(0, int(eta)) if eta > 0 else None,
+            "source": source,
+        }
+
+
+def describe(estimate):
+    """Human readable status line for a progress estimate"""
+    text = f"Stage {estimate['stage_number']}/{len(STAGES)}: {estimate['stage']} - {estimate['detail']}"
+    eta = estimate["eta_seconds"]
+    if eta:
+        text += f" (about {eta // 60}m {eta % 60:02d}s remaining)" if eta >= 60 else f" (about {eta}s remaining)"
+    return text
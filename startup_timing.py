@@ -0,0 +1,45 @@
+import json
+import time
+
+# Startup timing of the Dash server.
+# dash_app imports this module before anything else and marks the end of each
+# startup phase (imports, app setup, layout and callbacks); the report
+# is logged when the first request arrives and returned by the warmup route,
+# so the cost of a cold start can be read from the App Engine logs.
+
+_started = time.perf_counter()
+_marks = []
+
+
+def mark(phase):
+    """Record the end of a startup phase (only the first mark of each name counts)"""
+    if phase not in (name for name, _ in _marks):
+        _marks.append((phase, time.perf_counter()))
+
+
+def process_uptime():
+    """Seconds since the process started, or None if psutil is not installed"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return time.time() - psutil.Process().create_time()
+
+
+def report():
+    """{"phases": [{"phase", "ms"}], "total_ms", "process_uptime_ms"}"""
+    phases, previous = [], _started
+    for name, at in _marks:
+        phases.append({"phase": name, "ms": round((at - previous) * 1000, 1)})
+        previous = at
+    uptime = process_uptime()
+    return {
+        "phases": phases,
+        "total_ms": round((previous - _started) * 1000, 1),
+        # Includes interpreter startup, which happens before this module is imported
+        "process_uptime_ms": round(uptime * 1000, 1) if uptime is not None else None,
+    }
+
+
+def log_report():
+    print(f"Startup timing: {json.dumps(report())}")
@@ -0,0 +1,252 @@
+import abc
+import json
+import os
+import re
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from params import DATA_DIR
+
+# Shared state backend.
+# Session state, token verifications, inspection results and job tracking
+# that must outlive one server process (or be seen by every instance behind
+# a load balancer) go through a small key-value store with per-key expiry:
+#
+#   memory     this process only (the default; one instance, one process)
+#   sqlite     a SQLite file shared by every process on the host
+#   redis      a Redis server shared by every instance (STATE_REDIS_URL,
+#              needs the `redis` package)
+#   fakeredis  an in-process stand-in for Redis that runs the shared-state
+#              code paths without a server (tests and local development)
+#
+# Values are bytes; get_json()/set_json() store JSON documents. Backends
+# with `shared` set are visible to every instance of the app, so callers
+# mirror their per-instance state (uploads, job records, batches) into them.
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+STATE_SQLITE_PATH = os.getenv("STATE_SQLITE_PATH", os.path.join(DATA_DIR, "state.sqlite"))
+STATE_REDIS_URL = os.getenv("STATE_REDIS_URL", "redis://localhost:6379/0")
+# Namespace for the keys, so several deployments can share one Redis
+STATE_KEY_PREFIX = os.getenv("STATE_KEY_PREFIX", "insightgen:")
+# Streamlit sessions untouched for this long are dropped
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(7 * 86400)))
+MEMORY_MAX_ENTRIES = 10000
+
+# Identifies this instance in state shared with the others (job ids of Dash background callbacks)
+INSTANCE_ID = os.getenv("GAE_INSTANCE") or socket.gethostname()
+
+# Expired SQLite rows are purged at most this often
+_PURGE_INTERVAL_SECONDS = 60
+
+# Session ids come back from the URL, so only accept ones new_id() could have made
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{32}$")
+
+
+class StateBackend(abc.ABC):
+    """Byte values under string keys, each with an optional time to live in seconds"""
+
+    # Every instance of the app sees the same state
+    shared = False
+    # The state lives in this process only (child processes see their own copy)
+    process_local = False
+
+    @abc.abstractmethod
+    def get(self, key):
+        """Value stored under key, or None when missing or expired"""
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl=None):
+        """Store value (bytes) under key, expiring after ttl seconds when given"""
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """Remove key if present"""
+
+    def get_json(self, key, default=None):
+        value = self.get(key)
+        return default if value is None else json.loads(value)
+
+    def set_json(self, key, value, ttl=None):
+        self.set(key, json.dumps(value).encode("utf-8"), ttl=ttl)
+
+
+class MemoryBackend(StateBackend):
+    """Dict in this process; the least recently written keys go beyond max_entries"""
+
+    process_local = True
+
+    def __init__(self, max_entries=MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with self._lock:
+            # Re-inserted so the dict stays in write order
+            self._entries.pop(key, None)
+            self._entries[key] = (value, now + ttl if ttl else None)
+            if len(self._entries) > self.max_entries:
+                for expired in [k for k, (_, expires_at) in self._entries.items() if expires_at and expires_at <= now]:
+                    del self._entries[expired]
+                while len(self._entries) > self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteBackend(StateBackend):
+    """SQLite table shared by every process that opens the same file"""
+
+    def __init__(self, path=STATE_SQLITE_PATH):
+        self.path = path
+        self._last_purge = 0
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS state_expires ON state (expires_at)")
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed"""
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get(self, key):
+        with self._connect() as db:
+            row = db.execute("SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                             (key, time.time())).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                       (key, sqlite3.Binary(value), now + ttl if ttl else None))
+            if now - self._last_purge > _PURGE_INTERVAL_SECONDS:
+                self._last_purge = now
+                db.execute("DELETE FROM state WHERE expires_at <= ?", (now,))
+
+    def delete(self, key):
+        with self._connect() as db:
+            db.execute("DELETE FROM state WHERE key = ?", (key,))
+
+
+class RedisBackend(StateBackend):
+    """Keys in Redis under a prefix, expiring through Redis itself"""
+
+    shared = True
+
+    def __init__(self, client, prefix=STATE_KEY_PREFIX):
+        self.client = client
+        self.prefix = prefix
+        self.process_local = isinstance(client, FakeRedis)
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+class FakeRedis:
+    """The subset of redis-py's client that RedisBackend uses, kept in this process"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            value, expires_at = self._data.get(name, (None, None))
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name, value, ex=None, px=None):
+        ttl = px / 1000 if px else ex
+        with self._lock:
+            self._data[name] = (bytes(value), time.monotonic() + ttl if ttl else None)
+        return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+
+def create_backend(name=STATE_BACKEND):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("STATE_BACKEND=redis needs the redis package (pip install redis)")
+        return RedisBackend(redis.Redis.from_url(STATE_REDIS_URL))
+    if name == "fakeredis":
+        return RedisBackend(FakeRedis())
+    raise ValueError(f"Unknown STATE_BACKEND: {name!r} (memory, sqlite, redis or fakeredis)")
+
+
+class SessionStore:
+    """Streamlit session state kept in the state backend under a random session id"""
+
+    def __init__(self, backend, ttl_seconds=SESSION_TTL_SECONDS):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def new_id():
+        return secrets.token_urlsafe(24)
+
+    def load(self, session_id):
+        """The saved state of a session, or None if it is unknown or expired"""
+        if not isinstance(session_id, str) or not _SESSION_ID_RE.match(session_id):
+            return None
+        return self.backend.get_json(f"session:{session_id}")
+
+    def save(self, session_id, state):
+        self.backend.set_json(f"session:{session_id}", state, ttl=self.ttl_seconds)
+
+    def delete(self, session_id):
+        self.backend.delete(f"session:{session_id}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_state_backend():
+    """Return the process-wide state backend selected by STATE_BACKEND"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend()
+        return _backend
@@ -0,0 +1,161 @@
+import base64
+import os
+import uuid
+import zlib
+
+# Streaming multipart/form-data encoder for deck uploads.
+# Instead of building the whole request body in memory (which is what
+# requests does for files=...), the encoder reads each file in chunks while
+# the request is being sent, so peak memory stays at one chunk no matter how
+# large the PPTX/PDF is. When the API accepts compressed request bodies the
+# encoded body is gzip/zstd-compressed on the fly as it is sent.
+
+CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)))
+UPLOAD_GZIP_LEVEL = int(os.getenv("UPLOAD_GZIP_LEVEL", "6"))
+UPLOAD_ZSTD_LEVEL = int(os.getenv("UPLOAD_ZSTD_LEVEL", "3"))
+
+PPTX_MIME = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+PDF_MIME = "application/pdf"
+
+# Quotes and line breaks in header parameters are percent-encoded, as
+# urllib3 (and browsers, per the HTML5 form encoding) do for file names
+_HEADER_PARAM_ESCAPES = {ord("\n"): "%0A", ord("\r"): "%0D", ord('"'): "%22"}
+
+
+def _file_size(fileobj):
+    """Return the size of a seekable file object without reading it"""
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    return size
+
+
+def _header_param(value):
+    return str(value).translate(_HEADER_PARAM_ESCAPES)
+
+
+class MultipartEncoder:
+    """File-like multipart body that streams its parts chunk by chunk
+
+    fields: dict of plain form values
+    files: dict of field name -> (filename, file object, content type)
+    on_progress: optional callable(bytes_sent, total_bytes)
+    """
+
+    def __init__(self, fields=None, files=None, chunk_size=CHUNK_SIZE, on_progress=None):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+
+        # Each part is either a bytes blob or a (file object, size) pair
+        self._parts = []
+        for name, value in (fields or {}).items():
+            if value is None:
+                continue
+            self._parts.append(self._header(name) + str(value).encode("utf-8") + b"\r\n")
+        for name, (filename, fileobj, content_type) in (files or {}).items():
+            self._parts.append(self._header(name, filename, content_type))
+            self._parts.append((fileobj, _file_size(fileobj)))
+            self._parts.append(b"\r\n")
+        self._parts.append(f"--{self.boundary}--\r\n".encode("utf-8"))
+
+        self.total = sum(len(p) if isinstance(p, bytes) else p[1] for p in self._parts)
+        self.bytes_sent = 0
+        self._index = 0
+        self._offset = 0
+
+    def _header(self, name, filename=None, content_type=None):
+        disposition = f'form-data; name="{_header_param(name)}"'
+        if filename is not None:
+            disposition += f'; filename="{_header_param(filename)}"'
+        header = f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+        if content_type:
+            header += f"Content-Type: {content_type}\r\n"
+        return (header + "\r\n").encode("utf-8")
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def read(self, size=-1):
+        """Return up to size bytes of the encoded body"""
+        if size is None or size < 0:
+            size = self.total - self.bytes_sent
+        out = bytearray()
+        while len(out) < size and self._index < len(self._parts):
+            part = self._parts[self._index]
+            wanted = size - len(out)
+            if isinstance(part, bytes):
+                piece = part[self._offset:self._offset + wanted]
+                self._offset += len(piece)
+                done = self._offset >= len(part)
+            else:
+                fileobj, part_size = part
+                if self._offset == 0:
+                    fileobj.seek(0)
+                piece = fileobj.read(min(wanted, self.chunk_size, part_size - self._offset))
+                self._offset += len(piece)
+                done = not piece or self._offset >= part_size
+            out += piece
+            if done:
+                self._index += 1
+                self._offset = 0
+
+        self.bytes_sent += len(out)
+        if out and self.on_progress:
+            self.on_progress(self.bytes_sent, self.total)
+        return bytes(out)
+
+
+def supported_encodings():
+    """Request body encodings this client can produce, most preferred first"""
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return ["gzip"]
+    return ["zstd", "gzip"]
+
+
+def _compressor(encoding):
+    if encoding == "gzip":
+        return zlib.compressobj(UPLOAD_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if encoding == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=UPLOAD_ZSTD_LEVEL).compressobj()
+    raise ValueError(f"Unsupported request encoding: {encoding}")
+
+
+def compressed_chunks(body, encoding):
+    """Compress an iterable body chunk by chunk (sent with chunked transfer encoding)"""
+    compressor = _compressor(encoding)
+    for chunk in body:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def deck_files(pptx_name, pptx_fileobj, pdf_name, pdf_fileobj):
+    """Build the files mapping expected by /inspect-files/ and /upload-and-process/"""
+    return {
+        "pptx_file": (pptx_name, pptx_fileobj, PPTX_MIME),
+        "pdf_file": (pdf_name, pdf_fileobj, PDF_MIME),
+    }
+
+
+def iter_base64_decoded(content_string, chunk_size=CHUNK_SIZE):
+    """Decode a base64 string chunk by chunk
+
+    Avoids holding a second full-size bytes copy of the decoded upload.
+    """
+    # Decode on 4-character boundaries so every slice is valid base64
+    step = max(4, chunk_size // 3 * 4)
+    for start in range(0, len(content_string), step):
+        yield base64.b64decode(content_string[start:start + step])
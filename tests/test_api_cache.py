@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+import requests
+
+import api_cache
+from api_cache import TTLCache
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None, etag=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = {"ETag": etag} if etag else {}
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+
+class FakeClient:
+    """Returns the queued responses (or raises queued exceptions) and records request headers"""
+
+    base_url = "http://api.test"
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, path, token=None, headers=None):
+        self.requests.append((path, token, dict(headers or {})))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(api_cache.time, "time", lambda: now[0])
+    return now
+
+
+def wait_for_refresh():
+    for thread in threading.enumerate():
+        if thread.name == "api-cache-refresh":
+            thread.join(5)
+
+
+def test_fresh_values_are_served_from_cache(clock):
+    cache = TTLCache(ttl=10, stale_ttl=100)
+    client = FakeClient(FakeResponse(payload={"generators": ["a"]}))
+    assert cache.get_json(client, "/generators") == {"generators": ["a"]}
+    clock[0] += 9
+    assert cache.get_json(client, "/generators") == {"generators": ["a"]}
+    assert len(client.requests) == 1
+    assert (cache.stats()["misses"], cache.stats()["hits"]) == (1, 1)
+
+
+def test_entries_are_per_token(clock):
+    cache = TTLCache(ttl=10)
+    client = FakeClient(FakeResponse(payload="alice"), FakeResponse(payload="bob"))
+    assert cache.get_json(client, "/me", token="a") == "alice"
+    assert cache.get_json(client, "/me", token="b") == "bob"
+
+
+def test_stale_values_are_served_while_revalidating_with_the_etag(clock):
+    cache = TTLCache(ttl=10, stale_ttl=100)
+    client = FakeClient(FakeResponse(payload=[1], etag='"v1"'), FakeResponse(status_code=304))
+    cache.get_json(client, "/generators")
+    clock[0] += 50
+    assert cache.get_json(client, "/generators") == [1]
+    wait_for_refresh()
+    assert client.requests[1][2] == {"If-None-Match": '"v1"'}
+    assert (cache.stats()["stale_hits"], cache.stats()["not_modified"]) == (1, 1)
+    # The 304 made the entry fresh again
+    assert cache.get_json(client, "/generators") == [1]
+    assert len(client.requests) == 2
+
+
+def test_failed_revalidation_keeps_the_stale_value(clock):
+    cache = TTLCache(ttl=10, stale_ttl=100)
+    client = FakeClient(FakeResponse(payload=[1]), requests.ConnectionError("down"), FakeResponse(payload=[2]))
+    cache.get_json(client, "/generators")
+    clock[0] += 50
+    assert cache.get_json(client, "/generators") == [1]
+    wait_for_refresh()
+    assert cache.stats()["errors"] == 1
+    # Still stale, so the next read tries again
+    assert cache.get_json(client, "/generators") == [1]
+    wait_for_refresh()
+    assert cache.get_json(client, "/generators") == [2]
+
+
+def test_expired_values_are_fetched_again_and_errors_raise(clock):
+    cache = TTLCache(ttl=10, stale_ttl=100)
+    client = FakeClient(FakeResponse(payload=[1]), FakeResponse(status_code=503))
+    cache.get_json(client, "/generators")
+    clock[0] += 111
+    with pytest.raises(requests.HTTPError):
+        cache.get_json(client, "/generators")
+    assert cache.stats()["errors"] == 1
+
+
+def test_oldest_entry_is_dropped_when_full(clock):
+    cache = TTLCache(ttl=10, max_entries=2)
+    client = FakeClient(*[FakeResponse(payload=n) for n in range(4)])
+    for path in ("/a", "/b", "/c"):
+        clock[0] += 1
+        cache.get_json(client, path)
+    assert cache.stats()["entries"] == 2
+    assert cache.get_json(client, "/a") == 3
@@ -0,0 +1,60 @@
+import pytest
+import requests
+
+from api_client import APIClient, parse_accept_encoding
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+
+def test_parse_accept_encoding_skips_identity_and_refused():
+    assert parse_accept_encoding("gzip, zstd;q=0, identity, br;q=0.5") == {"gzip", "br"}
+
+
+def test_failed_negotiation_sends_uncompressed_and_is_retried(monkeypatch):
+    client = APIClient("http://api.invalid", upload_compression="auto")
+    calls = []
+
+    def unreachable(path, **kwargs):
+        calls.append(path)
+        raise requests.ConnectionError("down")
+
+    monkeypatch.setattr(client, "get", unreachable)
+    assert client.request_encoding() is None
+    assert client._request_encodings is None
+
+    monkeypatch.setattr(client, "get", lambda path, **kwargs: FakeResponse(503))
+    assert client.request_encoding() is None
+    assert client._request_encodings is None
+
+    monkeypatch.setattr(client, "get", lambda path, **kwargs: FakeResponse(200, {"Accept-Encoding": "gzip"}))
+    assert client.request_encoding() == "gzip"
+    assert calls == ["/"]
+
+
+def test_forced_encoding_skips_negotiation(monkeypatch):
+    client = APIClient("http://api.invalid", upload_compression="gzip")
+    monkeypatch.setattr(client, "get", lambda path, **kwargs: 1 / 0)
+    assert client.request_encoding() == "gzip"
+
+
+@pytest.mark.parametrize("status, uploads", [(200, 0), (400, 1), (403, 1), (404, 1), (410, 1), (500, 0)])
+def test_rejected_upload_ids_upload_the_files_again(monkeypatch, status, uploads):
+    client = APIClient("http://api.invalid")
+    sent = []
+
+    def post_multipart(path, fields=None, files=None, **kwargs):
+        sent.append((fields, files))
+        return FakeResponse(status if files is None else 200)
+
+    monkeypatch.setattr(client, "post_multipart", post_multipart)
+    client.post_decks("/upload-and-process/", fields={"priority": "bulk"}, files={"pptx": "deck"}, upload_id="u1")
+    assert sent[0] == ({"priority": "bulk", "upload_id": "u1"}, None)
+    assert sent[1:] == [({"priority": "bulk"}, {"pptx": "deck"})] * uploads
@@ -0,0 +1,75 @@
+import json
+import multiprocessing
+import os
+import re
+
+from api_metrics import APIMetrics, endpoint_label
+
+
+def make_call(endpoint="/job-status/{id}", status=200, total=0.2):
+    call = {"time": 0, "method": "GET", "endpoint": endpoint, "session": None, "status": status, "error": None,
+            "new_connection": False, "bytes_up": 100, "bytes_down": 2000, "ttfb": 0.1, "total": total}
+    call.update(dns=0.0, connect=0.0, tls=0.0, send=0.0, wait=0.1, receive=0.1)
+    return call
+
+
+def count(text, endpoint="/job-status/{id}"):
+    match = re.search(rf'insightgen_api_request_duration_seconds_count{{method="GET",endpoint="{re.escape(endpoint)}",'
+                      rf'status="200"}} (\d+)', text)
+    return int(match.group(1)) if match else 0
+
+
+def worker(workers_dir, spool_dir, calls):
+    metrics = APIMetrics(spool_dir=spool_dir)
+    metrics.share_between_workers(workers_dir)
+    for _ in range(calls):
+        metrics.record(make_call())
+    metrics.write_snapshot()
+
+
+def run_worker(workers_dir, spool_dir, calls):
+    process = multiprocessing.get_context("fork").Process(target=worker, args=(workers_dir, spool_dir, calls))
+    process.start()
+    process.join()
+    return process.pid
+
+
+def test_endpoint_label_folds_ids():
+    assert endpoint_label("/job-status/3f2a9c1e-77aa?x=1") == "/job-status/{id}"
+    assert endpoint_label("/download/42") == "/download/{id}"
+
+
+def test_single_process_reports_its_own_calls(tmp_path):
+    metrics = APIMetrics(spool_dir=str(tmp_path))
+    metrics.record(make_call())
+    metrics.record(make_call(status=None, total=0.0) | {"error": "ConnectTimeout"})
+    text = metrics.prometheus_text()
+    assert count(text) == 1
+    assert 'insightgen_api_errors_total{endpoint="/job-status/{id}",error="ConnectTimeout"} 1' in text
+
+
+def test_any_worker_reports_the_totals_of_all_workers(tmp_path):
+    workers_dir, spool_dir = str(tmp_path / "workers"), str(tmp_path / "spool")
+    run_worker(workers_dir, spool_dir, 3)
+    run_worker(workers_dir, spool_dir, 4)
+
+    scraper = APIMetrics(spool_dir=spool_dir)
+    scraper.share_between_workers(workers_dir)
+    scraper.record(make_call())
+    assert count(scraper.prometheus_text()) == 8
+    assert count(scraper.prometheus_text()) == 8
+
+
+def test_calls_spooled_for_a_sibling_are_counted_once(tmp_path):
+    workers_dir, spool_dir = str(tmp_path / "workers"), str(tmp_path / "spool")
+    sibling = run_worker(workers_dir, spool_dir, 1)
+    # A background callback of the sibling finished after the sibling's last scrape
+    os.makedirs(os.path.join(spool_dir, str(sibling)))
+    with open(os.path.join(spool_dir, str(sibling), "call.json"), "w") as f:
+        json.dump(make_call(), f)
+
+    scraper = APIMetrics(spool_dir=spool_dir)
+    scraper.share_between_workers(workers_dir)
+    assert count(scraper.prometheus_text()) == 2
+    assert count(scraper.prometheus_text()) == 2
+    assert os.listdir(os.path.join(spool_dir, str(sibling))) == []
@@ -0,0 +1,119 @@
+import base64
+import json
+import time
+
+import pytest
+import requests
+
+from auth_cache import TokenVerifier, decode_jwt_claims
+from state_backend import MemoryBackend
+
+
+def jwt(**claims):
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=").decode()
+    return f"eyJhbGciOiJIUzI1NiJ9.{payload}.signature"
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class FakeClient:
+    """Answers /api/auth/verify and /api/auth/refresh with the given responses (or exceptions)"""
+
+    def __init__(self, verify=None, refresh=None):
+        self.verify = verify or FakeResponse(payload={"authenticated": True, "user": {"username": "eve"}})
+        self.refresh = refresh or FakeResponse(status_code=404)
+        self.calls = []
+
+    def _answer(self, path, response):
+        self.calls.append(path)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def get(self, path, token=None):
+        return self._answer(path, self.verify)
+
+    def post(self, path, token=None):
+        return self._answer(path, self.refresh)
+
+
+@pytest.fixture
+def verifier():
+    return TokenVerifier(verify_interval=60, refresh_margin=300, backend=MemoryBackend())
+
+
+def test_decode_jwt_claims():
+    assert decode_jwt_claims(jwt(exp=5, sub="eve")) == {"exp": 5, "sub": "eve"}
+    assert decode_jwt_claims("opaque-token") is None
+    assert decode_jwt_claims(None) is None
+
+
+def test_expired_tokens_are_rejected_without_a_request(verifier):
+    client = FakeClient()
+    assert verifier.verify(client, jwt(exp=time.time() - 1))["valid"] is False
+    assert client.calls == []
+
+
+def test_verifications_are_reused_within_the_interval(verifier):
+    client = FakeClient()
+    token = jwt(exp=time.time() + 3600)
+    assert verifier.verify(client, token) == {"valid": True, "user": {"username": "eve"}, "token": token}
+    assert verifier.verify(client, token)["valid"] is True
+    assert client.calls == ["/api/auth/verify"]
+
+    verifier.forget(token)
+    verifier.verify(client, token)
+    assert client.calls == ["/api/auth/verify"] * 2
+
+
+def test_a_verification_is_shared_through_the_backend(verifier):
+    token = jwt(exp=time.time() + 3600)
+    verifier.remember(token, {"username": "eve"})
+    other = TokenVerifier(backend=verifier.backend)
+    client = FakeClient()
+    assert other.verify(client, token)["user"] == {"username": "eve"}
+    assert client.calls == []
+
+
+def test_rejected_tokens_are_forgotten(verifier):
+    token = jwt(exp=time.time() + 3600)
+    verifier.remember(token, {"username": "eve"})
+    verifier.verify_interval = 0
+    client = FakeClient(verify=FakeResponse(status_code=401, payload={"detail": "revoked"}))
+    assert verifier.verify(client, token)["valid"] is False
+    with pytest.raises(requests.ConnectionError):
+        verifier.verify(FakeClient(verify=requests.ConnectionError("down")), token)
+
+
+def test_cached_verification_is_trusted_while_the_server_is_down(verifier):
+    token = jwt(exp=time.time() + 3600)
+    verifier.remember(token, {"username": "eve"})
+    verifier.verify_interval = 0
+    result = verifier.verify(FakeClient(verify=requests.ConnectionError("down")), token)
+    assert result == {"valid": True, "user": {"username": "eve"}, "token": token}
+
+
+def test_tokens_near_expiry_are_refreshed(verifier):
+    old, new = jwt(exp=time.time() + 60, n=1), jwt(exp=time.time() + 3600, n=2)
+    client = FakeClient(refresh=FakeResponse(payload={"access_token": new, "user": {"username": "eve"}}))
+    assert verifier.verify(client, old) == {"valid": True, "user": {"username": "eve"}, "token": new}
+    assert client.calls == ["/api/auth/refresh"]
+    # The new token is already verified; the old one is not trusted from cache any more
+    assert verifier.verify(client, new)["token"] == new
+    assert client.calls == ["/api/auth/refresh"]
+
+
+def test_an_api_without_refresh_is_not_asked_again(verifier):
+    client = FakeClient()
+    token = jwt(exp=time.time() + 60)
+    assert verifier.verify(client, token) == {"valid": True, "user": {"username": "eve"}, "token": token}
+    verifier.forget(token)
+    verifier.verify(client, token)
+    assert client.calls.count("/api/auth/refresh") == 1
@@ -0,0 +1,114 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+import batch
+from batch import BatchError, add_input, collect_pairs, extract_zip, pair_decks, read_manifest
+
+
+def make_zip(members, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def write(path, data=b"x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data if isinstance(data, bytes) else data.encode())
+    return str(path)
+
+
+def test_pair_decks_by_stem_within_each_folder():
+    pairs, unmatched = pair_decks(["a/Q1.pptx", "a/q1.PDF", "b/Q1.pdf", "a/Q2.pptx", "a/notes.txt"])
+    assert pairs == [{"name": "Q1", "pptx": "a/Q1.pptx", "pdf": "a/q1.PDF"}]
+    assert sorted(unmatched) == ["a/Q2.pptx", "b/Q1.pdf"]
+
+
+def test_pair_decks_leaves_ambiguous_stems_unmatched():
+    pairs, unmatched = pair_decks(["Q1.pptx", "q1.pptx", "Q1.pdf"])
+    assert pairs == []
+    assert sorted(unmatched) == ["Q1.pdf", "Q1.pptx", "q1.pptx"]
+
+
+def test_manifest_pairs_with_names_and_prompts(tmp_path):
+    write(tmp_path / "decks" / "one.pptx")
+    write(tmp_path / "decks" / "one_export.pdf")
+    manifest = write(tmp_path / "manifest.csv",
+                     "﻿PPTX, pdf ,name,user_prompt\n"
+                     "decks/one.pptx,decks/one_export.pdf,,Market: VN\n"
+                     ",,,\n")
+    assert read_manifest(manifest) == [{"pptx": str(tmp_path / "decks" / "one.pptx"),
+                                        "pdf": str(tmp_path / "decks" / "one_export.pdf"),
+                                        "name": "one", "user_prompt": "Market: VN"}]
+
+
+@pytest.mark.parametrize("content", ["name,file\nx,y\n", "pptx,pdf\nmissing.pptx,missing.pdf\n",
+                                     "pptx,pdf\n../outside.pptx,../outside.pdf\n"])
+def test_bad_manifests_are_refused(tmp_path, content):
+    write(tmp_path / "outside.pptx")
+    write(tmp_path / "outside.pdf")
+    manifest = write(tmp_path / "batch" / "manifest.csv", content)
+    with pytest.raises(BatchError):
+        read_manifest(manifest)
+
+
+def test_collect_pairs_prefers_the_manifest(tmp_path):
+    write(tmp_path / "a.pptx")
+    write(tmp_path / "a.pdf")
+    write(tmp_path / "b.pptx")
+    write(tmp_path / "b_export.pdf")
+    write(tmp_path / "manifest.csv", "pptx,pdf\nb.pptx,b_export.pdf\n")
+    pairs, unmatched = collect_pairs(str(tmp_path))
+    assert [pair["name"] for pair in pairs] == ["b"]
+    assert sorted(os.path.basename(path) for path in unmatched) == ["a.pdf", "a.pptx"]
+
+
+def test_collect_pairs_without_pairs_is_an_error(tmp_path):
+    write(tmp_path / "a.pptx")
+    with pytest.raises(BatchError):
+        collect_pairs(str(tmp_path))
+
+
+def test_extract_zip_keeps_decks_and_manifest_only(tmp_path):
+    archive = make_zip({"q/a.pptx": b"p", "q/a.pdf": b"d", "manifest.csv": "pptx,pdf\n", "readme.txt": b"t",
+                        "__MACOSX/q/._a.pptx": b"m", "q/.hidden.pdf": b"h"})
+    add_input(str(tmp_path), "decks.zip", archive)
+    found = sorted(os.path.relpath(os.path.join(d, f), tmp_path) for d, _, fs in os.walk(tmp_path) for f in fs)
+    assert found == ["manifest.csv", os.path.join("q", "a.pdf"), os.path.join("q", "a.pptx")]
+
+
+def test_extract_zip_refuses_paths_outside_dest(tmp_path):
+    with pytest.raises(BatchError):
+        extract_zip(make_zip({"/tmp/evil.pptx": b"x"}), str(tmp_path / "dest"))
+
+
+def test_extract_zip_refuses_too_many_members(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "BATCH_ZIP_MAX_MEMBERS", 3)
+    with pytest.raises(BatchError, match="Too many files"):
+        extract_zip(make_zip({f"{i}.pdf": b"x" for i in range(4)}), str(tmp_path))
+    assert not os.listdir(tmp_path)
+
+
+def test_extract_zip_refuses_too_much_uncompressed_data(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "BATCH_ZIP_MAX_BYTES", 1000)
+    with pytest.raises(BatchError, match="too large"):
+        extract_zip(make_zip({"a.pdf": b"x" * 600, "a.pptx": b"x" * 600}, zipfile.ZIP_STORED), str(tmp_path))
+    assert not os.listdir(tmp_path)
+
+
+def test_extract_zip_refuses_a_compression_bomb(tmp_path):
+    with pytest.raises(BatchError, match="compression ratio"):
+        extract_zip(make_zip({"bomb.pdf": b"\0" * (8 * 1024 * 1024)}), str(tmp_path))
+    assert not os.listdir(tmp_path)
+
+
+def test_extract_zip_accepts_ordinary_decks(tmp_path):
+    data = os.urandom(2 * 1024 * 1024)
+    extract_zip(make_zip({"a.pdf": data}), str(tmp_path))
+    assert (tmp_path / "a.pdf").read_bytes() == data
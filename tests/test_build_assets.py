@@ -0,0 +1,85 @@
+import gzip
+import json
+import os
+
+import pytest
+
+pytest.importorskip("dash_bootstrap_components")
+import build_assets  # noqa: E402
+from build_assets import AssetBuild, fingerprint, load_manifest, minify_css  # noqa: E402
+
+
+@pytest.fixture
+def assets(tmp_path, monkeypatch):
+    root = tmp_path / "assets"
+    (root / "fonts").mkdir(parents=True)
+    (root / "fonts" / "icons.woff2").write_bytes(b"wOF2 font")
+    (root / "logo.svg").write_text("<svg>" + " " * 200 + "</svg>")
+    (root / "b.css").write_text('@charset "UTF-8";\n.logo { background: url("logo.svg") }\n')
+    (root / "a.css").write_text("/* layout */\n.icon {\n  src: url(fonts/icons.woff2?#iefix);\n}\n" * 20)
+    monkeypatch.setattr(build_assets, "ASSETS_DIR", str(root))
+    return root
+
+
+@pytest.mark.parametrize("css, minified", [
+    ("a  >  b , c { color: red ; }", "a>b,c{color:red}"),
+    ("/* note */ a:hover { x: 1 }", "a:hover{x:1}"),
+    ("/*! licence */\na { b: c }", "/*! licence */ a{b:c}"),
+    ("a :hover { x: 1 }", "a :hover{x:1}"),
+    ("@media screen and (max-width: 10px) { a { b: c } }", "@media screen and (max-width:10px){a{b:c}}"),
+    ('a::after { content: "  /* kept */  " }', 'a::after{content:"  /* kept */  "}'),
+    ("a { margin: 0 auto }", "a{margin:0 auto}"),
+])
+def test_minify_css(css, minified):
+    assert minify_css(css) == minified
+
+
+def test_fingerprint_changes_with_the_content():
+    assert fingerprint("app.css", b"a") == fingerprint("app.css", b"a")
+    assert fingerprint("app.css", b"a") != fingerprint("app.css", b"b")
+    assert fingerprint("app.css", b"a").startswith("app.") and fingerprint("app.css", b"a").endswith(".css")
+
+
+def test_build(assets, tmp_path):
+    dist = tmp_path / "dist"
+    build = AssetBuild(str(dist))
+    manifest = build.build(["a.css", "b.css"], ["logo.svg"], vendored=False)
+    assert manifest == load_manifest(str(dist / "manifest.json"))
+    assert manifest["vendored"] is False
+    bundle = manifest["assets"]["app.css"]
+    logo = manifest["assets"]["logo.svg"]
+    assert bundle.startswith("dist/app.") and logo.startswith("dist/logo.")
+
+    css = (dist / os.path.basename(bundle)).read_text()
+    font = fingerprint("icons.woff2", b"wOF2 font")
+    assert f'url("{font}?#iefix")' in css
+    assert f'url("{os.path.basename(logo)}")' in css
+    assert "@charset" not in css and "layout" not in css
+    assert (dist / font).read_bytes() == b"wOF2 font"
+
+    # Text files get compressed variants, already compressed fonts do not
+    assert gzip.decompress((dist / (os.path.basename(bundle) + ".gz")).read_bytes()).decode() == css
+    assert not (dist / (font + ".gz")).exists()
+    # Referenced twice (from the stylesheet and as an image), written once
+    assert [name for name, size in build.written].count(os.path.basename(logo)) == 1
+
+
+def test_rebuild_replaces_the_dist_directory(assets, tmp_path):
+    dist = tmp_path / "dist"
+    first = AssetBuild(str(dist)).build(["b.css"], [], vendored=False)
+    (assets / "b.css").write_text(".x { color: blue }")
+    second = AssetBuild(str(dist)).build(["b.css"], [], vendored=True)
+    assert first["assets"]["app.css"] != second["assets"]["app.css"]
+    # Too small to gain anything from compression
+    assert sorted(os.listdir(dist)) == sorted(["manifest.json", os.path.basename(second["assets"]["app.css"])])
+    assert load_manifest(str(dist / "manifest.json"))["vendored"] is True
+
+
+def test_missing_manifest(tmp_path):
+    assert load_manifest(str(tmp_path / "manifest.json")) == {}
+    (tmp_path / "manifest.json").write_text("{")
+    assert load_manifest(str(tmp_path / "manifest.json")) == {}
+
+
+def test_local_assets(assets):
+    assert build_assets.local_assets() == (["a.css", "b.css"], ["logo.svg"])
@@ -0,0 +1,95 @@
+import os
+import re
+
+import pytest
+
+pytest.importorskip("dash")
+import dash_app  # noqa: E402
+from job_registry import JobRegistry  # noqa: E402
+
+OWNER = "0123456789abcdef0123456789abcdef"
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = JobRegistry(str(tmp_path / "jobs.sqlite"))
+    monkeypatch.setattr(dash_app, "job_registry", registry)
+    return registry
+
+
+@pytest.fixture
+def completed_job(registry, monkeypatch):
+    registry.register(OWNER, "job-1", pptx_name="q1.pptx")
+    monkeypatch.setattr(dash_app, "watch_job", lambda client, job_id: None)
+    monkeypatch.setattr(dash_app, "latest_status", lambda job_id: {"status": "completed", "output_filename": "q1_out.pptx"})
+    with open(os.path.join(dash_app.download_cache.root, "job-1.pptx"), "wb") as f:
+        f.write(b"pptx")
+    return "job-1"
+
+
+def results_of(job_id, client_id):
+    outputs = dash_app.update_job_status(1, job_id, False, None, None, client_id)
+    assert outputs[0] is True
+    return repr(outputs[2])
+
+
+def test_only_the_submitting_browser_gets_a_download_link(completed_job):
+    link = re.search(r"href='(/download/[^']+)'", results_of(completed_job, OWNER)).group(1)
+    assert "/download/" not in results_of(completed_job, "f" * 32)
+    assert "/download/" not in results_of(completed_job, None)
+
+    with dash_app.server.test_client() as browser:
+        response = browser.get(link)
+        assert (response.status_code, response.data) == (200, b"pptx")
+        assert "q1_out.pptx" in response.headers["Content-Disposition"]
+        response.close()
+
+
+@pytest.mark.parametrize("query", ["", "?filename=x.pptx", "?expires=9999999999&signature=00"])
+def test_unsigned_downloads_are_refused(completed_job, query):
+    with dash_app.server.test_client() as browser:
+        assert browser.get(f"/download/{completed_job}{query}").status_code == 403
+
+
+def test_logs_do_not_show_browser_or_batch_ids(registry):
+    for owner, job_id in ((OWNER, "job-1"), ("batch:0123456789ab", "job-2"), ("alice", "job-3")):
+        registry.register(owner, job_id)
+    rows, _, _ = dash_app.update_logs_table(0, 10, None, None, None, None, None)
+    owners = [row["owner"] for row in rows]
+    assert owners[0] == "alice"
+    assert re.fullmatch(r"Batch [0-9a-f]{8}", owners[1]) and re.fullmatch(r"Browser [0-9a-f]{8}", owners[2])
+    assert not any(OWNER in str(row) or "0123456789ab" in str(row) for row in rows)
+    # Searching for part of an id finds nothing; the full id still finds its jobs
+    assert dash_app.update_logs_table(0, 10, OWNER[:8], None, None, None, None)[2] == "0 jobs"
+    assert dash_app.update_logs_table(0, 10, OWNER, None, None, None, None)[2] == "1 jobs"
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    calls = []
+    monkeypatch.setattr(dash_app, "collect_pairs", lambda input_dir: ([("a.pptx", "a.pdf")], []))
+    monkeypatch.setattr(dash_app, "start_batch",
+                        lambda client, batch_id, pairs, fields, max_concurrency: calls.append(max_concurrency))
+    handle = dash_app.upload_store.put_base64("cHB0eA==")
+    return calls, [{"handle": handle, "filename": "a.pptx"}]
+
+
+@pytest.mark.parametrize("concurrency, expected", [(None, dash_app.BATCH_MAX_CONCURRENCY), ("", dash_app.BATCH_MAX_CONCURRENCY), (3, 3)])
+def test_batch_concurrency_defaults_when_cleared(submitted, concurrency, expected):
+    calls, stored_files = submitted
+    outputs = dash_app.submit_batch(1, stored_files, "gen", "", 8, concurrency, dash_app.BULK_PRIORITY)
+    assert "Submitted 1 deck pairs" in repr(outputs[1])
+    assert calls == [expected]
+
+
+def test_batch_submission_errors_are_reported(submitted, monkeypatch):
+    _, stored_files = submitted
+    assert "whole number" in repr(dash_app.submit_batch(1, stored_files, "gen", "", 8, "many", dash_app.BULK_PRIORITY)[1])
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(dash_app, "start_batch", fail)
+    outputs = dash_app.submit_batch(1, stored_files, "gen", "", 8, 2, dash_app.BULK_PRIORITY)
+    assert outputs[0] is dash_app.dash.no_update
+    assert "Error: disk full" in repr(outputs[1])
@@ -0,0 +1,41 @@
+import threading
+
+import download_cache
+from download_cache import _read_or_create_key, download_signature_valid, sign_download
+
+
+def test_signed_links_are_only_valid_for_their_job():
+    link = sign_download("job-1")
+    assert download_signature_valid("job-1", link["expires"], link["signature"])
+    assert not download_signature_valid("job-2", link["expires"], link["signature"])
+    assert not download_signature_valid("job-1", str(int(link["expires"]) + 1), link["signature"])
+    assert not download_signature_valid("job-1", link["expires"], link["signature"][:-1] + "0")
+    assert not download_signature_valid("job-1", None, None)
+    assert not download_signature_valid("job-1", "soon", link["signature"])
+
+
+def test_signed_links_expire():
+    link = sign_download("job-1", ttl=-1)
+    assert not download_signature_valid("job-1", link["expires"], link["signature"])
+
+
+def test_every_process_on_the_host_uses_the_same_key(tmp_path):
+    path = str(tmp_path / "keys" / "download_link.key")
+    keys = []
+    threads = [threading.Thread(target=lambda: keys.append(_read_or_create_key(path))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(keys)) == 1 and len(keys[0]) == 32
+    assert [p.name for p in (tmp_path / "keys").iterdir()] == ["download_link.key"]
+
+
+def test_configured_secret_is_used(monkeypatch):
+    link = sign_download("job-1")
+    monkeypatch.setattr(download_cache, "DOWNLOAD_LINK_SECRET", "shared by every instance")
+    monkeypatch.setattr(download_cache, "_link_key", None)
+    assert not download_signature_valid("job-1", link["expires"], link["signature"])
+    other = sign_download("job-1")
+    monkeypatch.setattr(download_cache, "_link_key", None)
+    assert download_signature_valid("job-1", other["expires"], other["signature"])
@@ -0,0 +1,97 @@
+import json
+import os
+
+import pytest
+
+import insightgen_cli
+import mock_api
+
+
+@pytest.fixture
+def mock():
+    server, base_url = mock_api.start_in_thread(job_duration=0.2, download_size=1024)
+    yield server, base_url
+    server.shutdown()
+
+
+@pytest.fixture
+def decks(tmp_path):
+    root = tmp_path / "decks"
+    root.mkdir()
+    for name in ("north", "south"):
+        (root / f"{name}.pptx").write_bytes(b"pptx " + name.encode())
+        (root / f"{name}.pdf").write_bytes(b"pdf " + name.encode())
+    return str(root)
+
+
+def run(base_url, out_dir, *args):
+    return insightgen_cli.main(["--api-url", base_url, "--token", mock_api.make_token("demo"),
+                                "run", "-o", out_dir, "-j", "2", *args])
+
+
+def uploads(server):
+    return server.state.request_counts.get("POST /upload-and-process/", 0)
+
+
+def read_state(out_dir):
+    with open(os.path.join(out_dir, insightgen_cli.STATE_FILENAME)) as f:
+        return json.load(f)
+
+
+def write_state(out_dir, state):
+    with open(os.path.join(out_dir, insightgen_cli.STATE_FILENAME), "w") as f:
+        json.dump(state, f)
+
+
+def test_run_writes_outputs_state_and_metrics(mock, decks, tmp_path):
+    server, base_url = mock
+    out_dir = str(tmp_path / "out")
+    assert run(base_url, out_dir, decks, "--prompt", "Market: Vietnam") == 0
+
+    jobs = read_state(out_dir)["jobs"]
+    assert sorted(entry["status"] for entry in jobs.values()) == ["completed", "completed"]
+    assert all(os.path.exists(entry["output"]) for entry in jobs.values())
+    with open(os.path.join(out_dir, insightgen_cli.METRICS_FILENAME)) as f:
+        assert sorted(json.loads(line)["name"] for line in f) == ["north", "south"]
+    assert [job["fields"]["user_prompt"] for job in server.state.jobs.values()] == ["Market: Vietnam"] * 2
+    assert uploads(server) == 2
+
+
+def test_rerun_skips_finished_decks_and_reattaches_running_jobs(mock, decks, tmp_path):
+    server, base_url = mock
+    out_dir = str(tmp_path / "out")
+    run(base_url, out_dir, decks, "--prompt", "Market: Vietnam")
+    assert run(base_url, out_dir) == 0
+    assert uploads(server) == 2
+
+    # As if the run had been interrupted: one job still running on the API, one never submitted
+    state = read_state(out_dir)
+    north, south = sorted(state["jobs"].values(), key=lambda entry: entry["name"])
+    north.update(status="processing", output=None)
+    south.update(status="uploading", job_id=None, output=None)
+    write_state(out_dir, state)
+
+    assert run(base_url, out_dir) == 0
+    assert uploads(server) == 3
+    jobs = {entry["name"]: entry for entry in read_state(out_dir)["jobs"].values()}
+    assert jobs["north"]["job_id"] == north["job_id"]
+    assert (jobs["north"]["status"], jobs["south"]["status"]) == ("completed", "completed")
+    # The resumed upload used the prompt stored by the first run
+    assert server.state.jobs[jobs["south"]["job_id"]]["fields"]["user_prompt"] == "Market: Vietnam"
+
+
+def test_jobs_the_api_has_forgotten_are_submitted_again(mock, decks, tmp_path):
+    server, base_url = mock
+    out_dir = str(tmp_path / "out")
+    run(base_url, out_dir, decks)
+    state = read_state(out_dir)
+    for entry in state["jobs"].values():
+        entry.update(status="processing", job_id="0" * 32)
+    write_state(out_dir, state)
+
+    assert run(base_url, out_dir) == 0
+    assert uploads(server) == 4
+
+
+def test_nothing_to_run(tmp_path, mock):
+    assert run(mock[1], str(tmp_path / "empty")) == 2
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import api_client  # noqa: E402
+import mock_api  # noqa: E402
+from state_backend import SessionStore, get_state_backend  # noqa: E402
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "insightgen_ui.py")
+# The development API URL of insightgen_ui.py
+UI_API_URL = "http://localhost:8080"
+
+
+@pytest.fixture(scope="module")
+def monkeypatch_module():
+    with pytest.MonkeyPatch.context() as patch:
+        yield patch
+
+
+@pytest.fixture(scope="module")
+def mock(monkeypatch_module):
+    server, base_url = mock_api.start_in_thread()
+    server.state.users["eve"] = {"password": "Eve12345", "full_name": "Eve", "username": "eve"}
+    monkeypatch_module.delenv("DEPLOYMENT_ENV", raising=False)
+    monkeypatch_module.setitem(api_client._clients, UI_API_URL, api_client.APIClient(base_url))
+    yield server
+    server.shutdown()
+
+
+def open_app(sid=None):
+    app = AppTest.from_file(SCRIPT, default_timeout=60)
+    if sid:
+        app.query_params["sid"] = sid
+    return app.run()
+
+
+def log_in(app, username, password):
+    app.text_input[0].input(username)
+    app.text_input[1].input(password)
+    next(button for button in app.button if button.label == "Login").click().run()
+    assert app.session_state["is_authenticated"]
+    return app
+
+
+def test_login_is_not_restored_from_the_url(mock):
+    app = log_in(open_app(), "demo", "Demo1234")
+    app.session_state["current_prompt"] = "demo's prompt"
+    app.run()
+    sid = app.session_state["session_id"]
+
+    saved = SessionStore(get_state_backend()).load(sid)
+    assert saved["owner"] == "demo"
+    assert not {"auth_token", "auth_cookie", "is_authenticated", "user"} & set(saved["state"])
+
+    reopened = open_app(sid)
+    assert not reopened.session_state["is_authenticated"]
+    assert reopened.session_state["current_prompt"] != "demo's prompt"
+
+
+def test_work_is_handed_back_to_its_owner_only(mock):
+    app = log_in(open_app(), "demo", "Demo1234")
+    app.session_state["current_prompt"] = "demo's prompt"
+    app.run()
+
+    stranger = log_in(open_app(app.session_state["session_id"]), "eve", "Eve12345")
+    assert stranger.session_state["current_prompt"] != "demo's prompt"
+
+    app = log_in(open_app(), "demo", "Demo1234")
+    app.session_state["current_prompt"] = "demo's prompt"
+    app.run()
+    sid = app.session_state["session_id"]
+    owner = log_in(open_app(sid), "demo", "Demo1234")
+    assert owner.session_state["current_prompt"] == "demo's prompt"
+    # Logging in moved the session: the old link leads nowhere
+    assert owner.session_state["session_id"] != sid
+    assert SessionStore(get_state_backend()).load(sid) is None
+
+
+def test_job_trackers_see_the_current_token(mock):
+    app = log_in(open_app(), "demo", "Demo1234")
+    holder = app.session_state["auth_token_holder"]
+    assert holder["token"] == app.session_state["auth_token"]
+
+    next(button for button in app.button if button.label == "Logout").click().run()
+    assert app.session_state["auth_token_holder"] is holder
+    assert holder["token"] is None
+
+
+def test_submit_without_the_uploaded_files_asks_for_them(mock):
+    app = log_in(open_app(), "demo", "Demo1234")
+    app.session_state["inspection_done"] = True
+    app.session_state["inspection_results"] = {"is_valid": True, "warnings": [], "slide_stats": {}}
+    app.session_state["selected_generator_id"] = "bgs_default"
+    app.run()
+
+    # Inspection results are only usable with their files, so they are never saved
+    saved = SessionStore(get_state_backend()).load(app.session_state["session_id"])
+    assert not {"inspection_done", "inspection_results", "file_hashes"} & set(saved["state"])
+
+    [*_, submit] = [button for button in app.button if button.label == "Submit"]
+    submit.click().run()
+    assert not app.exception
+    assert any("upload the PowerPoint and PDF files again" in warning.value for warning in app.warning)
+    assert app.session_state["job_id"] is None
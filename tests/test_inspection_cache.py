@@ -0,0 +1,68 @@
+import io
+
+import pytest
+
+import inspection_cache
+from inspection_cache import InspectionCache, file_sha256, inspection_key
+from state_backend import MemoryBackend
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return InspectionCache(str(tmp_path / "inspections.sqlite"), max_entries=2, ttl_seconds=60)
+
+
+def test_file_sha256_leaves_the_file_rewound():
+    f = io.BytesIO(b"x" * 10)
+    f.read(3)
+    assert file_sha256(f, chunk_size=4) == file_sha256(io.BytesIO(b"x" * 10))
+    assert f.tell() == 0
+
+
+def test_round_trip(cache):
+    key = inspection_key("a" * 64, "b" * 64)
+    assert cache.get(key) is None
+    cache.put(key, {"is_valid": True, "content_slides": 3})
+    assert cache.get(key) == {"is_valid": True, "content_slides": 3}
+
+
+def test_upload_ids_are_not_cached(tmp_path):
+    shared = MemoryBackend()
+    cache = InspectionCache(str(tmp_path / "a.sqlite"), shared=shared)
+    result = {"is_valid": True, "upload_id": "u1"}
+    cache.put("k", result)
+    assert result["upload_id"] == "u1"
+    assert cache.get("k") == {"is_valid": True}
+    assert shared.get_json("inspection:k") == {"is_valid": True}
+
+    # Entries stored before upload ids were stripped are not handed out either
+    shared.set_json("inspection:old", {"is_valid": True, "upload_id": "u0"})
+    assert InspectionCache(str(tmp_path / "b.sqlite"), shared=shared).get("old") == {"is_valid": True}
+
+
+def test_entries_expire(cache, monkeypatch):
+    cache.put("k", {"is_valid": True})
+    now = inspection_cache.time.time()
+    monkeypatch.setattr(inspection_cache.time, "time", lambda: now + 61)
+    assert cache.get("k") is None
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(inspection_cache.time, "time", lambda: next(clock))
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    cache.get("a")
+    cache.put("c", {"n": 3})
+    assert [cache.get(key) for key in ("a", "b", "c")] == [{"n": 1}, None, {"n": 3}]
+
+
+def test_results_are_shared_between_instances(tmp_path):
+    shared = MemoryBackend()
+    first = InspectionCache(str(tmp_path / "a.sqlite"), shared=shared)
+    second = InspectionCache(str(tmp_path / "b.sqlite"), shared=shared)
+    first.put("k", {"is_valid": True})
+    assert second.get("k") == {"is_valid": True}
+    # Copied locally on first use
+    shared.delete("inspection:k")
+    assert second.get("k") == {"is_valid": True}
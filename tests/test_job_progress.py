@@ -0,0 +1,123 @@
+import json
+
+import pytest
+import requests
+
+import job_progress
+from job_progress import iter_sse_events, subscribe_job_status
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, content_type="application/json", payload=None, lines=()):
+        self.status_code = status_code
+        self.headers = {"Content-Type": content_type}
+        self.payload = payload
+        self.lines = lines
+
+    def json(self):
+        return self.payload
+
+    def iter_lines(self, chunk_size=None):
+        return iter(self.lines)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeClient:
+    """Answers the SSE route with `events` (a response or an exception) and polls with a finished job"""
+
+    base_url = "http://api.test"
+    timeout = (1, 1)
+
+    def __init__(self, events):
+        self.events = events
+        self.paths = []
+
+    def get(self, path, **kwargs):
+        self.paths.append(path)
+        if path.startswith("/job-events/"):
+            if isinstance(self.events, Exception):
+                raise self.events
+            return self.events
+        return FakeResponse(payload={"status": "completed"})
+
+
+class InstantScheduler:
+    def observe(self, job_status):
+        pass
+
+    def next_interval(self):
+        return 0
+
+
+@pytest.fixture(autouse=True)
+def sse_only(monkeypatch):
+    monkeypatch.setattr(job_progress, "JOB_PUSH_TRANSPORT", "sse")
+    monkeypatch.setattr(job_progress, "_push_refused_until", {})
+
+
+def follow(client):
+    return list(subscribe_job_status(client, "job-1", scheduler=InstantScheduler()))
+
+
+def sse_routes(client):
+    return [path for path in client.paths if path.startswith("/job-events/")]
+
+
+def test_iter_sse_events_dispatches_on_blank_lines():
+    lines = [b": keep-alive", b"event: status", b'data: {"a":', b"data: 1}", b"", b"data: x", b""]
+    assert list(iter_sse_events(lines)) == [("status", '{"a":\n1}'), ("message", "x")]
+
+
+def test_stream_is_followed_to_the_end():
+    stream = FakeResponse(content_type="text/event-stream", lines=[
+        b"data: " + json.dumps({"status": "processing"}).encode(), b"",
+        b"data: " + json.dumps({"status": "completed"}).encode(), b""])
+    client = FakeClient(stream)
+    assert [s["status"] for s in follow(client)] == ["processing", "completed"]
+    assert not any(path.startswith("/job-status/") for path in client.paths)
+
+
+@pytest.mark.parametrize("failure", [requests.ConnectionError("reset"), FakeResponse(status_code=503),
+                                     FakeResponse(status_code=403)])
+def test_transient_failure_falls_back_for_this_job_only(failure):
+    client = FakeClient(failure)
+    assert follow(client) == [{"status": "completed"}]
+    follow(client)
+    assert len(sse_routes(client)) == 2
+
+
+@pytest.mark.parametrize("refusal", [FakeResponse(status_code=404), FakeResponse(status_code=501),
+                                     FakeResponse(status_code=200, content_type="text/html")])
+def test_refused_route_is_skipped_until_the_retry_time(refusal, monkeypatch):
+    client = FakeClient(refusal)
+    assert follow(client) == [{"status": "completed"}]
+    follow(client)
+    assert len(sse_routes(client)) == 1
+
+    monkeypatch.setattr(job_progress, "_push_refused_until", {(client.base_url, "sse"): 0})
+    follow(client)
+    assert len(sse_routes(client)) == 2
+
+
+def test_token_provider_is_asked_on_every_request(monkeypatch):
+    monkeypatch.setattr(job_progress, "JOB_PUSH_TRANSPORT", "poll")
+    tokens = iter(["first", "refreshed", "refreshed"])
+    sent = []
+
+    class PollingClient(FakeClient):
+        def get(self, path, token=None, **kwargs):
+            sent.append(token)
+            return FakeResponse(payload={"status": "completed" if len(sent) == 3 else "processing"})
+
+    statuses = list(subscribe_job_status(PollingClient(None), "job-1", token=lambda: next(tokens),
+                                         scheduler=InstantScheduler()))
+    assert [s["status"] for s in statuses] == ["processing", "processing", "completed"]
+    assert sent == ["first", "refreshed", "refreshed"]
@@ -0,0 +1,145 @@
+import sqlite3
+
+import pytest
+import requests
+
+import job_registry
+from job_registry import JobRegistry, resumable_job
+from state_backend import MemoryBackend
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeClient:
+    """Answers /job-status/ with the status code listed for the job, or raises for 'unreachable'"""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+
+    def get(self, path, token=None):
+        status = self.statuses[path.rsplit("/", 1)[1]]
+        if status == "unreachable":
+            raise requests.ConnectionError("down")
+        return FakeResponse(status)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return JobRegistry(str(tmp_path / "jobs.sqlite"))
+
+
+def test_update_keeps_fields_that_are_not_given(registry):
+    registry.register("alice", "job-1", pptx_name="q1.pptx", generator_id="bgs", content_slides=12)
+    registry.update("job-1", "processing", message="Generating headlines")
+    registry.update("job-1", "completed", output_filename="q1_out.pptx",
+                    metrics={"total_time_seconds": 42.5, "total_slides": 14})
+    registry.update("job-1", "completed")
+    job = registry.get("job-1")
+    assert (job["owner"], job["pptx_name"], job["content_slides"]) == ("alice", "q1.pptx", 12)
+    assert (job["status"], job["message"], job["output_filename"]) == ("completed", "Generating headlines",
+                                                                      "q1_out.pptx")
+    assert job["metrics"] == {"total_time_seconds": 42.5, "total_slides": 14}
+    assert (job["total_time_seconds"], job["total_slides"]) == (42.5, 14)
+    assert job["finished_at"] is not None
+    assert registry.get("unknown") is None
+
+
+def test_unfinished_jobs_of_the_owner_newest_first(registry, monkeypatch):
+    clock = iter(range(1000, 2000, 10))
+    monkeypatch.setattr(job_registry.time, "time", lambda: next(clock))
+    for owner, job_id in (("alice", "old"), ("alice", "done"), ("bob", "bobs"), ("alice", "new")):
+        registry.register(owner, job_id)
+    registry.update("done", "completed")
+    assert [job["job_id"] for job in registry.unfinished("alice", now=1100)] == ["new", "old"]
+    # Older than the reattach window
+    assert registry.unfinished("alice", now=1000 + job_registry.JOB_REATTACH_WINDOW_SECONDS + 15) == \
+        [registry.get("new")]
+
+
+def test_resumable_job_skips_jobs_the_api_forgot(registry, monkeypatch):
+    clock = iter(range(1000, 2000, 10))
+    monkeypatch.setattr(job_registry.time, "time", lambda: next(clock))
+    registry.register("alice", "older")
+    registry.register("alice", "forgotten")
+
+    job = resumable_job(FakeClient({"forgotten": 404, "older": 200}), "alice", registry=registry)
+    assert job["job_id"] == "older"
+    assert registry.get("forgotten")["status"] == "failed"
+    assert resumable_job(FakeClient({"older": "unreachable"}), "alice", registry=registry)["job_id"] == "older"
+    assert resumable_job(FakeClient({"older": 404}), "alice", registry=registry) is None
+
+
+def test_jobs_are_found_through_the_shared_backend(tmp_path):
+    shared = MemoryBackend()
+    first = JobRegistry(str(tmp_path / "a.sqlite"), shared=shared)
+    second = JobRegistry(str(tmp_path / "b.sqlite"), shared=shared)
+    first.register("alice", "job-1", pptx_name="q1.pptx")
+    first.update("job-1", "processing", message="Analyzing")
+
+    assert second.get("job-1")["message"] == "Analyzing"
+    assert [job["job_id"] for job in second.unfinished("alice")] == ["job-1"]
+    first.update("job-1", "completed", metrics={"total_time_seconds": 3.0})
+    assert second.unfinished("alice") == []
+    assert second.get("job-1")["total_time_seconds"] == 3.0
+
+
+def test_percentile_interpolates():
+    assert job_registry.percentile([], 0.5) is None
+    assert job_registry.percentile([10], 0.99) == 10
+    assert job_registry.percentile([1, 2, 3, 4], 0.5) == 2.5
+    assert job_registry.percentile([0, 10], 0.9) == pytest.approx(9)
+
+
+def test_search_filters_and_pages(registry, monkeypatch):
+    clock = iter(range(1000, 3000, 10))
+    monkeypatch.setattr(job_registry.time, "time", lambda: next(clock))
+    for n in range(25):
+        registry.register("alice" if n % 2 else "bob", f"job-{n:02d}", pptx_name=f"deck{n}.pptx",
+                          generator_id="bgs" if n < 20 else "other")
+    registry.update("job-03", "failed")
+
+    jobs, total = registry.search(limit=10)
+    assert total == 25
+    assert [job["job_id"] for job in jobs][:2] == ["job-24", "job-23"]
+    jobs, total = registry.search(offset=20, limit=10)
+    assert len(jobs) == 5 and jobs[-1]["job_id"] == "job-00"
+
+    assert registry.search(status="failed")[1] == 1
+    assert registry.search(generator_id="other")[1] == 5
+    assert [job["job_id"] for job in registry.search(text="deck1")[0]] == [f"job-{n}" for n in range(19, 9, -1)] \
+        + ["job-01"]
+    assert registry.search(text="alice")[1] == 12
+    created = registry.get("job-10")["created_at"]
+    assert registry.search(since=created, until=created + 1)[0] == [registry.get("job-10")]
+    assert registry.generator_ids() == ["bgs", "other"]
+
+
+def test_latency_by_day_over_completed_jobs(registry):
+    for n, seconds in enumerate([10, 20, 30, 40]):
+        registry.register("alice", f"job-{n}", generator_id="bgs")
+        registry.update(f"job-{n}", "completed", metrics={"total_time_seconds": seconds})
+    registry.register("alice", "failed-job")
+    registry.update("failed-job", "failed", metrics={"total_time_seconds": 1000})
+
+    (day,) = registry.latency_by_day()
+    assert (day["count"], day["p50"], day["p99"]) == (4, 25, pytest.approx(39.7))
+    assert registry.latency_by_day(generator_id="other") == []
+    with pytest.raises(ValueError):
+        registry.latency_by_day(field="owner")
+
+
+def test_old_databases_get_the_metric_columns(tmp_path):
+    path = str(tmp_path / "old.sqlite")
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE jobs (job_id TEXT PRIMARY KEY, owner TEXT NOT NULL, created_at REAL NOT NULL,"
+                   " updated_at REAL NOT NULL, pptx_name TEXT, pdf_name TEXT, pptx_hash TEXT, pdf_hash TEXT,"
+                   " generator_id TEXT, user_prompt TEXT, context_window_size INTEGER, content_slides INTEGER,"
+                   " status TEXT NOT NULL, output_filename TEXT, message TEXT, metrics TEXT)")
+        db.execute("INSERT INTO jobs (job_id, owner, created_at, updated_at, status, metrics)"
+                   " VALUES ('old', 'alice', 1, 2, 'completed', '{\"total_time_seconds\": 12.5}')")
+    db.close()
+    job = JobRegistry(path).get("old")
+    assert (job["finished_at"], job["total_time_seconds"]) == (2, 12.5)
@@ -0,0 +1,204 @@
+import threading
+
+import pytest
+import requests
+
+import job_progress
+import job_tracker
+from job_progress import CancelRejected, cancel_job
+from job_registry import JobRegistry
+from job_tracker import JobTracker, get_tracker, start_tracking
+from progress_model import ProgressModel, describe
+
+
+@pytest.fixture(autouse=True)
+def registry(tmp_path, monkeypatch):
+    registry = JobRegistry(str(tmp_path / "jobs.sqlite"))
+    monkeypatch.setattr(job_tracker, "get_job_registry", lambda: registry)
+    monkeypatch.setattr(job_tracker, "record_job_metrics", lambda metrics: None)
+    monkeypatch.setattr(job_tracker, "_trackers", {})
+    registry.register("eve", "job-1", pptx_name="q1.pptx")
+    return registry
+
+
+class Payloads(list):
+    tokens = None
+
+
+@pytest.fixture
+def statuses(monkeypatch):
+    """Payloads the job's status stream yields; an exception in the list is raised instead"""
+    payloads = Payloads()
+    payloads.tokens = []
+
+    def subscribe(client, job_id, token=None, timeout=None, **kwargs):
+        payloads.tokens.append(token)
+        for payload in payloads:
+            if isinstance(payload, Exception):
+                raise payload
+            yield payload
+
+    monkeypatch.setattr(job_tracker, "subscribe_job_status", subscribe)
+    return payloads
+
+
+def track(token=None):
+    tracker = JobTracker(None, "job-1", ProgressModel(content_slides=10), "processed_q1.pptx", token=token)
+    tracker.run()
+    return tracker.snapshot()
+
+
+def test_completed_job(statuses, registry):
+    statuses += [{"status": "processing", "warnings": ["Slide 3 has no title"]},
+                 {"status": "completed", "output_filename": "q1_headlines.pptx", "metrics": {"total_slides": 12}}]
+    state = track()
+    assert (state["status"], state["done"], state["output_filename"]) == ("completed", True, "q1_headlines.pptx")
+    assert state["warnings"] == ["Slide 3 has no title"]
+    job = registry.get("job-1")
+    assert (job["status"], job["output_filename"], job["total_slides"]) == ("completed", "q1_headlines.pptx", 12)
+
+
+def test_completed_job_keeps_the_default_output_name(statuses):
+    statuses.append({"status": "completed"})
+    assert track()["output_filename"] == "processed_q1.pptx"
+
+
+def test_failed_job(statuses, registry):
+    statuses.append({"status": "failed", "message": "Generator crashed"})
+    state = track()
+    assert (state["status"], state["message"]) == ("failed", "Generator crashed")
+    assert registry.get("job-1")["status"] == "failed"
+
+
+def test_stream_ending_early_is_a_timeout(statuses):
+    statuses.append({"status": "processing", "progress": {"slides_completed": 5, "slides_total": 10}})
+    state = track()
+    assert state["status"] == "timeout"
+    assert (state["estimate"]["source"], state["detail"]) == ("server", describe(state["estimate"]))
+
+
+def test_connection_errors_are_reported(statuses):
+    statuses.append(requests.ConnectionError("connection refused"))
+    state = track()
+    assert state["status"] == "error"
+    assert "connection refused" in state["message"]
+
+
+def test_token_provider_reaches_the_subscription(statuses):
+    # Handed over unresolved, so every poll asks for the current token
+    statuses.append({"status": "completed"})
+
+    def provider():
+        return "current-token"
+
+    track(token=provider)
+    assert statuses.tokens == [provider]
+
+
+def test_one_tracker_per_job(monkeypatch):
+    release = threading.Event()
+
+    def subscribe(client, job_id, token=None, timeout=None, **kwargs):
+        release.wait(5)
+        yield {"status": "completed"}
+
+    monkeypatch.setattr(job_tracker, "subscribe_job_status", subscribe)
+    tracker = start_tracking(None, "job-1", ProgressModel(), "out.pptx")
+    assert start_tracking(None, "job-1", ProgressModel(), "out.pptx") is tracker
+    assert get_tracker("job-1") is tracker and get_tracker("job-2") is None
+    release.set()
+    assert tracker.wait(5)
+    assert tracker.snapshot()["status"] == "completed"
+
+
+def test_a_tracker_that_lost_the_api_is_replaced(statuses):
+    statuses.append(requests.ConnectionError("down"))
+    tracker = start_tracking(None, "job-1", ProgressModel(), "out.pptx")
+    assert tracker.wait(5)
+    statuses[:] = [{"status": "completed"}]
+    replacement = start_tracking(None, "job-1", ProgressModel(), "out.pptx")
+    assert replacement is not tracker
+    assert replacement.wait(5)
+    assert replacement.status == "completed"
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+
+    def json(self):
+        if self.payload is None:
+            raise ValueError("not JSON")
+        return self.payload
+
+
+class CancelClient:
+    """Answers POST /cancel-job/ with the given response"""
+
+    def __init__(self, response):
+        self.response = response
+        self.posts = []
+
+    def post(self, path, token=None):
+        self.posts.append((path, token))
+        return self.response
+
+
+def test_cancel_job_stops_the_watcher():
+    stop = threading.Event()
+    job_progress._watchers["job-1"] = {"status": {"status": "processing"}, "finished_at": None, "stop": stop}
+    try:
+        client = CancelClient(FakeResponse(200, {"status": "cancelled"}))
+        assert cancel_job(client, "job-1", token="t") == {"status": "cancelled"}
+        assert client.posts == [("/cancel-job/job-1", "t")]
+        assert stop.is_set()
+        assert job_progress.latest_status("job-1") == {"status": "cancelled"}
+    finally:
+        del job_progress._watchers["job-1"]
+
+
+@pytest.mark.parametrize("response, detail", [(FakeResponse(409, {"detail": "Job already completed"}),
+                                               "Job already completed"),
+                                              (FakeResponse(502), "HTTP 502")])
+def test_refused_cancellation_raises(response, detail):
+    with pytest.raises(CancelRejected, match=detail):
+        cancel_job(CancelClient(response), "job-1")
+
+
+def test_cancelling_a_tracked_job(monkeypatch, registry):
+    def subscribe(client, job_id, token=None, timeout=None, stop=None):
+        yield {"status": "processing"}
+        stop.wait(5)
+
+    monkeypatch.setattr(job_tracker, "subscribe_job_status", subscribe)
+    client = CancelClient(FakeResponse(200, {"status": "cancelled"}))
+    tracker = start_tracking(client, "job-1", ProgressModel(), "out.pptx", token=lambda: "current-token")
+    tracker.cancel()
+    assert tracker.wait(5)
+    assert client.posts == [("/cancel-job/job-1", "current-token")]
+    assert tracker.snapshot()["status"] == "cancelled"
+    assert registry.get("job-1")["status"] == "cancelled"
+
+
+def test_refused_cancellation_keeps_following_the_job(monkeypatch):
+    release = threading.Event()
+
+    def subscribe(client, job_id, token=None, timeout=None, stop=None):
+        release.wait(5)
+        yield {"status": "completed"}
+
+    monkeypatch.setattr(job_tracker, "subscribe_job_status", subscribe)
+    tracker = start_tracking(CancelClient(FakeResponse(409, {"detail": "Job already completed"})), "job-1",
+                             ProgressModel(), "out.pptx")
+    with pytest.raises(CancelRejected):
+        tracker.cancel()
+    release.set()
+    assert tracker.wait(5)
+    assert tracker.status == "completed"
+
+
+def test_job_cancelled_elsewhere(statuses, registry):
+    statuses.append({"status": "cancelled"})
+    assert track()["status"] == "cancelled"
+    assert registry.get("job-1")["status"] == "cancelled"
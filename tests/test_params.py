@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code, tmp_path, **env):
+    env = dict(os.environ, TMPDIR=str(tmp_path), **env)
+    env.pop("INSIGHTGEN_DATA_DIR", None)
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True,
+                          timeout=120)
+
+
+def test_data_dir_falls_back_to_temp_dir_without_a_writable_home(tmp_path):
+    home = tmp_path / "home"
+    home.write_text("not a directory")
+    result = run_python("import params; print(params.DATA_DIR)", tmp_path, HOME=str(home))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == str(tmp_path / "insightgen")
+
+
+def test_data_dir_defaults_to_home(tmp_path):
+    home = tmp_path / "home"
+    home.mkdir()
+    result = run_python("import params; print(params.DATA_DIR)", tmp_path, HOME=str(home))
+    assert result.stdout.strip() == str(home / ".insightgen")
+
+
+def test_dash_app_imports_without_a_writable_home(tmp_path):
+    home = tmp_path / "home"
+    home.write_text("not a directory")
+    result = run_python("import dash_app", tmp_path, HOME=str(home), API_URL="http://127.0.0.1:9")
+    assert result.returncode == 0, result.stderr
+    assert (tmp_path / "insightgen").is_dir()
@@ -0,0 +1,53 @@
+import pytest
+
+from poll_scheduler import PollScheduler
+
+
+def scheduler():
+    return PollScheduler(min_interval=1, max_interval=8, factor=2, start_time=0)
+
+
+def test_backs_off_while_the_status_is_unchanged():
+    s = scheduler()
+    s.observe({"status": "processing"}, now=1)
+    intervals = []
+    for now in range(2, 7):
+        s.observe({"status": "processing"}, now=now)
+        intervals.append(s.next_interval(now=now))
+    assert intervals == [2, 4, 8, 8, 8]
+
+
+def test_status_change_resets_to_the_minimum_late_in_a_long_job():
+    s = scheduler()
+    s.observe({"status": "processing", "stage": "slides"}, now=1)
+    for now in range(2, 10):
+        s.observe({"status": "processing", "stage": "slides"}, now=now)
+    assert s.next_interval(now=1000) == 8
+    assert s.observe({"status": "processing", "stage": "headlines"}, now=1000)
+    assert s.next_interval(now=1000) == 1
+
+
+def test_elapsed_time_floor_applies_while_unchanged():
+    s = PollScheduler(min_interval=1, max_interval=60, factor=1, start_time=0)
+    s.observe({"status": "processing"}, now=0)
+    s.observe({"status": "processing"}, now=1000)
+    assert s.next_interval(now=1000) == pytest.approx(20)
+
+
+def test_short_stages_cap_the_interval():
+    s = scheduler()
+    for now, stage in enumerate(["a", "b", "c"]):
+        s.observe({"status": "processing", "stage": stage}, now=now * 20)
+    for now in range(41, 45):
+        s.observe({"status": "processing", "stage": "c"}, now=now)
+    assert s.next_interval(now=45) == 2
+
+
+def test_round_trips_through_a_dict():
+    s = scheduler()
+    s.observe({"status": "queued"}, now=1)
+    s.observe({"status": "processing"}, now=5)
+    s.observe({"status": "processing"}, now=6)
+    restored = PollScheduler.from_dict(s.to_dict(), min_interval=1, max_interval=8, factor=2)
+    assert restored.to_dict() == s.to_dict()
+    assert restored.next_interval(now=7) == s.next_interval(now=7)
@@ -0,0 +1,76 @@
+import gzip
+
+import flask
+import pytest
+
+from precompressed import CompressedStatic
+
+SCRIPT = "".join(f"var component{i} = {i} * 2;\n" for i in range(2000))
+
+
+def make_app(tmp_path, **kwargs):
+    app = flask.Flask(__name__)
+
+    @app.route("/_dash-component-suites/<path:name>")
+    def component_suite(name):
+        return flask.Response(f"// {name}\n{SCRIPT}", mimetype="application/javascript")
+
+    static = CompressedStatic(str(tmp_path), **kwargs)
+    static.install(app)
+    return app.test_client(), static
+
+
+def get(client, url):
+    return client.get(url, headers={"Accept-Encoding": "gzip"})
+
+
+def test_response_is_compressed_and_cached(tmp_path):
+    client, static = make_app(tmp_path)
+    first, second = get(client, "/_dash-component-suites/a.js"), get(client, "/_dash-component-suites/a.js")
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(second.data).decode().endswith(SCRIPT)
+    assert first.data == second.data
+    assert static.stats()["responses"] == 1
+
+
+def test_junk_query_strings_share_one_entry(tmp_path):
+    client, static = make_app(tmp_path)
+    for n in range(50):
+        assert get(client, f"/_dash-component-suites/a.js?junk={n}").headers["Content-Encoding"] == "gzip"
+    assert static.stats()["responses"] == 1
+
+
+def test_fingerprint_parameters_get_their_own_entry(tmp_path):
+    client, static = make_app(tmp_path)
+    get(client, "/_dash-component-suites/a.js?m=1")
+    get(client, "/_dash-component-suites/a.js?m=2&junk=1")
+    get(client, "/_dash-component-suites/a.js?junk=2&m=2")
+    assert static.stats()["responses"] == 2
+
+
+def test_cache_stays_within_its_byte_limit(tmp_path):
+    client, static = make_app(tmp_path)
+    size = len(get(client, "/_dash-component-suites/0.js").data)
+    client, static = make_app(tmp_path, max_bytes=3 * size + size // 2)
+    for n in range(20):
+        get(client, f"/_dash-component-suites/{n}.js")
+    assert static.stats()["responses"] == 3
+    assert static.stats()["bytes"] <= 3 * size + size // 2
+
+
+@pytest.mark.parametrize("max_entries", [1, 5])
+def test_cache_stays_within_its_entry_limit(tmp_path, max_entries):
+    client, static = make_app(tmp_path, max_entries=max_entries)
+    for n in range(10):
+        get(client, f"/_dash-component-suites/{n}.js?m={n}")
+    assert static.stats()["responses"] == max_entries
+
+
+def test_least_recently_used_entry_goes_first(tmp_path):
+    client, static = make_app(tmp_path, max_entries=2)
+    get(client, "/_dash-component-suites/a.js")
+    get(client, "/_dash-component-suites/b.js")
+    get(client, "/_dash-component-suites/a.js")
+    get(client, "/_dash-component-suites/c.js")
+    paths = [key[0] for key in static._cache]
+    assert paths == ["/_dash-component-suites/a.js", "/_dash-component-suites/c.js"]
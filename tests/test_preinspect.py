@@ -0,0 +1,127 @@
+import io
+import zipfile
+import zlib
+
+import pytest
+
+from preinspect import PreinspectError, inspect_pptx, pdf_page_count, preinspect
+
+P_NS = 'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"'
+R_NS = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+RELS_NS = 'xmlns="http://schemas.openxmlformats.org/package/2006/relationships"'
+REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+def make_pptx(slides):
+    """slides: list of (layout name, hidden, has title), in presentation order"""
+    buffer = io.BytesIO()
+    layouts = sorted({layout for layout, _, _ in slides})
+    with zipfile.ZipFile(buffer, "w") as archive:
+        # Slide parts deliberately numbered against presentation order
+        parts = {n: f"slides/slide{len(slides) - n + 1}.xml" for n in range(1, len(slides) + 1)}
+        ids = "".join(f'<p:sldId id="{255 + n}" r:id="rId{n}"/>' for n in parts)
+        archive.writestr("ppt/presentation.xml", f"<p:presentation {P_NS} {R_NS}><p:sldIdLst>{ids}</p:sldIdLst>"
+                                                 "</p:presentation>")
+        archive.writestr("ppt/_rels/presentation.xml.rels", f"<Relationships {RELS_NS}>" + "".join(
+            f'<Relationship Id="rId{n}" Type="{REL_TYPE}/slide" Target="{part}"/>' for n, part in parts.items())
+            + "</Relationships>")
+        for index, name in enumerate(layouts, start=1):
+            archive.writestr(f"ppt/slideLayouts/slideLayout{index}.xml",
+                             f'<p:sldLayout {P_NS}><p:cSld name="{name}"/></p:sldLayout>')
+        for n, (layout, hidden, has_title) in enumerate(slides, start=1):
+            show = ' show="0"' if hidden else ""
+            title = '<p:nvSpPr><p:nvPr><p:ph type="title"/></p:nvPr></p:nvSpPr>' if has_title else ""
+            archive.writestr(f"ppt/{parts[n]}", f"<p:sld {P_NS}{show}><p:cSld><p:spTree><p:sp>{title}</p:sp>"
+                                                "</p:spTree></p:cSld></p:sld>")
+            archive.writestr(f"ppt/slides/_rels/{parts[n].split('/')[1]}.rels",
+                             f'<Relationships {RELS_NS}><Relationship Id="rId1" Type="{REL_TYPE}/slideLayout" '
+                             f'Target="../slideLayouts/slideLayout{layouts.index(layout) + 1}.xml"/></Relationships>')
+    buffer.seek(0)
+    return buffer
+
+
+def make_pdf(pages, catalog=True):
+    kids = " ".join(f"{n + 2} 0 R" for n in range(1, pages + 1))
+    objects = [b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n" if catalog else b"",
+               b"2 0 obj\n<< /Type /Pages /Kids [%s] /Count %d >>\nendobj\n" % (kids.encode(), pages)]
+    # A nested page tree node: never mistaken for the root
+    objects.append(b"99 0 obj\n<< /Type /Pages /Parent 2 0 R /Count 1 >>\nendobj\n")
+    for n in range(1, pages + 1):
+        objects.append(b"%d 0 obj\n<< /Type /Page /Parent 2 0 R >>\nendobj\n" % (n + 2))
+    trailer = b"trailer\n<< /Root 1 0 R >>\n" if catalog else b"trailer\n<< /Size 5 >>\n"
+    return io.BytesIO(b"%PDF-1.4\n" + b"".join(objects) + trailer + b"%%EOF\n")
+
+
+def test_inspect_pptx_in_presentation_order():
+    slides = inspect_pptx(make_pptx([("HEADER Intro", False, False), ("Title Only", True, True),
+                                     ("Title Only", False, False)]))
+    assert slides == [{"number": 1, "layout": "HEADER Intro", "hidden": False, "has_title": False},
+                      {"number": 2, "layout": "Title Only", "hidden": True, "has_title": True},
+                      {"number": 3, "layout": "Title Only", "hidden": False, "has_title": False}]
+
+
+@pytest.mark.parametrize("data", [b"not a zip", b""])
+def test_corrupt_pptx(data):
+    with pytest.raises(PreinspectError):
+        inspect_pptx(io.BytesIO(data))
+
+
+def test_pdf_page_count_from_the_trailer(tmp_path):
+    assert pdf_page_count(make_pdf(7)) == 7
+    # Files on disk are memory-mapped
+    path = tmp_path / "deck.pdf"
+    path.write_bytes(make_pdf(3).getvalue())
+    with open(path, "rb") as f:
+        assert pdf_page_count(f) == 3
+
+
+def test_pdf_page_count_of_a_linearized_pdf():
+    data = b"%PDF-1.6\n1 0 obj\n<< /Linearized 1 /L 1000 /N 12 /T 900 >>\nendobj\n"
+    assert pdf_page_count(io.BytesIO(data)) == 12
+
+
+def test_pdf_page_count_without_a_catalog_uses_the_largest_page_tree():
+    assert pdf_page_count(make_pdf(5, catalog=False)) == 5
+
+
+def test_pdf_page_count_from_an_object_stream():
+    contents = b"2 0 << /Type /Pages /Kids [3 0 R] /Count 42 >>"
+    stream = zlib.compress(contents)
+    data = (b"%%PDF-1.5\n5 0 obj\n<< /Type /ObjStm /N 1 /First 4 /Filter /FlateDecode /Length %d >>\nstream\n"
+            % len(stream) + stream + b"\nendstream\nendobj\n%%EOF\n")
+    assert pdf_page_count(io.BytesIO(data)) == 42
+
+
+@pytest.mark.parametrize("data", [b"hello", b""])
+def test_not_a_pdf(data):
+    with pytest.raises(PreinspectError):
+        pdf_page_count(io.BytesIO(data))
+
+
+def test_preinspect_valid_pair():
+    result = preinspect(make_pptx([("HEADER Intro", False, False), ("Title Only", False, True),
+                                   ("Title Only", False, False)]), make_pdf(3))
+    assert result["is_valid"]
+    assert result["warnings"] == []
+    stats = result["slide_stats"]
+    assert stats["header_slides"] == {"count": 1, "slide_numbers": [1]}
+    assert stats["content_slides"] == {"count": 2, "slide_numbers": [2, 3]}
+    assert stats["missing_placeholders"] == {"count": 1, "slide_numbers": [3]}
+
+
+def test_preinspect_count_mismatch_names_the_hidden_slides():
+    result = preinspect(make_pptx([("HEADER Intro", False, False), ("Title Only", True, True),
+                                   ("Title Only", False, True)]), make_pdf(2))
+    assert not result["is_valid"]
+    assert result["errors"] == ["Slide count mismatch: the PPTX has 3 slides but the PDF has 2 pages "
+                                "(hidden slides: 2)"]
+
+
+def test_preinspect_warnings_and_errors():
+    result = preinspect(make_pptx([("Title Only", True, True)]), make_pdf(1))
+    assert result["is_valid"]
+    assert len(result["warnings"]) == 2
+
+    result = preinspect(io.BytesIO(b"broken"), io.BytesIO(b"broken"))
+    assert not result["is_valid"]
+    assert len(result["errors"]) == 2
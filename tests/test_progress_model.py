@@ -0,0 +1,67 @@
+import pytest
+
+import progress_model
+from progress_model import ProgressModel, content_slide_count, describe
+
+
+@pytest.fixture(autouse=True)
+def history(tmp_path, monkeypatch):
+    monkeypatch.setattr(progress_model, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(progress_model, "HISTORY_FILE", str(tmp_path / "eta_history.json"))
+    monkeypatch.setattr(progress_model, "_median_cache", [None, None])
+
+
+def test_content_slide_count():
+    assert content_slide_count({"slide_stats": {"content_slides": {"count": 12}}}) == 12
+    assert content_slide_count({"slide_stats": None}) is None
+    assert content_slide_count(None) is None
+
+
+def test_history_median_replaces_the_default(monkeypatch):
+    assert progress_model.historic_seconds_per_slide() == progress_model.DEFAULT_SECONDS_PER_SLIDE
+    for seconds in (2, 4, 30):
+        progress_model.record_job_metrics({"average_time_per_content_slide": seconds})
+    progress_model.record_job_metrics({"average_time_per_content_slide": 0})
+    progress_model.record_job_metrics(None)
+    assert progress_model.historic_seconds_per_slide() == 4
+
+
+def test_history_keeps_the_most_recent_jobs(monkeypatch):
+    monkeypatch.setattr(progress_model, "HISTORY_SIZE", 3)
+    for seconds in (100, 100, 1, 1, 1):
+        progress_model.record_job_metrics({"average_time_per_content_slide": seconds})
+    assert progress_model._load_history() == [1, 1, 1]
+
+
+def test_estimate_follows_the_expected_duration():
+    model = ProgressModel(content_slides=10, seconds_per_slide=10, start_time=0)
+    start, middle, late = model.estimate({}, now=0), model.estimate({}, now=50), model.estimate({}, now=500)
+    assert (start["percent"], start["stage_number"], start["eta_seconds"]) == (5, 1, 100)
+    assert (middle["percent"], middle["stage"], middle["eta_seconds"]) == (52, "Generating observations", 50)
+    assert late["percent"] == 99
+    assert late["eta_seconds"] is None
+    assert middle["source"] == "estimate"
+
+
+def test_estimate_is_clamped_into_the_reported_stage():
+    model = ProgressModel(content_slides=10, seconds_per_slide=10, start_time=0)
+    estimate = model.estimate({"stage": "Generating headlines"}, now=10)
+    assert estimate["stage_number"] == 3
+    assert estimate["percent"] == 80
+
+
+def test_server_counters_place_progress_within_the_stage():
+    model = ProgressModel(content_slides=10, seconds_per_slide=10, start_time=0)
+    estimate = model.estimate({"stage": "Generating observations",
+                               "progress": {"slides_completed": 5, "slides_total": 10}}, now=100)
+    assert estimate["source"] == "server"
+    assert estimate["percent"] == 50
+    assert estimate["eta_seconds"] == 100
+
+
+def test_describe():
+    model = ProgressModel(content_slides=100, seconds_per_slide=10, start_time=0)
+    assert describe(model.estimate({}, now=0)) == (
+        "Stage 1/4: Slide processing - Preparing slides for analysis... (about 16m 40s remaining)")
+    assert describe(model.estimate({}, now=995)).endswith("(about 5s remaining)")
+    assert "remaining" not in describe(model.estimate({}, now=2000))
@@ -0,0 +1,132 @@
+import sys
+import time
+
+import pytest
+
+import state_backend
+from state_backend import (FakeRedis, MemoryBackend, RedisBackend, SessionStore, SQLiteBackend, StateBackend,
+                           create_backend)
+
+
+def redis_library_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisBackend(fakeredis.FakeRedis(), prefix="test:")
+
+
+@pytest.fixture(params=["memory", "sqlite", "fakeredis", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "state.sqlite"))
+    if request.param == "fakeredis":
+        return RedisBackend(FakeRedis())
+    return redis_library_backend()
+
+
+def test_get_set_delete(backend):
+    assert backend.get("missing") is None
+    backend.set("key", b"\x00value")
+    assert backend.get("key") == b"\x00value"
+    backend.set("key", b"other")
+    assert backend.get("key") == b"other"
+    backend.delete("key")
+    backend.delete("key")
+    assert backend.get("key") is None
+
+
+def test_json(backend):
+    backend.set_json("doc", {"a": [1, 2], "b": None})
+    assert backend.get_json("doc") == {"a": [1, 2], "b": None}
+    assert backend.get_json("missing", default=[]) == []
+
+
+def test_values_expire(backend):
+    backend.set("short", b"1", ttl=0.05)
+    backend.set("long", b"2", ttl=60)
+    backend.set("forever", b"3")
+    time.sleep(0.1)
+    assert backend.get("short") is None
+    assert backend.get("long") == b"2"
+    assert backend.get("forever") == b"3"
+
+
+def test_memory_backend_drops_expired_then_oldest_entries():
+    backend = MemoryBackend(max_entries=3)
+    backend.set("expiring", b"1", ttl=0.01)
+    backend.set("a", b"a")
+    backend.set("b", b"b")
+    time.sleep(0.02)
+    backend.set("c", b"c")
+    assert [backend.get(key) for key in ("a", "b", "c")] == [b"a", b"b", b"c"]
+    # Rewriting a key makes it the newest
+    backend.set("a", b"a2")
+    backend.set("d", b"d")
+    assert backend.get("b") is None
+    assert [backend.get(key) for key in ("a", "c", "d")] == [b"a2", b"c", b"d"]
+
+
+def test_sqlite_backend_is_shared_by_every_handle_on_the_file(tmp_path, monkeypatch):
+    first, second = SQLiteBackend(str(tmp_path / "s.sqlite")), SQLiteBackend(str(tmp_path / "s.sqlite"))
+    first.set("key", b"value")
+    assert second.get("key") == b"value"
+
+    first.set("old", b"x", ttl=0.01)
+    time.sleep(0.02)
+    monkeypatch.setattr(state_backend, "_PURGE_INTERVAL_SECONDS", 0)
+    second.set("other", b"y")
+    with second._connect() as db:
+        assert db.execute("SELECT COUNT(*) FROM state WHERE key = 'old'").fetchone()[0] == 0
+
+
+def test_redis_keys_are_prefixed():
+    client = FakeRedis()
+    RedisBackend(client, prefix="app1:").set("key", b"1")
+    assert client.get("app1:key") == b"1"
+    assert RedisBackend(client, prefix="app2:").get("key") is None
+
+
+def test_backend_flags():
+    assert (MemoryBackend.shared, MemoryBackend().process_local) == (False, True)
+    assert (SQLiteBackend.shared, SQLiteBackend.process_local) == (False, False)
+    in_process = RedisBackend(FakeRedis())
+    assert (in_process.shared, in_process.process_local) == (True, True)
+    assert redis_library_backend().process_local is False
+
+
+def test_incomplete_backends_cannot_be_created():
+    class ReadOnlyBackend(StateBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError, match="delete"):
+        ReadOnlyBackend()
+
+
+def test_create_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_backend, "STATE_SQLITE_PATH", str(tmp_path / "s.sqlite"))
+    assert isinstance(create_backend("memory"), MemoryBackend)
+    assert isinstance(create_backend("fakeredis").client, FakeRedis)
+    with pytest.raises(ValueError, match="Unknown STATE_BACKEND"):
+        create_backend("memcached")
+    monkeypatch.setitem(sys.modules, "redis", None)
+    with pytest.raises(ValueError, match="pip install redis"):
+        create_backend("redis")
+
+
+def test_sqlite_backend_default_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(SQLiteBackend.__init__, "__defaults__", (str(tmp_path / "default.sqlite"),))
+    create_backend("sqlite").set("key", b"1")
+    assert (tmp_path / "default.sqlite").exists()
+
+
+def test_session_store_only_accepts_ids_it_could_have_made():
+    store = SessionStore(MemoryBackend(), ttl_seconds=60)
+    session_id = store.new_id()
+    assert session_id != store.new_id()
+    store.save(session_id, {"job_id": "job-1"})
+    assert store.load(session_id) == {"job_id": "job-1"}
+    for bad in (None, "", "short", session_id + "x", "../" + session_id[3:], 42):
+        assert store.load(bad) is None
+    store.delete(session_id)
+    assert store.load(session_id) is None
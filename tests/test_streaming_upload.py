@@ -0,0 +1,77 @@
+import base64
+import gzip
+import io
+
+from urllib3.fields import RequestField
+from urllib3.filepost import encode_multipart_formdata
+
+from streaming_upload import MultipartEncoder, compressed_chunks, iter_base64_decoded
+
+
+def encode(encoder, size):
+    chunks = []
+    while True:
+        chunk = encoder.read(size)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+def urllib3_body(boundary, fields, files):
+    parts = [RequestField(name, value) for name, value in fields.items()]
+    for name, (filename, data, content_type) in files.items():
+        part = RequestField(name, data, filename=filename)
+        part.make_multipart(content_type=content_type)
+        parts.append(part)
+    for part in parts[:len(fields)]:
+        part.make_multipart()
+    return encode_multipart_formdata(parts, boundary=boundary)[0]
+
+
+def test_body_matches_urllib3_in_any_chunk_size():
+    data = bytes(range(256)) * 40
+    for size in (1, 7, 1000, 1 << 20):
+        encoder = MultipartEncoder(fields={"generator_id": "bgs", "prompt": "Market: Vietnam", "skipped": None},
+                                   files={"pptx_file": ("deck.pptx", io.BytesIO(data), "application/octet-stream")},
+                                   chunk_size=64)
+        expected = urllib3_body(encoder.boundary, {"generator_id": "bgs", "prompt": "Market: Vietnam"},
+                                {"pptx_file": ("deck.pptx", data, "application/octet-stream")})
+        body = encode(encoder, size)
+        assert body == expected
+        assert len(encoder) == len(body)
+
+
+def test_filename_quotes_and_line_breaks_are_escaped():
+    filename = 'a"b\r\nContent-Type: text/html\r\n\r\nx.pptx'
+    encoder = MultipartEncoder(files={"pptx_file": (filename, io.BytesIO(b"deck"), "application/octet-stream")})
+    body = encode(encoder, 1 << 20)
+    expected = urllib3_body(encoder.boundary, {}, {"pptx_file": (filename, b"deck", "application/octet-stream")})
+    assert body == expected
+    header = body.split(b"\r\n\r\n", 1)[0].decode()
+    assert 'filename="a%22b%0D%0AContent-Type: text/html%0D%0A%0D%0Ax.pptx"' in header
+    assert header.count("\r\n") == 2
+
+
+def test_progress_reaches_total():
+    seen = []
+    encoder = MultipartEncoder(files={"pdf_file": ("d.pdf", io.BytesIO(b"x" * 5000), "application/pdf")},
+                               on_progress=lambda sent, total: seen.append((sent, total)))
+    encode(encoder, 1024)
+    assert seen[-1] == (len(encoder), len(encoder))
+    assert [sent for sent, _ in seen] == sorted(sent for sent, _ in seen)
+
+
+def test_compressed_chunks_round_trip():
+    data = b"slide " * 10000
+    encoder = MultipartEncoder(files={"pdf_file": ("d.pdf", io.BytesIO(data), "application/pdf")})
+    compressed = b"".join(compressed_chunks(encoder, "gzip"))
+    expected = urllib3_body(encoder.boundary, {}, {"pdf_file": ("d.pdf", data, "application/pdf")})
+    assert len(compressed) < len(expected)
+    assert gzip.decompress(compressed) == expected
+
+
+def test_iter_base64_decoded_matches_b64decode():
+    data = bytes(range(256)) * 100 + b"tail"
+    encoded = base64.b64encode(data).decode()
+    for chunk_size in (1, 3, 4, 100, 1 << 20):
+        assert b"".join(iter_base64_decoded(encoded, chunk_size)) == data
@@ -0,0 +1,66 @@
+import base64
+import hashlib
+import os
+
+import pytest
+
+from state_backend import MemoryBackend
+from upload_store import UploadNotFound, UploadStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(str(tmp_path / "uploads"), ttl_seconds=60)
+
+
+def test_uploads_are_addressed_by_content(store):
+    data = b"deck bytes" * 1000
+    handle = store.put_chunks([data[:10], data[10:]])
+    assert handle == hashlib.sha256(data).hexdigest()
+    assert store.put_base64(base64.b64encode(data).decode()) == handle
+    assert store.size(handle) == len(data)
+    with store.open(handle) as f:
+        assert f.read() == data
+    assert os.listdir(store.root) == [handle]
+
+
+@pytest.mark.parametrize("handle", ["0" * 63, "../" + "0" * 61, "A" * 64, None, "f" * 64])
+def test_unknown_or_malformed_handles_are_not_found(store, handle):
+    with pytest.raises(UploadNotFound):
+        store.open(handle)
+    with pytest.raises(UploadNotFound):
+        store.size(handle)
+
+
+def test_a_failed_upload_leaves_nothing_behind(store):
+    def chunks():
+        yield b"partial"
+        raise OSError("connection reset")
+
+    with pytest.raises(OSError):
+        store.put_chunks(chunks())
+    assert os.listdir(store.root) == []
+
+
+def test_untouched_uploads_expire(store):
+    stale, fresh = store.put_chunks([b"stale"]), store.put_chunks([b"fresh"])
+    os.utime(os.path.join(store.root, stale), (0, 0))
+    store.evict_expired(force=True)
+    with pytest.raises(UploadNotFound):
+        store.open(stale)
+    assert store.size(fresh) == 5
+
+
+def test_uploads_are_shared_between_instances(tmp_path):
+    shared = MemoryBackend()
+    first = UploadStore(str(tmp_path / "a"), shared=shared)
+    second = UploadStore(str(tmp_path / "b"), shared=shared)
+    handle = first.put_chunks([b"pptx"])
+    with second.open(handle) as f:
+        assert f.read() == b"pptx"
+
+    # A corrupted shared copy is not trusted
+    other = first.put_chunks([b"pdf"])
+    shared.set(f"upload:{other}", b"tampered")
+    with pytest.raises(UploadNotFound):
+        UploadStore(str(tmp_path / "c"), shared=shared).open(other)
@@ -0,0 +1,135 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+
+from state_backend import get_state_backend
+from streaming_upload import iter_base64_decoded
+
+# Server-side, content-addressed store for decks uploaded through the Dash app.
+# Each upload is written to disk once under its SHA-256; the browser only keeps
+# the handle, so callbacks no longer ship megabytes of base64 back and forth.
+# With a shared state backend (state_backend.py) uploads up to
+# UPLOAD_SHARED_MAX_MB are copied there as well, so a handle issued by one
+# instance can be opened on another.
+
+UPLOAD_STORE_DIR = os.getenv("UPLOAD_STORE_DIR", os.path.join(tempfile.gettempdir(), "insightgen_uploads"))
+UPLOAD_TTL_SECONDS = int(os.getenv("UPLOAD_TTL_SECONDS", "7200"))
+UPLOAD_SHARED_MAX_BYTES = int(float(os.getenv("UPLOAD_SHARED_MAX_MB", "64")) * 1024 * 1024)
+
+# Handles come back from the browser, so only accept plain SHA-256 hex digests
+_HANDLE_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# Expired uploads are swept at most this often
+_SWEEP_INTERVAL_SECONDS = 60
+
+
+class UploadNotFound(KeyError):
+    """Raised when a handle is unknown or its upload has expired"""
+
+
+class UploadStore:
+    """Content-addressed temp file store with TTL eviction, optionally copied to a shared state backend"""
+
+    def __init__(self, root=UPLOAD_STORE_DIR, ttl_seconds=UPLOAD_TTL_SECONDS, shared=None):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._last_sweep = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, handle):
+        if not isinstance(handle, str) or not _HANDLE_RE.match(handle):
+            raise UploadNotFound(handle)
+        return os.path.join(self.root, handle)
+
+    def put_chunks(self, chunks):
+        """Write an iterable of byte chunks to the store and return its handle"""
+        self.evict_expired()
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            handle = digest.hexdigest()
+            path = self._path(handle)
+            if os.path.exists(path):
+                # Same content already stored: keep the existing copy and refresh it
+                os.remove(tmp_path)
+                os.utime(path)
+            else:
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self.shared and os.path.getsize(path) <= UPLOAD_SHARED_MAX_BYTES:
+            with open(path, "rb") as f:
+                self.shared.set(f"upload:{handle}", f.read(), ttl=self.ttl_seconds)
+        return handle
+
+    def _fetch_shared(self, handle):
+        """Copy an upload received by another instance into this store; returns its path"""
+        path = self._path(handle)
+        data = self.shared.get(f"upload:{handle}") if self.shared else None
+        if data is None or hashlib.sha256(data).hexdigest() != handle:
+            raise UploadNotFound(handle)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def put_base64(self, content_string):
+        """Decode a base64 upload straight to disk and return its handle"""
+        return self.put_chunks(iter_base64_decoded(content_string))
+
+    def size(self, handle):
+        try:
+            return os.path.getsize(self._path(handle))
+        except FileNotFoundError:
+            return os.path.getsize(self._fetch_shared(handle))
+
+    def open(self, handle):
+        """Open a stored upload for reading, refreshing its TTL"""
+        path = self._path(handle)
+        try:
+            fileobj = open(path, "rb")
+        except FileNotFoundError:
+            fileobj = open(self._fetch_shared(handle), "rb")
+        os.utime(path)
+        return fileobj
+
+    def evict_expired(self, force=False):
+        """Remove uploads that have not been touched within the TTL"""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_sweep < _SWEEP_INTERVAL_SECONDS:
+                return
+            self._last_sweep = now
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl_seconds:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_upload_store():
+    """Return the process-wide upload store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = get_state_backend()
+            _store = UploadStore(shared=backend if backend.shared else None)
+        return _store